@@ -0,0 +1,80 @@
+#region imports
+from collections import deque
+#endregion
+
+#region function definitions
+def FundamentalCycles(edges):
+    """
+    Finds a fundamental cycle basis of an undirected (multi)graph.  A breadth-first spanning forest
+    is built in O(V+E); every edge left out of the forest closes exactly one independent cycle, which
+    is the edge plus the tree path between its ends.  The total work is O(V+E) plus the length of the
+    cycles returned.  Self-loops (an edge from a node to itself) are ignored.
+    :param edges: list of (node, node) pairs; node names can be any hashable values
+    :return: list of cycles, each a tuple (nodes, edgeIndices) in traversal order.  A cycle starts with its
+             closing edge traversed from edges[k][0] to edges[k][1], so nodes[0] == edges[k][0],
+             nodes[1] == edges[k][1], and edgeIndices[i] connects nodes[i] to nodes[(i+1) % len(nodes)].
+    """
+    # adjacency structure: node -> list of (neighbor, edge index)
+    adjacency = {}
+    for k, (a, b) in enumerate(edges):
+        if a == b:
+            continue
+        adjacency.setdefault(a, []).append((b, k))
+        adjacency.setdefault(b, []).append((a, k))
+
+    # breadth-first spanning forest
+    parent = {}
+    parentEdge = {}
+    depth = {}
+    inTree = [False] * len(edges)
+    for root in adjacency:
+        if root in depth:
+            continue
+        parent[root] = None
+        parentEdge[root] = None
+        depth[root] = 0
+        queue = deque([root])
+        while queue:
+            n = queue.popleft()
+            for m, k in adjacency[n]:
+                if m not in depth:
+                    parent[m] = n
+                    parentEdge[m] = k
+                    depth[m] = depth[n] + 1
+                    inTree[k] = True
+                    queue.append(m)
+
+    # each non-tree edge a-b closes the cycle a -> b -> ... -> common ancestor -> ... -> a
+    cycles = []
+    for k, (a, b) in enumerate(edges):
+        if inTree[k] or a == b:
+            continue
+        up = [b]        # b and its ancestors up to the common ancestor
+        upEdges = [k]   # edge a-b, then the tree edges climbed from b
+        down = []       # ancestors of a below the common ancestor (climbed from a, reversed later)
+        downEdges = []
+        x, y = b, a
+        while depth[x] > depth[y]:
+            upEdges.append(parentEdge[x])
+            x = parent[x]
+            up.append(x)
+        while depth[y] > depth[x]:
+            downEdges.append(parentEdge[y])
+            y = parent[y]
+            down.append(y)
+        while x != y:
+            upEdges.append(parentEdge[x])
+            x = parent[x]
+            up.append(x)
+            downEdges.append(parentEdge[y])
+            y = parent[y]
+            down.append(y)
+        # the common ancestor ends both lists (or is a itself when down is empty); keep it once
+        if len(down) > 0:
+            down.pop()
+        else:
+            up.pop()
+        nodes = [a] + up + down[::-1]
+        cycles.append((nodes, upEdges + downEdges[::-1]))
+    return cycles
+#endregion
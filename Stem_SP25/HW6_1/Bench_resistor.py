@@ -0,0 +1,112 @@
+# region imports
+import sys
+import json
+import time
+import tracemalloc
+import io
+import contextlib
+import warnings
+from Resistor import Resistor
+from VoltageSource import VoltageSource
+from ResistorNetwork import ResistorNetwork, ResistorNetwork_2
+# endregion
+
+# region function definitions
+def Measure(fn, repeat=3):
+    """
+    Best wall time of repeat calls of fn, then the peak traced memory of one more call.
+    :return: (seconds, peak bytes, result of the last call)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def LadderNetwork(n, R=1.0, V=12.0):
+    """
+    Synthetic resistor ladder: a source from ground g to t0, series resistors t0-t1-...-t(n-1) and a
+    rung from every ti to ground.
+    :param n: number of ladder nodes (the network has n + 1 nodes)
+    :return: a ResistorNetwork
+    """
+    Net = ResistorNetwork()
+    Net.AddVSource(VoltageSource(V, 'g-t0'))
+    for i in range(n):
+        if i + 1 < n:
+            Net.AddResistor(Resistor(R, name='t{}-t{}'.format(i, i + 1)))
+        Net.AddResistor(Resistor(2.0 * R, name='t{}-g'.format(i)))
+    return Net
+
+def GridNetwork(k, R=1.0, V=12.0):
+    """
+    Synthetic k x k resistor grid with a source between two opposite corners.
+    :return: a ResistorNetwork with k*k nodes
+    """
+    Net = ResistorNetwork()
+    Name = lambda i, j: 'n{}_{}'.format(i, j)
+    Net.AddVSource(VoltageSource(V, '{}-{}'.format(Name(0, 0), Name(k - 1, k - 1))))
+    for i in range(k):
+        for j in range(k):
+            if i + 1 < k:
+                Net.AddResistor(Resistor(R, name='{}-{}'.format(Name(i, j), Name(i + 1, j))))
+            if j + 1 < k:
+                Net.AddResistor(Resistor(R, name='{}-{}'.format(Name(i, j), Name(i, j + 1))))
+    return Net
+
+def Benchmarks(quick=False):
+    """
+    Times the fsolve solutions of the two homework circuits and nodal analysis of ladder and grid
+    networks from 10 to 10^5 nodes (10^3 with quick=True).
+    :return: list of result records (dictionaries)
+    """
+    Records = []
+    for Cls, File in ((ResistorNetwork, 'ResistorNetwork.txt'), (ResistorNetwork_2, 'ResistorNetwork_2.txt')):
+        Net = Cls()
+        Net.BuildNetworkFromFile(File)
+        def Solve():
+            with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # non-convergence is recorded in the report
+                Net.AnalyzeCircuit(report=True)
+            return Net.LastReport
+        Seconds, Peak, Report = Measure(Solve)
+        Records.append({'suite': 'HW6_1', 'case': '{}.AnalyzeCircuit'.format(Cls.__name__),
+                        'size': len(Net.Resistors), 'seconds': Seconds, 'peakMB': Peak / 1e6,
+                        'residualCalls': Report.counters.get('residual', 0), 'converged': Report.converged})
+
+    Sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10**4, 10**5]
+    for n in Sizes:
+        for Case, Build in (('ladder', lambda: LadderNetwork(n)), ('grid', lambda: GridNetwork(int(round(n ** 0.5))))):
+            BuildSeconds, BuildPeak, Net = Measure(Build, repeat=1)
+            Seconds, Peak, V = Measure(lambda: Net.AnalyzeCircuitMNA(printResults=False), repeat=1 if n >= 10**4 else 3)
+            Records.append({'suite': 'HW6_1', 'case': '{} AnalyzeCircuitMNA'.format(Case), 'size': len(V),
+                            'seconds': Seconds, 'peakMB': Peak / 1e6, 'buildSeconds': BuildSeconds,
+                            'buildPeakMB': BuildPeak / 1e6, 'resistors': len(Net.Resistors)})
+    return Records
+
+def PrintRecords(Records):
+    print('{:<40s} {:>8s} {:>12s} {:>10s}'.format('case', 'size', 'seconds', 'peak MB'))
+    for r in Records:
+        print('{:<40s} {:>8d} {:>12.5f} {:>10.2f}'.format(r['case'], r['size'], r['seconds'], r['peakMB']))
+
+def main(argv=None):
+    """
+    Runs the benchmarks and prints them.  Options: --quick (smaller sizes), --json PATH (also save the records).
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    Records = Benchmarks(quick='--quick' in argv)
+    PrintRecords(Records)
+    if '--json' in argv:
+        with open(argv[argv.index('--json') + 1], 'w') as f:
+            json.dump(Records, f, indent=1)
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
@@ -23,6 +23,12 @@ def main():
     Net_2.BuildNetworkFromFile("ResistorNetwork_2.txt")
     # Now analyze the second circuit
     IVals_2 = Net_2.AnalyzeCircuit()
+
+    # The same networks solved by modified nodal analysis straight from the netlists
+    print("\nNetwork 1 (nodal analysis):")
+    Net.AnalyzeCircuitMNA()
+    print("\nNetwork 2 (nodal analysis):")
+    Net_2.AnalyzeCircuitMNA()
 # endregion
 
 # region function calls
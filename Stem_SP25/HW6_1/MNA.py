@@ -0,0 +1,111 @@
+#region imports
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+#endregion
+
+#region function definitions
+def SplitElementName(name):
+    """
+    Splits an element name into its two node names.  Names are either two one-letter nodes
+    (e.g. 'ad') or two node names separated by a dash (e.g. 'n12-n13').
+    :param name: the element name
+    :return: tuple (first node, second node)
+    """
+    if '-' in name:
+        a, b = name.split('-', 1)
+        return a.strip(), b.strip()
+    if len(name) != 2:
+        raise ValueError("Element name '{}' must be two one-letter nodes or 'node1-node2'".format(name))
+    return name[0], name[1]
+
+def BuildMNASystem(Resistors, VSources):
+    """
+    Assembles the modified nodal analysis system A*x = b for a network of resistors and voltage sources.
+    The unknowns x are the node voltages (one grounded node per connected part of the network is
+    removed) followed by the currents through the voltage sources.
+    Sign conventions follow the netlist: a resistor current is positive when it flows from the first
+    to the second node of its name, and a source raises the voltage from its first to its second node.
+    :param Resistors: list of Resistor objects
+    :param VSources: list of VoltageSource objects
+    :return: (A as a sparse CSC matrix, b, dictionary of node name -> node index, boolean array of grounded nodes,
+              node index pairs of the resistors, node index pairs of the sources)
+    """
+    NodeIndex = {}
+    def Pairs(elements):
+        idx = np.empty((len(elements), 2), dtype=np.int64)
+        for k, e in enumerate(elements):
+            a, b = SplitElementName(e.Name)
+            idx[k, 0] = NodeIndex.setdefault(a, len(NodeIndex))
+            idx[k, 1] = NodeIndex.setdefault(b, len(NodeIndex))
+        return idx
+    RPairs = Pairs(Resistors)
+    VPairs = Pairs(VSources)
+    nNodes = len(NodeIndex)
+    nSources = len(VSources)
+
+    # ground the first node found in each connected part of the network
+    allPairs = np.vstack((RPairs, VPairs))
+    adjacency = coo_matrix((np.ones(len(allPairs)), (allPairs[:, 0], allPairs[:, 1])), shape=(nNodes, nNodes))
+    nParts, labels = connected_components(adjacency, directed=False)
+    grounded = np.zeros(nNodes, dtype=bool)
+    grounded[np.unique(labels, return_index=True)[1]] = True
+
+    # unknown number for each node voltage (-1 for grounded nodes)
+    unknown = np.full(nNodes, -1, dtype=np.int64)
+    unknown[~grounded] = np.arange(nNodes - nParts)
+    nV = nNodes - nParts
+
+    # conductance stamps of the resistors
+    g = 1.0 / np.array([r.Resistance for r in Resistors], dtype=float)
+    i, j = unknown[RPairs[:, 0]], unknown[RPairs[:, 1]]
+    rows = [i, j, i, j]
+    cols = [i, j, j, i]
+    vals = [g, g, -g, -g]
+
+    # voltage source stamps: source current leaves its first node and enters its second node
+    k = nV + np.arange(nSources)
+    ones = np.ones(nSources)
+    a, b = unknown[VPairs[:, 0]], unknown[VPairs[:, 1]]
+    rows += [a, k, b, k]
+    cols += [k, a, k, b]
+    vals += [ones, ones, -ones, -ones]
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    vals = np.concatenate(vals)
+    keep = (rows >= 0) & (cols >= 0)
+    n = nV + nSources
+    A = coo_matrix((vals[keep], (rows[keep], cols[keep])), shape=(n, n)).tocsc()
+
+    rhs = np.zeros(n)
+    rhs[nV:] = -np.array([v.Voltage for v in VSources], dtype=float)
+    return A, rhs, NodeIndex, grounded, RPairs, VPairs
+
+def SolveMNA(Resistors, VSources):
+    """
+    Solves a resistor network by modified nodal analysis with a sparse LU factorization and sets
+    the Current of every resistor and voltage source.
+    :param Resistors: list of Resistor objects
+    :param VSources: list of VoltageSource objects
+    :return: dictionary of node name -> node voltage (grounded nodes are at 0 V)
+    """
+    A, rhs, NodeIndex, grounded, RPairs, VPairs = BuildMNASystem(Resistors, VSources)
+    try:
+        # the MNA matrix is structurally symmetric, so order the columns on the pattern of A + A^T
+        x = splu(A, permc_spec='MMD_AT_PLUS_A').solve(rhs)
+    except RuntimeError as err:
+        raise ValueError("The network has no unique solution (e.g. a loop of voltage sources): {}".format(err))
+    nV = len(NodeIndex) - int(grounded.sum())
+    V = np.zeros(len(NodeIndex))
+    V[~grounded] = x[:nV]
+
+    IR = (V[RPairs[:, 0]] - V[RPairs[:, 1]]) / np.array([r.Resistance for r in Resistors], dtype=float)
+    for r, I in zip(Resistors, IR.tolist()):
+        r.Current = I
+        r.DeltaV()
+    for v, I in zip(VSources, x[nV:].tolist()):
+        v.Current = I
+    return dict(zip(NodeIndex.keys(), V.tolist()))
+#endregion
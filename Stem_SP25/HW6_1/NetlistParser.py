@@ -0,0 +1,97 @@
+#region imports
+import os
+import numpy as np
+#endregion
+
+#region function definitions
+def IterBlocks(filename):
+    """
+    Streams the tagged blocks of a netlist file, reading one line at a time so memory does not grow
+    with the file size.  Each block looks like
+        <Resistor>
+        Name = ad
+        Resistance = 2
+        </Resistor>
+    Blank lines, comment lines (starting with #) and text outside of blocks are skipped.
+    Everything is lower-cased, as the original parser did.
+    :param filename: the netlist file
+    :return: generator of (tag, dictionary of field name -> value text, line number of the opening tag)
+    """
+    tag = None
+    fields = None
+    start = 0
+    with open(filename, "r") as f:
+        for LineNum, line in enumerate(f, 1):
+            txt = line.strip().lower()
+            if len(txt) < 1 or txt[0] == '#':
+                continue
+            if txt[0] == '<' and txt[-1] == '>':
+                if txt[1] == '/':
+                    closing = txt[2:-1].strip()
+                    if tag is None:
+                        raise ValueError("{}:{}: </{}> without an opening tag".format(filename, LineNum, closing))
+                    if closing != tag:
+                        raise ValueError("{}:{}: expected </{}> to close the block opened on line {}, found </{}>"
+                                         .format(filename, LineNum, tag, start, closing))
+                    yield tag, fields, start
+                    tag = None
+                else:
+                    if tag is not None:
+                        raise ValueError("{}:{}: missing </{}> for the block opened on line {}"
+                                         .format(filename, LineNum, tag, start))
+                    tag = txt[1:-1].strip()
+                    fields = {}
+                    start = LineNum
+            elif tag is not None and '=' in txt:
+                key, value = txt.split('=', 1)
+                fields[key.strip()] = value.strip()
+    if tag is not None:
+        raise ValueError("{}: missing </{}> for the block opened on line {}".format(filename, tag, start))
+
+def SnapshotName(filename):
+    """
+    :return: the file name of the binary snapshot kept next to a netlist
+    """
+    return filename + '.npz'
+
+def FileStamp(filename):
+    """
+    :return: array of (modification time in ns, size in bytes) identifying the netlist contents
+    """
+    st = os.stat(filename)
+    return np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+def SaveSnapshot(filename, Resistors, VSources, Loops):
+    """
+    Writes the parsed network to a compact .npz file next to the netlist.
+    :param filename: the netlist file the elements were read from
+    :param Resistors: list of Resistor objects
+    :param VSources: list of VoltageSource objects
+    :param Loops: list of Loop objects
+    """
+    LoopNodes = [n for L in Loops for n in L.Nodes]
+    np.savez(SnapshotName(filename),
+             stamp=FileStamp(filename),
+             RNames=np.array([r.Name for r in Resistors], dtype=str),
+             RValues=np.array([r.Resistance for r in Resistors], dtype=float),
+             VNames=np.array([v.Name for v in VSources], dtype=str),
+             VValues=np.array([v.Voltage for v in VSources], dtype=float),
+             VTypes=np.array([getattr(v, 'Type', 'voltage') for v in VSources], dtype=str),
+             LNames=np.array([getattr(L, 'Name', '') for L in Loops], dtype=str),
+             LNodes=np.array(LoopNodes, dtype=str),
+             LOffsets=np.cumsum([0] + [len(L.Nodes) for L in Loops]).astype(np.int64))
+
+def LoadSnapshot(filename):
+    """
+    Reads the .npz snapshot of a netlist if it exists and the netlist has not changed since it was written.
+    :param filename: the netlist file
+    :return: dictionary of the snapshot arrays, or None if there is no up-to-date snapshot
+    """
+    snap = SnapshotName(filename)
+    if not os.path.exists(snap):
+        return None
+    with np.load(snap, allow_pickle=False) as data:
+        if not np.array_equal(data['stamp'], FileStamp(filename)):
+            return None
+        return {key: data[key] for key in data.files}
+#endregion
@@ -1,8 +1,18 @@
 #region imports
+import os
+import sys
+# the modules shared by the HW folders are in Stem_SP25
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import warnings
+import numpy as np
 from scipy.optimize import fsolve
 from Resistor import Resistor
 from VoltageSource import VoltageSource
 from Loop import Loop
+from MNA import SolveMNA, SplitElementName
+from NetlistParser import IterBlocks, LoadSnapshot, SaveSnapshot
+from CycleBasis import FundamentalCycles
+from SolveReport import SolveReport
 #endregion
 
 #region class definitions
@@ -16,100 +26,136 @@ class ResistorNetwork():
         self.Loops = []      # initialize an empty list of loop objects in the network
         self.Resistors = []  # initialize an empty list of resistor objects in the network
         self.VSources = []   # initialize an empty list of source objects in the network
+        # dictionaries of elements keyed by their sorted node pair, kept in sync by AddResistor/AddVSource
+        self.ResistorsByNodes = {}
+        self.VSourcesByNodes = {}
+        self.IndexedCounts = (0, 0)  # (len(self.Resistors), len(self.VSources)) when the dictionaries were built
+        self.LastReport = None  # SolveReport of the last AnalyzeCircuit(report=...) call
+        self.KirchoffJacobian = None  # constant Jacobian of GetKirchoffVals, see GetKirchoffJacobian
+        self.JacobianKey = None  # unknown count, elements and loops the Jacobian was probed with
         #endregion
     #endregion
 
     #region methods
-    def BuildNetworkFromFile(self, filename):
+    def BuildNetworkFromFile(self, filename, useSnapshot=False):
         """
-        Reads lines from a file and processes them to populate self.Loops, self.Resistors, self.VSources.
+        Reads the tagged blocks of a file in one streaming pass and processes them to populate
+        self.Loops, self.Resistors, self.VSources.
+        :param filename: the netlist file
+        :param useSnapshot: if True, load the binary snapshot of an unchanged netlist instead of parsing
+                            the text, and write a new snapshot after parsing a changed one
         """
-        FileTxt   = open(filename,"r").read().split('\n')
-        FileLength = len(FileTxt)
-        LineNum    = 0
         self.Resistors = []
         self.VSources  = []
         self.Loops     = []
-        while LineNum < FileLength:
-            lineTxt = FileTxt[LineNum].lower().strip()
-            if len(lineTxt) <1:
-                pass
-            elif lineTxt[0] == '#':
-                pass  # skip comment lines
-            elif "resistor" in lineTxt:
-                LineNum = self.MakeResistor(LineNum, FileTxt)
-            elif "source" in lineTxt:
-                LineNum = self.MakeVSource(LineNum, FileTxt)
-            elif "loop" in lineTxt:
-                LineNum = self.MakeLoop(LineNum, FileTxt)
-            LineNum += 1
-
-    def MakeResistor(self, N, Txt):
-        """
-        Make a resistor object from reading the text file
-        """
-        # JES Missing Code:
-        R = Resistor()      # instantiate a new resistor
-        N += 1              # move past the line that said <Resistor>
-        txt = Txt[N].lower()
-        while "resistor" not in txt:
-            if "name" in txt:
-                R.Name = txt.split('=')[1].strip()
-            if "resistance" in txt:
-                R.Resistance = float(txt.split('=')[1].strip())
-            N += 1
-            txt = Txt[N].lower()
+        self.RebuildIndex()
+        if useSnapshot:
+            data = LoadSnapshot(filename)
+            if data is not None:
+                self.BuildNetworkFromSnapshot(data)
+                return
+        for tag, fields, LineNum in IterBlocks(filename):
+            if tag == "resistor":
+                self.MakeResistor(fields)
+            elif tag == "source":
+                self.MakeVSource(fields)
+            elif tag == "loop":
+                self.MakeLoop(fields)
+        if useSnapshot:
+            SaveSnapshot(filename, self.Resistors, self.VSources, self.Loops)
 
-        self.Resistors.append(R)
-        return N
+    def BuildNetworkFromSnapshot(self, data):
+        """
+        Populates the network from the arrays returned by LoadSnapshot.
+        """
+        self.Resistors = [Resistor(R=R, name=name) for name, R in zip(data['RNames'].tolist(), data['RValues'].tolist())]
+        for name, V, Type in zip(data['VNames'].tolist(), data['VValues'].tolist(), data['VTypes'].tolist()):
+            VS = VoltageSource(V=V, name=name)
+            VS.Type = Type
+            self.VSources.append(VS)
+        self.RebuildIndex()
+        nodes = data['LNodes'].tolist()
+        offsets = data['LOffsets'].tolist()
+        for k, name in enumerate(data['LNames'].tolist()):
+            L = Loop()
+            L.Name = name
+            L.Nodes = nodes[offsets[k]:offsets[k + 1]]
+            self.Loops.append(L)
 
-    def MakeVSource (self, N, Txt):
+    def MakeResistor(self, fields):
         """
-        Make a voltage source object from reading the text file
+        Make a resistor object from the fields of a <Resistor> block
         """
-        VS = VoltageSource()
-        N += 1
-        txt = Txt[N].lower()
-        while "source" not in txt:
-            if "name" in txt:
-                VS.Name = txt.split('=')[1].strip()
-            if "value" in txt:
-                VS.Voltage = float(txt.split('=')[1].strip())
-            if "type" in txt:
-                VS.Type = txt.split('=')[1].strip()
-            N += 1
-            txt = Txt[N].lower()
+        R = Resistor()      # instantiate a new resistor
+        if "name" in fields:
+            R.Name = fields["name"]
+        if "resistance" in fields:
+            R.Resistance = float(fields["resistance"])
+        self.AddResistor(R)
+        return R
 
-        self.VSources.append(VS)
-        return N
+    def MakeVSource(self, fields):
+        """
+        Make a voltage source object from the fields of a <Source> block
+        """
+        VS = VoltageSource()
+        if "name" in fields:
+            VS.Name = fields["name"]
+        if "value" in fields:
+            VS.Voltage = float(fields["value"])
+        if "type" in fields:
+            VS.Type = fields["type"]
+        self.AddVSource(VS)
+        return VS
 
-    def MakeLoop(self, N, Txt):
+    def MakeLoop(self, fields):
         """
-        Make a Loop object from reading the text file
+        Make a Loop object from the fields of a <Loop> block
         """
         L = Loop()
-        N += 1
-        txt = Txt[N].lower()
-        while "loop" not in txt:
-            if "name" in txt:
-                L.Name = txt.split('=')[1].strip()
-            if "nodes" in txt:
-                # e.g. "nodes=a,b,c,d"
-                txt = txt.replace(" ","")
-                L.Nodes = txt.split('=')[1].strip().split(',')
-            N += 1
-            txt = Txt[N].lower()
-
+        if "name" in fields:
+            L.Name = fields["name"]
+        if "nodes" in fields:
+            # e.g. "nodes=a,b,c,d"
+            L.Nodes = fields["nodes"].replace(" ", "").split(',')
         self.Loops.append(L)
-        return N
+        return L
+
+    def BuildLoops(self):
+        """
+        Replaces self.Loops with an independent set of loops found from the network topology (a fundamental
+        cycle basis of the resistors and sources), so loops do not have to be listed in the netlist.
+        Elements in parallel between the same two nodes are one connection in a node-list loop, so they
+        count as a single edge here.  Each loop is rotated so that, where possible, the closing connection
+        (last node back to first, which GetLoopVoltageDrops reads in reverse) is a resistor rather than a source.
+        Note that the hand-written GetKirchoffVals equations assume particular loop directions; the
+        topology-independent solver is AnalyzeCircuitMNA.
+        :return: the new list of Loop objects
+        """
+        self.CheckIndex()
+        pairs = list(dict.fromkeys(list(self.ResistorsByNodes) + list(self.VSourcesByNodes)))
+        pairs = [p for p in pairs if len(p) == 2]
+        self.Loops = []
+        for nodes, edges in FundamentalCycles(pairs):
+            for k in range(len(edges)):
+                if pairs[edges[k - 1]] in self.ResistorsByNodes:
+                    # edge k-1 joins nodes[k-1] and nodes[k]; start at nodes[k] so it closes the loop
+                    nodes = nodes[k:] + nodes[:k]
+                    break
+            L = Loop()
+            L.Name = "l{}".format(len(self.Loops) + 1)
+            L.Nodes = nodes
+            self.Loops.append(L)
+        return self.Loops
 
-    def AnalyzeCircuit(self):
+    def AnalyzeCircuit(self, report=None):
         """
         Use fsolve to find currents in the original resistor network (3 unknowns: I1, I2, I3).
+        :param report: True or a SolveReport to record the solve (see SolveKirchoff)
         """
         # JES Missing Code: define an initial guess for i = [I1, I2, I3]
         i0 = [0.1, 0.1, 0.1]   # just a simple guess
-        i  = fsolve(self.GetKirchoffVals, i0)
+        i  = self.SolveKirchoff(i0, report)
 
         # Print the results
         print("I1 = {:0.2f} A".format(i[0]))
@@ -117,6 +163,69 @@ class ResistorNetwork():
         print("I3 = {:0.2f} A".format(i[2]))
         return i
 
+    def SolveKirchoff(self, i0, report=None):
+        """
+        Runs fsolve on self.GetKirchoffVals from the initial guess i0, keeping fsolve's full output.
+        The constant Jacobian from GetKirchoffJacobian is passed as fprime, so fsolve does not estimate it
+        by finite differences.
+        :param i0: initial guess of the unknown currents
+        :param report: True or a SolveReport to record the residual calls, fsolve time, final residual
+                       norm, convergence flag and message (kept in self.LastReport)
+        :return: the currents
+        """
+        if report is not None and report is not False:
+            if report is True:
+                report = SolveReport('{}.AnalyzeCircuit'.format(type(self).__name__))
+            self.LastReport = report
+            with report:
+                return self.SolveKirchoff(i0)
+        report = SolveReport.active
+        J = self.GetKirchoffJacobian(len(i0))
+        fn = self.GetKirchoffVals if report is None else report.counted(self.GetKirchoffVals)
+        with SolveReport.section('fsolve'):
+            i, info, ier, msg = fsolve(fn, i0, fprime=lambda i: J, full_output=True)
+        SolveReport.outcome(info['nfev'], np.max(np.abs(info['fvec'])), ier == 1, msg)
+        if ier != 1:
+            # full_output turns off fsolve's own warning
+            warnings.warn(msg, RuntimeWarning)
+        return i
+
+    def GetKirchoffJacobian(self, n):
+        """
+        The KCL/KVL residuals are linear in the currents, GetKirchoffVals(i) = J i + c, so the Jacobian is a
+        constant matrix.  It is probed column by column from n + 1 residual evaluations and kept until the
+        number of unknowns, the loops, or the names, order or values of the elements change, so later solves
+        need no probing.
+        :param n: number of unknown currents
+        :return: the Jacobian, an array of shape (number of equations, n)
+        """
+        key = (n, tuple((R.Name, R.Resistance) for R in self.Resistors),
+               tuple((V.Name, V.Voltage) for V in self.VSources), tuple(tuple(L.Nodes) for L in self.Loops))
+        if self.JacobianKey != key:
+            c = np.array(self.GetKirchoffVals(np.zeros(n)), dtype=float)
+            J = np.empty((len(c), n))
+            for k in range(n):
+                e = np.zeros(n)
+                e[k] = 1.0
+                J[:, k] = np.array(self.GetKirchoffVals(e), dtype=float) - c
+            SolveReport.tally('jacobian probe', n + 1)
+            self.KirchoffJacobian, self.JacobianKey = J, key
+        return self.KirchoffJacobian
+
+    def AnalyzeCircuitMNA(self, printResults=True):
+        """
+        Solve any network built by BuildNetworkFromFile by modified nodal analysis.  The linear system is
+        assembled directly from self.Resistors and self.VSources, so no hand-written equations are needed.
+        Each resistor current is positive from the first to the second node of its name.
+        :param printResults: print the current through every resistor
+        :return: dictionary of node name -> node voltage
+        """
+        V = SolveMNA(self.Resistors, self.VSources)
+        if printResults:
+            for r in self.Resistors:
+                print("I_{} = {:0.2f} A".format(r.Name, r.Current))
+        return V
+
     def GetKirchoffVals(self, i):
         """
         Returns the system of KCL/KVL equations for the first (left) circuit
@@ -148,21 +257,21 @@ class ResistorNetwork():
         If we find a resistor with matching name, we return -R.DeltaV() so that
         the direction of traversal is consistent with the code in GetLoopVoltageDrops.
         If we find a voltage source, we return either +V or -V depending on direction.
+        Both lookups are dictionary hits on the sorted node pair, in either node order.
         """
+        self.CheckIndex()
+        key = self.NodeKey(name)
         # Resistors
-        for r in self.Resistors:
-            if name == r.Name:
-                return -r.DeltaV()
-            # Also check reversed name (e.g. "ab" vs "ba")
-            if name[::-1] == r.Name:
-                return -r.DeltaV()
+        r = self.ResistorsByNodes.get(key)
+        if r is not None:
+            return -r.DeltaV()
 
         # Voltage sources
-        for v in self.VSources:
-            if name == v.Name:
+        v = self.VSourcesByNodes.get(key)
+        if v is not None:
+            if self.SameDirection(name, v.Name):
                 return v.Voltage
-            if name[::-1] == v.Name:
-                return -v.Voltage
+            return -v.Voltage
 
     def GetLoopVoltageDrops(self):
         """
@@ -175,22 +284,92 @@ class ResistorNetwork():
             for n in range(len(L.Nodes)):
                 if n == len(L.Nodes)-1:
                     # last node connects back to the first
-                    name = L.Nodes[0] + L.Nodes[n]
+                    name = self.JoinNodes(L.Nodes[0], L.Nodes[n])
                 else:
                     # connect node n to node n+1
-                    name = L.Nodes[n] + L.Nodes[n+1]
+                    name = self.JoinNodes(L.Nodes[n], L.Nodes[n+1])
                 loopDeltaV += self.GetElementDeltaV(name)
             loopVoltages.append(loopDeltaV)
         return loopVoltages
 
     def GetResistorByName(self, name):
         """
-        Returns a resistor object from self.Resistors based on matching name
+        Returns a resistor object from self.Resistors based on matching name.  The node-pair dictionary
+        holds the first resistor between two nodes, so a parallel resistor ('da' next to 'ad') is found
+        by scanning the list.
         """
+        self.CheckIndex()
+        r = self.ResistorsByNodes.get(self.NodeKey(name))
+        if r is None or r.Name == name:
+            return r  # None if not found
         for r in self.Resistors:
             if r.Name == name:
                 return r
-        return None  # if not found
+        return None
+
+    def AddResistor(self, R):
+        """
+        Appends a resistor to self.Resistors and indexes it by its node pair.
+        """
+        self.CheckIndex()
+        self.Resistors.append(R)
+        self.ResistorsByNodes.setdefault(self.NodeKey(R.Name), R)
+        self.IndexedCounts = (len(self.Resistors), len(self.VSources))
+
+    def AddVSource(self, VS):
+        """
+        Appends a voltage source to self.VSources and indexes it by its node pair.
+        """
+        self.CheckIndex()
+        self.VSources.append(VS)
+        self.VSourcesByNodes.setdefault(self.NodeKey(VS.Name), VS)
+        self.IndexedCounts = (len(self.Resistors), len(self.VSources))
+
+    def RebuildIndex(self):
+        """
+        Rebuilds the node-pair dictionaries from self.Resistors and self.VSources.  The first element
+        with a given node pair wins, which is what the old linear scans returned.
+        """
+        self.ResistorsByNodes = {}
+        self.VSourcesByNodes = {}
+        for r in self.Resistors:
+            self.ResistorsByNodes.setdefault(self.NodeKey(r.Name), r)
+        for v in self.VSources:
+            self.VSourcesByNodes.setdefault(self.NodeKey(v.Name), v)
+        self.IndexedCounts = (len(self.Resistors), len(self.VSources))
+
+    def CheckIndex(self):
+        """
+        Rebuilds the dictionaries if elements were appended to the lists directly.
+        """
+        if self.IndexedCounts != (len(self.Resistors), len(self.VSources)):
+            self.RebuildIndex()
+
+    @staticmethod
+    def NodeKey(name):
+        """
+        Canonical dictionary key of an element name: its two node names in sorted order.
+        """
+        try:
+            return tuple(sorted(SplitElementName(name)))
+        except ValueError:
+            return (name,)
+
+    @staticmethod
+    def SameDirection(name1, name2):
+        """
+        True if two names of the same element list their nodes in the same order.
+        """
+        return SplitElementName(name1) == SplitElementName(name2)
+
+    @staticmethod
+    def JoinNodes(a, b):
+        """
+        Element name of the connection a->b: 'ab' for one-letter nodes, otherwise 'a-b'.
+        """
+        if len(a) == 1 and len(b) == 1:
+            return a + b
+        return a + '-' + b
     #endregion
 
 # --------------------------------------------------------------------
@@ -208,15 +387,16 @@ class ResistorNetwork_2(ResistorNetwork):
     #endregion
 
     #region methods
-    def AnalyzeCircuit(self):
+    def AnalyzeCircuit(self, report=None):
         """
         Use fsolve for the second circuit, which presumably has 5 unknowns
         (I1, I2, I3, I4, I5) if you have added a resistor in parallel with
         the 32V source and possibly have more nodes/loops.
+        :param report: True or a SolveReport to record the solve (see SolveKirchoff)
         """
         # Example initial guess for 5 unknown currents:
         i0 = [0.1, 0.1, 0.1, 0.1, 0.1]
-        i  = fsolve(self.GetKirchoffVals, i0)
+        i  = self.SolveKirchoff(i0, report)
 
         print("I1 = {:0.2f} A".format(i[0]))
         print("I2 = {:0.2f} A".format(i[1]))
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from Resistor import Resistor
+from ResistorNetwork import ResistorNetwork, ResistorNetwork_2
+
+def probedJacobian(Net, n):
+    # the Jacobian of a fresh probe, bypassing the cache
+    Net.JacobianKey = None
+    return Net.GetKirchoffJacobian(n).copy()
+
+def testJacobianFollowsTopology():
+    # the cached Jacobian is probed again when the loops change
+    Net = ResistorNetwork()
+    Net.BuildNetworkFromFile("ResistorNetwork.txt")
+    Net.AnalyzeCircuit()
+    Net.Loops[1].Nodes = ['c', 'e', 'd']  # loop L2 traversed the other way
+    assert np.array_equal(Net.GetKirchoffJacobian(3), probedJacobian(Net, 3))
+    Net.BuildLoops()
+    assert np.array_equal(Net.GetKirchoffJacobian(3), probedJacobian(Net, 3))
+    Net.Loops.reverse()
+    assert np.array_equal(Net.GetKirchoffJacobian(3), probedJacobian(Net, 3))
+
+def testParallelResistorByName():
+    # both of two parallel resistors between the same nodes are found by name
+    Net = ResistorNetwork()
+    Net.BuildNetworkFromFile("ResistorNetwork.txt")
+    Net.AddResistor(Resistor(R=3.0, name='da'))
+    assert Net.GetResistorByName('ad').Resistance == 2.0
+    assert Net.GetResistorByName('da').Resistance == 3.0
+    assert Net.GetResistorByName('ae') is None and Net.GetResistorByName('ac') is None
+
+def checkNodeVoltages(Net, V):
+    # the MNA currents follow Ohm's law and the sources set the voltage between their nodes
+    for r in Net.Resistors:
+        assert abs(r.Current - (V[r.Name[0]] - V[r.Name[1]]) / r.Resistance) < 1e-9, r.Name
+    for VS in Net.VSources:
+        assert abs(V[VS.Name[1]] - V[VS.Name[0]] - VS.Voltage) < 1e-9, VS.Name
+
+def testMNAMatchesFsolve():
+    # nodal analysis gives the currents fsolve finds for the first circuit.  The hand-written equations
+    # take I1 through 'ad' from d to a and I2 through 'ce' from e to c, the reverse of the MNA convention
+    Net = ResistorNetwork()
+    Net.BuildNetworkFromFile("ResistorNetwork.txt")
+    Net.AnalyzeCircuit()
+    fsolveCurrents = np.array([r.Current for r in Net.Resistors])
+    V = Net.AnalyzeCircuitMNA(printResults=False)
+    assert [r.Name for r in Net.Resistors] == ['ad', 'bc', 'cd', 'ce']
+    assert np.allclose([r.Current for r in Net.Resistors], [-1, 1, 1, -1] * fsolveCurrents, atol=1e-9)
+    checkNodeVoltages(Net, V)
+    # the hand-written equations of the second circuit are incomplete, so only MNA is checked there
+    Net_2 = ResistorNetwork_2()
+    Net_2.BuildNetworkFromFile("ResistorNetwork_2.txt")
+    checkNodeVoltages(Net_2, Net_2.AnalyzeCircuitMNA(printResults=False))
+
+def writeNetlist(folder, text):
+    # a netlist file with the given contents
+    filename = os.path.join(folder, 'net.txt')
+    with open(filename, 'w') as f:
+        f.write(text)
+    return filename
+
+def testBadTags():
+    # a block that is not closed properly raises ValueError naming the file and line
+    cases = (("<Resistor>\nName = ad\n<Resistor>\n", ':3: missing </resistor> for the block opened on line 1'),
+             ("<Resistor>\nName = ad\n</Source>\n",
+              ':3: expected </resistor> to close the block opened on line 1, found </source>'),
+             ("\n</Loop>\n", ':2: </loop> without an opening tag'),
+             ("<Loop>\nNodes = a,b\n", ': missing </loop> for the block opened on line 1'))
+    folder = tempfile.mkdtemp()
+    try:
+        for text, message in cases:
+            filename = writeNetlist(folder, text)
+            try:
+                ResistorNetwork().BuildNetworkFromFile(filename)
+            except ValueError as e:
+                assert str(e) == filename + message, str(e)
+            else:
+                raise AssertionError('no ValueError for ' + repr(text))
+    finally:
+        shutil.rmtree(folder)
+
+def editNetlist(filename, old, new, keepTime=True):
+    # replace text in the netlist, keeping its modification time unless keepTime is False
+    stamp = os.stat(filename).st_mtime_ns
+    with open(filename) as f:
+        text = f.read()
+    with open(filename, 'w') as f:
+        f.write(text.replace(old, new, 1))
+    os.utime(filename, ns=(stamp, stamp) if keepTime else (stamp + 10**9, stamp + 10**9))
+
+def testSnapshot():
+    # the snapshot of an unchanged netlist is loaded in place of the text, and is rebuilt when the
+    # netlist's modification time or size changes
+    folder = tempfile.mkdtemp()
+    try:
+        with open("ResistorNetwork.txt") as f:
+            filename = writeNetlist(folder, f.read())
+        Net = ResistorNetwork()
+        Net.BuildNetworkFromFile(filename, useSnapshot=True)
+        assert os.path.exists(filename + '.npz')
+        Net.AnalyzeCircuit()
+        currents = [r.Current for r in Net.Resistors]
+        # same time and size: the snapshot is used, so the edit is not seen
+        editNetlist(filename, 'Resistance = 2', 'Resistance = 3')
+        Net.BuildNetworkFromFile(filename, useSnapshot=True)
+        assert [r.Resistance for r in Net.Resistors] == [2.0, 2.0, 1.0, 4.0]
+        assert [L.Nodes for L in Net.Loops] == [['a', 'b', 'c', 'd'], ['c', 'd', 'e']]
+        assert [(VS.Name, VS.Voltage, VS.Type) for VS in Net.VSources] == [('de', 32.0, 'voltage'),
+                                                                          ('ab', 16.0, 'voltage')]
+        Net.AnalyzeCircuit()
+        assert np.allclose([r.Current for r in Net.Resistors], currents, atol=1e-12)
+        # new modification time
+        editNetlist(filename, 'Resistance = 3', 'Resistance = 3', keepTime=False)
+        Net.BuildNetworkFromFile(filename, useSnapshot=True)
+        assert Net.GetResistorByName('ad').Resistance == 3.0
+        # new size at the same modification time
+        editNetlist(filename, 'Resistance = 3', 'Resistance = 30')
+        Net.BuildNetworkFromFile(filename, useSnapshot=True)
+        assert Net.GetResistorByName('ad').Resistance == 30.0
+        Net.BuildNetworkFromFile(filename, useSnapshot=True)
+        assert Net.GetResistorByName('ad').Resistance == 30.0
+    finally:
+        shutil.rmtree(folder)
+
+def main():
+    testJacobianFollowsTopology()
+    testParallelResistorByName()
+    testMNAMatchesFsolve()
+    testBadTags()
+    testSnapshot()
+    print('Test_resistor: all checks passed')
+
+if __name__ == "__main__":
+    main()
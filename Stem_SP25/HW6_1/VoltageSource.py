@@ -10,6 +10,7 @@ class VoltageSource():
         #region attributes
         self.Voltage = V
         self.Name    = name
+        self.Current = 0.0  # current through the source from its first to its second node (set by SolveMNA)
         #endregion
     #endregion
 #endregion
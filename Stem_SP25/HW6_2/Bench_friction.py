@@ -0,0 +1,38 @@
+# region imports
+import time
+import numpy as np
+import Friction
+# endregion
+
+# region function definitions
+def main():
+    rng = np.random.default_rng(0)
+    # reference points: the fsolve solve is slow, so compare on a moderate sample
+    n = 2000
+    Re = 10 ** rng.uniform(np.log10(4000.0), 8.0, n)
+    rr = 10 ** rng.uniform(-6.0, np.log10(0.05), n)
+    start = time.perf_counter()
+    ref = Friction.colebrookFsolve(Re, rr)
+    tRef = (time.perf_counter() - start) / n
+    print('{:>12s} {:>14s} {:>14s}'.format('method', 'max rel error', 'time/eval (us)'))
+    print('{:>12s} {:>14s} {:>14.3f}'.format('fsolve', '(reference)', tRef * 1e6))
+
+    # timing on a large vectorized batch
+    N = 10 ** 6
+    ReBig = 10 ** rng.uniform(np.log10(4000.0), 8.0, N)
+    rrBig = 10 ** rng.uniform(-6.0, np.log10(0.05), N)
+    for method in Friction.METHODS[:-1]:
+        f = Friction.turbulentFrictionFactor(Re, rr, method)
+        err = np.max(np.abs(f - ref) / ref)
+        start = time.perf_counter()
+        Friction.turbulentFrictionFactor(ReBig, rrBig, method)
+        t = (time.perf_counter() - start) / N
+        print('{:>12s} {:>14.2e} {:>14.3f}'.format(method, err, t * 1e6))
+    f = Friction.colebrook(Re, rr, iterations=1)
+    print('{:>12s} {:>14.2e} {:>14s}'.format('colebrook/1', np.max(np.abs(f - ref) / ref), '(1 step)'))
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
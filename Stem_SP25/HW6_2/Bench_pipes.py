@@ -0,0 +1,129 @@
+# region imports
+import sys
+import json
+import time
+import tracemalloc
+import warnings
+from Fluid import Fluid
+from PipeNetwork import PipeNetwork
+# endregion
+
+# region function definitions
+def measure(fn, repeat=3):
+    '''
+    Best wall time of repeat calls of fn, then the peak traced memory of one more call.
+    :return: (seconds, peak bytes, result of the last call)
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def gridNetwork(k, supply=100.0):
+    '''
+    Synthetic k x k grid of 100 m, 200 mm pipes fed at one corner and drained at the other three.
+    :return: a PipeNetwork with 2k(k-1) pipes and its nodes built
+    '''
+    PN = PipeNetwork(fluid=Fluid(mu=0.00089, rho=1000))
+    name = lambda i, j: 'n{}_{}'.format(i, j)
+    start, end = [], []
+    for i in range(k):
+        for j in range(k):
+            if i + 1 < k:
+                start.append(name(i, j))
+                end.append(name(i + 1, j))
+            if j + 1 < k:
+                start.append(name(i, j))
+                end.append(name(i, j + 1))
+    PN.addPipes(start, end, 100.0, 200.0, 0.00025)
+    PN.buildNodes()
+    PN.getNode(name(0, 0)).extFlow = supply
+    for n in (name(k - 1, 0), name(0, k - 1), name(k - 1, k - 1)):
+        PN.getNode(n).extFlow = -supply / 3.0
+    return PN
+
+def ladderNetwork(n, supply=100.0):
+    '''
+    Synthetic looped main: two parallel lines of n nodes joined by a cross pipe at every node, so the network
+    has n - 1 short independent loops.  Fed at one end, drained at the other.
+    :return: a PipeNetwork with 3n - 2 pipes and its nodes built
+    '''
+    PN = PipeNetwork(fluid=Fluid(mu=0.00089, rho=1000))
+    start, end, D = [], [], []
+    for i in range(n):
+        if i + 1 < n:
+            start += ['a{}'.format(i), 'b{}'.format(i)]
+            end += ['a{}'.format(i + 1), 'b{}'.format(i + 1)]
+            D += [300.0, 250.0]
+        start.append('a{}'.format(i))
+        end.append('b{}'.format(i))
+        D.append(150.0)
+    PN.addPipes(start, end, 100.0, D, 0.00025)
+    PN.buildNodes()
+    PN.getNode('a0').extFlow = supply
+    PN.getNode('b{}'.format(n - 1)).extFlow = -supply
+    return PN
+
+def benchmarks(quick=False):
+    '''
+    Times PipeNetwork.findFlowRates on grid and ladder networks: fsolve up to about 60 pipes, the vectorized
+    Newton (loop) solver up to 10^4 pipes and the global gradient solver up to 10^5 pipes
+    (sizes are capped at 10^3 pipes with quick=True).
+    :return: list of result records (dictionaries)
+    '''
+    records = []
+    sizes = [10, 50, 100, 1000] if quick else [10, 50, 100, 1000, 10**4, 10**5]
+    for n in sizes:
+        for case, build in (('grid', lambda: gridNetwork(max(2, int(round((n / 2.0) ** 0.5))))),
+                            ('ladder', lambda: ladderNetwork(max(2, (n + 2) // 3)))):
+            buildSeconds, buildPeak, PN = measure(build, repeat=1)
+            methods = ['gga']
+            if n <= 10**4:
+                methods.insert(0, 'newton')
+            if n <= 60:
+                methods.insert(0, 'fsolve')
+            if 'fsolve' in methods or 'newton' in methods:
+                PN.buildLoops()
+            for method in methods:
+                def solve():
+                    with warnings.catch_warnings():  # non-convergence is recorded in the report
+                        warnings.simplefilter('ignore', RuntimeWarning)
+                        PN.findFlowRates(method, warmStart=False, report=True)
+                    return PN.lastReport
+                repeat = 1 if n >= 10**4 or method == 'fsolve' else 3
+                seconds, peak, report = measure(solve, repeat)
+                records.append({'suite': 'HW6_2', 'case': '{} findFlowRates({})'.format(case, method),
+                                 'size': len(PN.pipes), 'seconds': seconds, 'peakMB': peak / 1e6,
+                                 'buildSeconds': buildSeconds, 'buildPeakMB': buildPeak / 1e6,
+                                 'iterations': report.iterations, 'converged': report.converged,
+                                 'residualNorm': report.residualNorm, 'counters': dict(report.counters)})
+    return records
+
+def printRecords(records):
+    print('{:<40s} {:>8s} {:>12s} {:>10s} {:>6s}'.format('case', 'size', 'seconds', 'peak MB', 'iters'))
+    for r in records:
+        print('{:<40s} {:>8d} {:>12.5f} {:>10.2f} {:>6d}'.format(r['case'], r['size'], r['seconds'], r['peakMB'],
+                                                                 r['iterations']))
+
+def main(argv=None):
+    '''
+    Runs the benchmarks and prints them.  Options: --quick (smaller sizes), --json PATH (also save the records).
+    '''
+    argv = sys.argv[1:] if argv is None else argv
+    records = benchmarks(quick='--quick' in argv)
+    printRecords(records)
+    if '--json' in argv:
+        with open(argv[argv.index('--json') + 1], 'w') as f:
+            json.dump(records, f, indent=1)
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
@@ -0,0 +1,123 @@
+#region imports
+import os
+import sys
+# the modules shared by the HW folders are in Stem_SP25
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import csv
+import time
+import numpy as np
+from PipeSolver import PipeArrays
+from SolveReport import SolveReport
+#endregion
+
+#region function definitions
+def runExtendedPeriod(network, times, nodes, demands, supply=None, method='gga', tol=1e-9, maxiter=50,
+                      callback=None, filename=None, heads=False, progress=None):
+    '''
+    Extended-period simulation: solve the network once per timestep of a demand schedule.  The network is
+    compiled once (PipeArrays); every step only replaces the external flows and is warm-started from the
+    flows (and, for 'gga', node heads) of the previous step.  Results are handed to the callback and/or
+    written to a CSV file one row per step as they are solved, so nothing is kept for the whole schedule.
+    The network itself is not changed.
+    :param network: a PipeNetwork with its nodes built (loops are needed for method='newton')
+    :param times: the time of every step (any label, e.g. hours); zipped with demands, so generators work
+    :param nodes: names of the nodes whose external flow is scheduled; the other nodes keep theirs
+    :param demands: one row per step with the external flow of each of the nodes (L/s, + into the node),
+                    e.g. an array of shape (steps, len(nodes)) or an iterator of rows
+    :param supply: optional node name(s) that take up the imbalance of their connected part at every step
+                   (shared equally), e.g. the reservoirs; every part without one must balance by itself
+    :param method: 'gga' or 'newton' (see PipeArrays.solveHeads and solveLoops)
+    :param tol: convergence tolerance on the largest residual
+    :param maxiter: maximum number of iterations per step
+    :param callback: optional callable callback(t, Q, H, iterations, converged) called after every step;
+                     Q are the flows of arrays.pipes in L/s and H the node heads (None for 'newton')
+    :param filename: optional CSV file for the flows: time, converged, then one column per pipe (by name),
+                     then one per node head if heads=True
+    :param heads: also write the node heads (method='gga' only)
+    :param progress: optional callable progress(steps done)
+    :return: dictionary with steps, failed, iterations (total), firstIterations (the first step's count),
+             seconds and stepsPerSecond
+    '''
+    if method not in ('gga', 'newton'):
+        raise ValueError("method must be 'gga' or 'newton', not {!r}".format(method))
+    with SolveReport.section('compile'):
+        arrays = PipeArrays(network)
+    try:
+        cols = np.array([arrays.nodeIndex[n] for n in nodes], dtype=np.int64)
+    except KeyError as err:
+        raise ValueError('node {} is not in the network'.format(err)) from None
+    supplyIdx = None
+    # parts without a supply node must balance by themselves at every step
+    unsupplied = np.ones(arrays.nParts, dtype=bool)
+    if supply is not None:
+        supply = [supply] if isinstance(supply, str) else list(supply)
+        supplyIdx = np.array([arrays.nodeIndex[n] for n in supply], dtype=np.int64)
+        count = np.bincount(arrays.parts[supplyIdx], minlength=arrays.nParts)
+        unsupplied = count == 0
+    base = arrays.extFlow.copy()
+
+    warm = network.solved
+    Q = np.array([p.Q for p in arrays.pipes], dtype=float) if warm else None
+    H = np.array([network.nodeHeads.get(n, 0.0) for n in arrays.nodeNames]) if warm and method == 'gga' else None
+    writeHeads = heads and method == 'gga'
+    summary = {'steps': 0, 'failed': 0, 'iterations': 0, 'firstIterations': None}
+    f = None
+    writer = None
+    start = time.perf_counter()
+    try:
+        if filename is not None:
+            f = open(filename, 'w', newline='')
+            writer = csv.writer(f)
+            writer.writerow(['time', 'converged'] + [p.Name() for p in arrays.pipes] +
+                            (['H_' + n for n in arrays.nodeNames] if writeHeads else []))
+        for t, row in zip(times, demands):
+            extFlow = base.copy()
+            extFlow[cols] = row
+            imbalance = np.bincount(arrays.parts, weights=extFlow, minlength=arrays.nParts)
+            if np.max(np.abs(imbalance[unsupplied]), initial=0.0) > max(tol, 1e-9 * np.max(np.abs(extFlow))):
+                raise ValueError('the external flows at time {} do not balance (net {:.6g} L/s in the parts '
+                                 'without a supply node); name the supply nodes'
+                                 .format(t, float(np.sum(imbalance[unsupplied]))))
+            if supplyIdx is not None:
+                extFlow[supplyIdx] -= imbalance[arrays.parts[supplyIdx]] / count[arrays.parts[supplyIdx]]
+            arrays.extFlow = extFlow
+            with SolveReport.section(method):
+                if method == 'gga':
+                    Qn, Hn, iterations, converged = arrays.solveHeads(Q, tol=tol, maxiter=maxiter, H0=H)
+                else:
+                    Qn, iterations, converged = arrays.solveLoops(Q, tol=tol, maxiter=maxiter)
+                    Hn = None
+            if converged:
+                # a step that failed is not used as the next starting point
+                Q, H = Qn, Hn
+            else:
+                summary['failed'] += 1
+            summary['steps'] += 1
+            summary['iterations'] += int(iterations)
+            if summary['firstIterations'] is None:
+                summary['firstIterations'] = int(iterations)
+            with SolveReport.section('output'):
+                if callback is not None:
+                    callback(t, Qn, Hn, iterations, converged)
+                if writer is not None:
+                    writer.writerow([t, int(converged)] + Qn.tolist() + (Hn.tolist() if writeHeads else []))
+            if progress is not None:
+                progress(summary['steps'])
+    finally:
+        if f is not None:
+            f.close()
+    summary['seconds'] = time.perf_counter() - start
+    summary['stepsPerSecond'] = summary['steps'] / summary['seconds'] if summary['seconds'] > 0 else float('nan')
+    return summary
+
+def patternDemands(base, pattern):
+    '''
+    EPANET-style demand pattern: the scheduled external flows are the base flows times a multiplier per step.
+    :param base: base external flow of each scheduled node (L/s)
+    :param pattern: multiplier of every step, or an array (steps, nodes) of multipliers per node
+    :return: array (steps, nodes) of external flows for runExtendedPeriod
+    '''
+    base = np.asarray(base, dtype=float)
+    pattern = np.asarray(pattern, dtype=float)
+    return pattern[:, None] * base if pattern.ndim == 1 else pattern * base
+#endregion
@@ -0,0 +1,188 @@
+#region imports
+import numpy as np
+from scipy.optimize import fsolve
+#endregion
+
+#region function definitions
+LN10 = np.log(10.0)
+METHODS = ('colebrook', 'serghides', 'haaland', 'swamee-jain', 'fsolve')
+# transitional-flow (2000 < Re < 4000) models:
+#   'smooth' - deterministic blend of laminar and turbulent with a smoothstep weight, so f and df/dRe are continuous
+#   'linear' - deterministic linear blend (the mean of the original random model)
+#   'seeded' - smooth blend scaled by (1 + 0.2*z*4t(1-t)), t = (Re-2000)/2000, with a standard-normal z fixed per
+#              pipe for a whole solve; the scatter is the original 20% mid-band and tapers to 0 at both ends so
+#              f stays continuous and Newton solves converge (z is clipped to +-3)
+#   'random' - the original model: a fresh normal draw (sigma = 20% of the linear blend) on every call
+TRANSITIONS = ('smooth', 'linear', 'seeded', 'random')
+
+def swameeJain(Re, rr):
+    '''
+    Swamee-Jain explicit approximation of Colebrook (within 3% for 5000 <= Re <= 1e8 and rr <= 0.01).
+    :param Re: Reynolds number(s)
+    :param rr: relative roughness
+    :return: Darcy friction factor(s)
+    '''
+    return 0.25 / np.log10(rr / 3.7 + 5.74 / Re ** 0.9) ** 2
+
+def haaland(Re, rr):
+    '''
+    Haaland explicit approximation of Colebrook (within 1.5% for 5000 <= Re <= 1e8 and rr <= 0.01).
+    '''
+    return (-1.8 * np.log10((rr / 3.7) ** 1.11 + 6.9 / Re)) ** -2
+
+def serghides(Re, rr):
+    '''
+    Serghides explicit approximation of Colebrook (about 0.003% error): three fixed-point steps with
+    Steffensen acceleration.
+    '''
+    c = rr / 3.7
+    A = -2.0 * np.log10(c + 12.0 / Re)
+    B = -2.0 * np.log10(c + 2.51 * A / Re)
+    C = -2.0 * np.log10(c + 2.51 * B / Re)
+    return (A - (B - A) ** 2 / (C - 2.0 * B + A)) ** -2
+
+def colebrook(Re, rr, iterations=None, tol=1e-12):
+    '''
+    Vectorized Colebrook solution: Newton iterations on x = 1/sqrt(f) starting from Serghides.
+    :param Re: Reynolds number(s)
+    :param rr: relative roughness
+    :param iterations: fixed number of refinement steps (one step is already far below 1e-10 relative),
+                       or None to iterate until every element converges to tol
+    :param tol: relative convergence tolerance on x when iterations is None
+    :return: Darcy friction factor(s)
+    '''
+    Re, rr = np.broadcast_arrays(np.asarray(Re, dtype=float), np.asarray(rr, dtype=float))
+    c = rr / 3.7
+    x = serghides(Re, rr) ** -0.5
+    nIter = 20 if iterations is None else iterations
+    for i in range(nIter):
+        arg = c + 2.51 * x / Re
+        dx = (x + 2.0 * np.log10(arg)) / (1.0 + 2.0 / LN10 * (2.51 / Re) / arg)
+        x = x - dx
+        if iterations is None and np.all(np.abs(dx) <= tol * np.abs(x)):
+            break
+    return x ** -2
+
+def colebrookFsolve(Re, rr):
+    '''
+    Reference solution of Colebrook with scipy's fsolve, one element at a time (the original Pipe method).
+    '''
+    Re, rr = np.broadcast_arrays(np.asarray(Re, dtype=float), np.asarray(rr, dtype=float))
+    out = np.empty(Re.shape)
+    for i in np.ndindex(Re.shape):
+        cb = lambda f: 1 / (f ** 0.5) + 2.0 * np.log10(rr[i] / 3.7 + 2.51 / (Re[i] * f ** 0.5))
+        out[i] = fsolve(cb, (0.01))[0]
+    return out
+
+def colebrookSlope(Re, rr, f):
+    '''
+    df/dRe along the Colebrook curve at the point (Re, f), from implicit differentiation.
+    '''
+    x = f ** -0.5
+    arg = rr / 3.7 + 2.51 * x / Re
+    gx = 1.0 + 2.0 / LN10 * (2.51 / Re) / arg
+    gRe = -2.0 / LN10 * (2.51 * x / Re ** 2) / arg
+    return -2.0 * x ** -3 * (-gRe / gx)
+
+def explicitSlope(Re, rr, method):
+    '''
+    df/dRe of an explicit approximation, differentiated term by term.
+    :param method: 'serghides', 'haaland' or 'swamee-jain'
+    '''
+    c = rr / 3.7
+    if method == 'swamee-jain':
+        u = c + 5.74 / Re ** 0.9
+        L = np.log10(u)
+        return -0.5 * L ** -3 * (-0.9 * 5.74 / Re ** 1.9) / (u * LN10)
+    if method == 'haaland':
+        u = c ** 1.11 + 6.9 / Re
+        L = np.log10(u)
+        return -2.0 / 3.24 * L ** -3 * (-6.9 / Re ** 2) / (u * LN10)
+    # serghides: each step is -2 log10(c + a/Re) with a = 12, 2.51 A and 2.51 B
+    uA = c + 12.0 / Re
+    A = -2.0 * np.log10(uA)
+    dA = -2.0 / LN10 * (-12.0 / Re ** 2) / uA
+    uB = c + 2.51 * A / Re
+    B = -2.0 * np.log10(uB)
+    dB = -2.0 / LN10 * 2.51 * (dA / Re - A / Re ** 2) / uB
+    uC = c + 2.51 * B / Re
+    C = -2.0 * np.log10(uC)
+    dC = -2.0 / LN10 * 2.51 * (dB / Re - B / Re ** 2) / uC
+    D = C - 2.0 * B + A
+    dD = dC - 2.0 * dB + dA
+    y = A - (B - A) ** 2 / D
+    dy = dA - (2.0 * (B - A) * (dB - dA) * D - (B - A) ** 2 * dD) / D ** 2
+    return -2.0 * y ** -3 * dy
+
+def turbulentSlope(Re, rr, f, method='colebrook'):
+    '''
+    df/dRe of turbulentFrictionFactor: the Colebrook slope for the Colebrook solutions, otherwise the
+    derivative of the explicit formula, so Jacobians match the friction factor the residuals use.
+    :param f: the friction factor at (Re, rr) from the same method
+    '''
+    if method in ('colebrook', 'fsolve'):
+        return colebrookSlope(Re, rr, f)
+    return explicitSlope(Re, rr, method)
+
+def turbulentFrictionFactor(Re, rr, method='colebrook'):
+    '''
+    Turbulent Darcy friction factor by the chosen method.
+    :param method: one of METHODS, from the exact Colebrook solution to the cheapest explicit formula
+    '''
+    if method == 'colebrook':
+        return colebrook(Re, rr)
+    if method == 'serghides':
+        return serghides(Re, rr)
+    if method == 'haaland':
+        return haaland(Re, rr)
+    if method == 'swamee-jain':
+        return swameeJain(Re, rr)
+    if method == 'fsolve':
+        return colebrookFsolve(Re, rr)
+    raise ValueError('unknown friction factor method {!r}, expected one of {}'.format(method, METHODS))
+
+def frictionFactor(Re, rr, method='colebrook', transition='smooth', z=0.0):
+    '''
+    Vectorized Darcy friction factor: 64/Re for Re <= 2000, the turbulent method for Re >= 4000, and the
+    chosen transitional model in between.
+    :param Re: array of Reynolds numbers (> 0)
+    :param rr: array of relative roughness
+    :param method: turbulent method, one of METHODS
+    :param transition: transitional model, one of TRANSITIONS
+    :param z: standard-normal scatter of each element for the 'seeded' model
+    :return: (f, df/dRe)
+    '''
+    if transition not in TRANSITIONS:
+        raise ValueError('unknown transition model {!r}, expected one of {}'.format(transition, TRANSITIONS))
+    Re, rr, z = np.broadcast_arrays(np.asarray(Re, dtype=float), np.asarray(rr, dtype=float),
+                                    np.asarray(z, dtype=float))
+    f = np.array(64.0 / Re)
+    df = np.array(-64.0 / Re ** 2)
+    turb = Re > 2000.0
+    if np.any(turb):
+        Ret, rrt = Re[turb], rr[turb]
+        fcb = turbulentFrictionFactor(Ret, rrt, method)
+        dfcb = turbulentSlope(Ret, rrt, fcb, method)
+        t = np.clip((Ret - 2000.0) / 2000.0, 0.0, 1.0)
+        band = t < 1.0
+        if transition in ('smooth', 'seeded'):
+            w = t * t * (3.0 - 2.0 * t)
+            dw = 6.0 * t * (1.0 - t) / 2000.0
+        else:
+            w = t
+            dw = np.where(band, 1.0 / 2000.0, 0.0)
+        flam, dflam = f[turb], df[turb]
+        ft = flam + w * (fcb - flam)
+        dft = dflam + w * (dfcb - dflam) + dw * (fcb - flam)
+        if transition == 'seeded':
+            bump = 0.8 * np.clip(z[turb], -3.0, 3.0)  # keeps f > 0
+            scale = 1.0 + bump * t * (1.0 - t)
+            dscale = bump * (1.0 - 2.0 * t) / 2000.0 * band
+            ft, dft = ft * scale, dft * scale + ft * dscale
+        elif transition == 'random':
+            scale = np.where(band, 1.0 + 0.2 * np.random.standard_normal(ft.shape), 1.0)
+            ft, dft = ft * scale, dft * scale
+        f[turb] = ft
+        df[turb] = dft
+    return f, df
+#endregion
@@ -1,7 +1,7 @@
 # region class definitions
 class Loop():
     #region constructor
-    def __init__(self, Name='A', Pipes=[]):
+    def __init__(self, Name='A', Pipes=None):
         '''
         Defines a loop in a pipe network.  Note: the pipes must be listed in order.  The traversal of a pipe loop
         will begin at the start node of Pipe[0] and move in the positive direction of that pipe.  Hence, loops
@@ -11,7 +11,7 @@ class Loop():
         '''
         #region attributes
         self.name=Name
-        self.pipes=Pipes
+        self.pipes=[] if Pipes is None else Pipes
         #endregion
     #endregion
 
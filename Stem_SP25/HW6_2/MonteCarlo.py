@@ -0,0 +1,263 @@
+#region imports
+import copy
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PipeSolver import PipeArrays
+#endregion
+
+#region class definitions
+class P2Quantiles():
+    def __init__(self, percentiles, size):
+        '''
+        Streaming percentile estimates with the P-square algorithm (Jain and Chlamtac, 1985): five markers per
+        percentile and column are moved as samples arrive, so memory does not grow with the number of samples.
+        Every column (e.g. every pipe) has its own independent estimators, updated together with array operations.
+        :param percentiles: percentiles to track, 0-100
+        :param size: number of columns
+        '''
+        #region attributes
+        self.percentiles = np.asarray(percentiles, dtype=float)
+        self.size = size
+        self.count = 0
+        p = self.percentiles[:, None] / 100.0
+        self.increments = np.hstack((np.zeros_like(p), p / 2.0, p, (1.0 + p) / 2.0, np.ones_like(p)))
+        self.desired = np.hstack((np.ones_like(p), 1.0 + 2.0 * p, 1.0 + 4.0 * p, 3.0 + 2.0 * p, np.full_like(p, 5.0)))
+        self.first = []  # the first five samples, before the markers exist
+        self.q = None    # marker heights, shape (percentiles, size, 5)
+        self.n = None    # marker positions, same shape
+        #endregion
+
+    #region methods
+    def add(self, x):
+        '''
+        :param x: one sample per column, shape (size,)
+        '''
+        self.count += 1
+        if self.q is None:
+            self.first.append(np.array(x, dtype=float))
+            if len(self.first) == 5:
+                q = np.sort(np.array(self.first), axis=0).T  # (size, 5)
+                self.q = np.repeat(q[None, :, :], len(self.percentiles), axis=0)
+                self.n = np.broadcast_to(np.arange(1.0, 6.0), self.q.shape).copy()
+                self.first = []
+            return
+        q, n = self.q, self.n
+        x = np.broadcast_to(np.asarray(x, dtype=float), q.shape[:2])
+        q[..., 0] = np.minimum(q[..., 0], x)
+        q[..., 4] = np.maximum(q[..., 4], x)
+        # cell k holds x when q[k] <= x < q[k+1]; every marker above it moves up one position
+        k = (x[..., None] >= q[..., 1:4]).sum(axis=-1)
+        n += np.arange(5) > k[..., None]
+        self.desired += self.increments
+        for i in (1, 2, 3):
+            d = self.desired[:, i, None] - n[..., i]
+            move = (((d >= 1.0) & (n[..., i + 1] - n[..., i] > 1.0)) |
+                    ((d <= -1.0) & (n[..., i - 1] - n[..., i] < -1.0)))
+            if not np.any(move):
+                continue
+            s = np.sign(d)
+            qi, ni = q[..., i], n[..., i]
+            qUp, qDn, nUp, nDn = q[..., i + 1], q[..., i - 1], n[..., i + 1], n[..., i - 1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = qi + s / (nUp - nDn) * ((ni - nDn + s) * (qUp - qi) / (nUp - ni) +
+                                                    (nUp - ni - s) * (qi - qDn) / (ni - nDn))
+                linear = np.where(s > 0, qi + (qUp - qi) / (nUp - ni), qi - (qDn - qi) / (nDn - ni))
+            new = np.where((qDn < parabolic) & (parabolic < qUp), parabolic, linear)
+            q[..., i] = np.where(move, new, qi)
+            n[..., i] = np.where(move, ni + s, ni)
+
+    def values(self):
+        '''
+        :return: the estimates, shape (percentiles, size); exact percentiles while there are fewer than five samples
+        '''
+        if self.q is None:
+            if self.count == 0:
+                return np.full((len(self.percentiles), self.size), np.nan)
+            return np.percentile(np.array(self.first), self.percentiles, axis=0)
+        return self.q[..., 2].copy()
+    #endregion
+
+class FlowStatistics():
+    def __init__(self, names, percentiles=(5, 50, 95)):
+        '''
+        Running statistics of the pipe flows over Monte Carlo scenarios: Welford mean and variance, minimum,
+        maximum and P-square percentiles.  Nothing is kept per scenario.
+        :param names: pipe names, one per column
+        :param percentiles: percentiles to track, 0-100
+        '''
+        #region attributes
+        self.names = list(names)
+        size = len(self.names)
+        self.count = 0
+        self.failed = 0  # scenarios whose solve did not converge (left out of the statistics)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.quantiles = P2Quantiles(percentiles, size)
+        #endregion
+
+    #region methods
+    def add(self, Q):
+        '''
+        :param Q: pipe flows of one or more scenarios, shape (size,) or (scenarios, size)
+        '''
+        Q = np.atleast_2d(Q)
+        if len(Q) == 0:
+            return
+        for row in Q:
+            self.count += 1
+            delta = row - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (row - self.mean)
+            self.quantiles.add(row)
+        self.min = np.minimum(self.min, Q.min(axis=0))
+        self.max = np.maximum(self.max, Q.max(axis=0))
+
+    def std(self):
+        # sample standard deviation
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def percentile(self, p):
+        # estimate of one of the tracked percentiles
+        return self.quantiles.values()[list(self.quantiles.percentiles).index(p)]
+
+    def printSummary(self):
+        head = ''.join(' {:>8s}'.format('P{:g}'.format(p)) for p in self.quantiles.percentiles)
+        print('{:>8s} {:>8s} {:>8s}{}'.format('pipe', 'mean', 'std', head))
+        values = self.quantiles.values()
+        std = self.std()
+        for i, name in enumerate(self.names):
+            row = ''.join(' {:8.2f}'.format(v) for v in values[:, i])
+            print('{:>8s} {:8.2f} {:8.2f}{}'.format(name, self.mean[i], std[i], row))
+        print('{} scenarios, {} did not converge'.format(self.count, self.failed))
+    #endregion
+#endregion
+
+#region function definitions
+def sampleScenarios(arrays, n, rng, roughnessCV=0.1, demandCV=0.1, transition=True):
+    '''
+    Draw n scenarios for a compiled network.
+    Roughness is scaled by a lognormal factor with mean 1.  Every outflow (extFlow < 0) is scaled by a
+    normal factor 1 + demandCV*z, and the inflows of its connected part are rescaled so the network stays balanced.
+    :param arrays: a PipeArrays object
+    :param n: number of scenarios
+    :param rng: numpy Generator
+    :param roughnessCV: coefficient of variation of the pipe roughness
+    :param demandCV: coefficient of variation of the node outflows
+    :param transition: if True, also draw a transitional-friction scatter z per pipe (the 'seeded' model)
+    :return: (roughness factors (n, pipes), external flows (n, nodes), z (n, pipes) or None)
+    '''
+    sigma2 = np.log1p(roughnessCV ** 2)
+    rrScale = rng.lognormal(-sigma2 / 2.0, np.sqrt(sigma2), (n, arrays.nPipes))
+    base = arrays.extFlow
+    demand = base < 0.0
+    supply = base > 0.0
+    ext = np.broadcast_to(base, (n, arrays.nNodes)).copy()
+    ext[:, demand] *= np.clip(1.0 + demandCV * rng.standard_normal((n, np.count_nonzero(demand))), 0.0, None)
+    for part in range(arrays.nParts):
+        inPart = arrays.parts == part
+        s = supply & inPart
+        if np.any(s):
+            out = -ext[:, demand & inPart].sum(axis=1)
+            ext[:, s] *= (out / base[s].sum())[:, None]
+    z = rng.standard_normal((n, arrays.nPipes)) if transition else None
+    return rrScale, ext, z
+
+def solveArrays(arrays, method='gga', Q0=None, tol=1e-9, maxiter=100, H0=None):
+    # solve a compiled network; returns (Q, node heads (None for 'newton'), iterations, converged)
+    if method == 'newton':
+        Q, it, converged = arrays.solveLoops(Q0, tol=tol, maxiter=maxiter)
+        return Q, None, it, converged
+    if method == 'gga':
+        return arrays.solveHeads(Q0, tol=tol, maxiter=maxiter, H0=H0)
+    raise ValueError("method must be 'newton' or 'gga', not {!r}".format(method))
+
+def solveScenarios(arrays, rrScale, extFlow, z=None, method='gga', Q0=None, tol=1e-9, maxiter=100, H0=None):
+    '''
+    Solve a block of scenarios one after the other, each warm-started from Q0 (and, for 'gga', the node
+    heads H0).  Module-level so it can run in a worker process.
+    :return: (flows (n, pipes), iterations (n,), converged flags (n,))
+    '''
+    work = copy.copy(arrays)
+    n = len(rrScale)
+    Q = np.empty((n, arrays.nPipes))
+    iterations = np.zeros(n, dtype=np.int64)
+    converged = np.zeros(n, dtype=bool)
+    for i in range(n):
+        work.rr = arrays.rr * rrScale[i]
+        work.extFlow = extFlow[i]
+        if z is not None:
+            work.transitionZ = z[i]
+        Q[i], _, iterations[i], converged[i] = solveArrays(work, method, Q0, tol, maxiter, H0)
+    return Q, iterations, converged
+
+def runMonteCarlo(network, n, roughnessCV=0.1, demandCV=0.1, transition=True, seed=None, method='gga',
+                  percentiles=(5, 50, 95), chunksize=100, workers=None, tol=1e-9, maxiter=50, progress=None):
+    '''
+    Monte Carlo study of the pipe flows of a network under uncertain roughness, demand and transitional friction.
+    The nominal network is solved once (from its last solution, if it has one); every scenario is warm-started
+    from the nominal flows (and, for 'gga', node heads).  Scenarios are drawn in blocks of chunksize, solved in
+    this process or in a pool of worker processes, and folded into running statistics as the blocks come back
+    (in order, so a seed always gives the same statistics).  At most two blocks per worker are in flight, so
+    memory does not grow with n.
+    :param network: a PipeNetwork with its nodes built (loops are needed for method='newton')
+    :param n: number of scenarios
+    :param roughnessCV: coefficient of variation of the pipe roughness
+    :param demandCV: coefficient of variation of the node outflows
+    :param transition: if True, use the 'seeded' transitional friction model with a new draw per scenario
+    :param seed: seed or numpy Generator for the scenario draws
+    :param method: 'gga' or 'newton' (see PipeArrays.solveHeads and solveLoops)
+    :param percentiles: percentiles of the pipe flows to track
+    :param chunksize: scenarios per block
+    :param workers: number of worker processes; None or 1 solves the blocks in this process
+    :param tol: convergence tolerance on the largest residual
+    :param maxiter: maximum number of iterations per scenario
+    :param progress: optional callable progress(done, total) called after each block
+    :return: a FlowStatistics object (flows in L/s) with one column per open pipe
+    '''
+    rng = np.random.default_rng(seed)
+    arrays = PipeArrays(network)
+    Q0 = H0 = None
+    if network.solved:
+        # the network's last solution is the starting point of the nominal solve
+        Q0 = np.array([p.Q for p in arrays.pipes], dtype=float)
+        H0 = np.array([network.nodeHeads.get(name, 0.0) for name in arrays.nodeNames])
+    Qnominal, Hnominal, it, converged = solveArrays(arrays, method, Q0, tol, maxiter, H0)
+    if not converged:
+        raise RuntimeError('the nominal network did not converge with {} in {} iterations'.format(method, it))
+    if transition:
+        arrays.setTransition('seeded')
+    # closed pipes are not part of the compiled arrays, so they have no column
+    stats = FlowStatistics([p.Name() for p in arrays.pipes], percentiles)
+    sizes = [min(chunksize, n - i) for i in range(0, n, chunksize)]
+    done = 0
+
+    def collect(result):
+        nonlocal done
+        Q, iterations, ok = result
+        stats.add(Q[ok])
+        stats.failed += int(np.count_nonzero(~ok))
+        done += len(ok)
+        if progress is not None:
+            progress(done, n)
+
+    if workers is None or workers <= 1:
+        for m in sizes:
+            collect(solveScenarios(arrays, *sampleScenarios(arrays, m, rng, roughnessCV, demandCV, transition),
+                                   method=method, Q0=Qnominal, tol=tol, maxiter=maxiter, H0=Hnominal))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+            for m in sizes:
+                pending.append(pool.submit(solveScenarios, arrays,
+                                           *sampleScenarios(arrays, m, rng, roughnessCV, demandCV, transition),
+                                           method=method, Q0=Qnominal, tol=tol, maxiter=maxiter, H0=Hnominal))
+                if len(pending) >= 2 * workers:
+                    collect(pending.pop(0).result())
+            for fut in pending:
+                collect(fut.result())
+    return stats
+#endregion
@@ -1,7 +1,7 @@
 #region class definitions
 class Node():
     #region constructor
-    def __init__(self, Name='a', Pipes=[], ExtFlow=0):
+    def __init__(self, Name='a', Pipes=None, ExtFlow=0):
         '''
         A node in a pipe network.
         :param Name: name of the node
@@ -10,7 +10,7 @@ class Node():
         '''
         #region attributes
         self.name=Name
-        self.pipes=Pipes
+        self.pipes=[] if Pipes is None else Pipes
         self.extFlow=ExtFlow
         #endregion
     #endregion
@@ -1,14 +1,20 @@
 #region imports
+import os
+import sys
+# the modules shared by the HW folders are in Stem_SP25
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 import math
 import numpy as np
 import random as rnd
-from scipy.optimize import fsolve
 from Fluid import Fluid
+import Friction
+from SolveReport import SolveReport
 #endregion
 # region class definitions
 class Pipe():
     #region constructor
-    def __init__(self, Start='A', End='B',L=100, D=200, r=0.00025, fluid=Fluid()):
+    def __init__(self, Start='A', End='B',L=100, D=200, r=0.00025, fluid=None, frictionMethod='colebrook',
+                 transition='smooth'):
         '''
         Defines a generic pipe with orientation from lowest letter to highest, alphabetically.
         :param Start: the start node (string)
@@ -16,7 +22,13 @@ class Pipe():
         :param L: the pipe length in m (float)
         :param D: the pipe diameter in mm (float)
         :param r: the pipe roughness in m  (float)
-        :param fluid:  a Fluid object (typically water)
+        :param fluid:  a Fluid object (default: water)
+        :param frictionMethod: turbulent friction factor method, see Friction.METHODS.  'colebrook' solves the
+                               Colebrook equation exactly; 'serghides', 'haaland' and 'swamee-jain' are explicit
+                               approximations; 'fsolve' is the original per-call scipy solve
+        :param transition: friction model for 2000 < Re < 4000, see Friction.TRANSITIONS.  'smooth' and 'linear'
+                           are deterministic; 'seeded' uses the fixed draw self.transitionZ; 'random' is the
+                           original fresh normal draw on every call
         '''
         #region attributes
         # from arguments given in constructor
@@ -24,12 +36,14 @@ class Pipe():
         self.endNode=max(Start,End) #makes sure to use the highest letter for the endNode
         self.length=L
         self.r=r
-        self.fluid=fluid #the fluid in the pipe
+        self.fluid=Fluid() if fluid is None else fluid #the fluid in the pipe
+        self.frictionMethod=frictionMethod #how the turbulent friction factor is computed
+        self.transition=transition #how the transitional friction factor is computed
+        self.transitionZ=0.0 #standard-normal scatter used by the 'seeded' transition model
+        self.closed=False #a closed pipe carries no flow and is left out of the vectorized solves
 
         # other calculated properties
-        self.d=D/1000.0 #diameter in m
-        self.relrough = self.r/self.d #calculate relative roughness for easy use later
-        self.A=math.pi/4.0*self.d**2 #calculate pipe cross sectional area for easy use later
+        self.setDiameter(D)
         self.Q=10 #working in units of L/s, just an initial guess
         self.vel=self.V()  #calculate the initial velocity of the fluid
         self.reynolds=self.Re() #calculate the initial reynolds number
@@ -37,6 +51,15 @@ class Pipe():
     #endregion
 
     #region methods
+    def setDiameter(self, D):
+        '''
+        Set the pipe diameter and the properties that depend on it.
+        :param D: the pipe diameter in mm (float)
+        '''
+        self.d=D/1000.0 #diameter in m
+        self.relrough = self.r/self.d #calculate relative roughness for easy use later
+        self.A=math.pi/4.0*self.d**2 #calculate pipe cross sectional area for easy use later
+
     def V(self):
         '''
         Calculate average velocity in the pipe for volumetric flow self.Q
@@ -49,11 +72,12 @@ class Pipe():
 
     def Re(self):
         '''
-        Calculate the reynolds number under current conditions.
+        Calculate the reynolds number under current conditions.  It uses the speed |V|, so a pipe whose flow runs
+        from its end node to its start node (Q < 0) has the same friction factor as the same flow the other way.
         :return:
         '''
         v = self.V()  # ensure velocity is up to date
-        self.reynolds= (self.fluid.rho * v * self.d) / self.fluid.mu # Re=rho*V*d/mu, be sure to use V() so velocity is updated.
+        self.reynolds= (self.fluid.rho * abs(v) * self.d) / self.fluid.mu # Re=rho*V*d/mu, be sure to use V() so velocity is updated.
         return self.reynolds
 
     def FrictionFactor(self):
@@ -62,16 +86,15 @@ class Pipe():
         notion of laminar, turbulent and transitional flow.
         :return: the (Darcy) friction factor
         """
+        SolveReport.tally('frictionFactor')
         # update the Reynolds number and make a local variable Re
         Re=self.Re()
         rr=self.relrough
         # to be used for turbulent flow
         def CB():
-            # note:  in numpy log is for natural log.  log10 is log base 10.
-            cb = lambda f: 1 / (f ** 0.5) + 2.0 * np.log10(rr / 3.7 + 2.51 / (Re * f ** 0.5))
-            result = fsolve(cb, (0.01))
-            val = cb(result[0])
-            return result[0]
+            if self.frictionMethod == 'fsolve':
+                SolveReport.tally('colebrook fsolve')
+            return float(Friction.turbulentFrictionFactor(Re, rr, self.frictionMethod))
         # to be used for laminar flow
         def lam():
             return 64 / Re
@@ -81,6 +104,10 @@ class Pipe():
         if Re <= 2000:  # true for laminar flow
             return lam()
 
+        if self.transition != 'random':
+            # deterministic (or fixed-draw) transitional models, see Friction.TRANSITIONS
+            return float(Friction.frictionFactor(Re, rr, self.frictionMethod, self.transition, self.transitionZ)[0])
+
         # transition flow is ambiguous, so use normal variate weighted by Re
         CBff = CB()
         Lamff = lam()
@@ -1,51 +1,294 @@
 #region imports
+import os
+import sys
+# the modules shared by the HW folders are in Stem_SP25
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import warnings
 from scipy.optimize import fsolve
 import numpy as np
 from Fluid import Fluid
 from Node import Node
+from Loop import Loop
+from CycleBasis import FundamentalCycles
+from PipeSolver import PipeArrays
+from PipeTable import PipeTable
+from MonteCarlo import runMonteCarlo
+from ExtendedPeriod import runExtendedPeriod
+from SolveReport import SolveReport
+import PipeNetworkIO
 #endregion
 # region class definitions
 class PipeNetwork():
     #region constructor
-    def __init__(self, Pipes=[], Loops=[], Nodes=[], fluid=Fluid()):
+    def __init__(self, Pipes=None, Loops=None, Nodes=None, fluid=None):
         '''
         The pipe network is built from pipe, node, loop, and fluid objects.
-        :param Pipes: a list of pipe objects
-        :param Loops: a list of loop objects
-        :param Nodes: a list of node objects
-        :param fluid: a fluid object
+        :param Pipes: a list of pipe objects (default: a new empty list)
+        :param Loops: a list of loop objects (default: a new empty list)
+        :param Nodes: a list of node objects (default: a new empty list)
+        :param fluid: a fluid object (default: water)
         '''
         #region attributes
-        self.loops=Loops
-        self.nodes=Nodes
-        self.Fluid=fluid
-        self.pipes=Pipes
+        self.loops=[] if Loops is None else Loops
+        self.nodes=[] if Nodes is None else Nodes
+        self.Fluid=Fluid() if fluid is None else fluid
+        self.pipes=[] if Pipes is None else Pipes
+        self.table=None #PipeTable holding the pipes added with addPipe/addPipes
+        # dictionaries for O(1) lookups, kept in sync by addPipe/addPipes/buildNodes
+        self.pipesByName={}
+        self.pipesByNode={} #node name -> list of the pipes connected to it
+        self.nodesByName={}
+        self.indexedCounts=(0, 0) #(len(self.pipes), len(self.nodes)) when the dictionaries were built
+        # state of the last solve, used to warm-start the next one
+        self.solved=False #True when the pipe flows (and nodeHeads) hold a converged solution
+        self.lastSolution=None #the solution vector returned by the last findFlowRates
+        self.nodeHeads={} #node name -> head in m from the last 'gga' solve (relative to a reference node)
+        self.dirtyNodes=set() #nodes touched by setDemand/closePipe/openPipe/setDiameter since the last solve
+        self.coldIterations={} #method -> iterations of the last solve started from the default guess
+        self.solveStats={} #metrics of the last solve, see recordSolve
+        self.lastReport=None #SolveReport of the last findFlowRates(report=...) call
         #endregion
     #endregion
 
     #region methods
-    def findFlowRates(self):
-        # Number of equations = # of nodes + # of loops
-        N = len(self.nodes) + len(self.loops)
+    def findFlowRates(self, method='fsolve', tol=1e-9, maxiter=100, warmStart=True, report=None):
+        '''
+        Solve for the pipe flow rates.  The flows are stored in the pipe objects, and once a solve has converged
+        the next one starts from those flows (warmStart=False starts from 10 L/s in every pipe instead).
+        :param method: 'fsolve' (residuals evaluated pipe by pipe, analytic Jacobian from PipeArrays),
+                       'newton' (vectorized node + loop equations with an analytic Jacobian) or
+                       'gga' (vectorized global gradient method on flows and node heads; needs no loops)
+        :param tol: convergence tolerance on the largest residual for 'newton' and 'gga'
+        :param maxiter: maximum number of iterations for 'newton' and 'gga'
+        :param warmStart: start from the last converged solution if there is one
+        :param report: True or a SolveReport to record residual calls, friction factor evaluations, phase times,
+                       the final residual norm and convergence (kept in self.lastReport)
+        :return: the flow of every pipe in L/s (0 for closed pipes)
+        '''
+        if report is not None and report is not False:
+            if report is True:
+                report=SolveReport('PipeNetwork.findFlowRates({})'.format(method))
+            self.lastReport=report
+            with report:
+                return self.findFlowRates(method, tol, maxiter, warmStart)
+        if method != 'fsolve':
+            return self.findFlowRatesVectorized(method, tol, maxiter, warmStart)
+        if any(p.closed for p in self.pipes):
+            raise ValueError("closed pipes are only supported by the 'newton' and 'gga' methods")
+
+        # compiled once for the equation count and the analytic Jacobian; the residuals still walk the pipe,
+        # node and loop objects
+        with SolveReport.section('compile'):
+            arrays=PipeArrays(self)
+        fn, jac=self.getFsolveSystem(arrays)
+
+        # initial guess (10 L/s in each pipe), or the last solution
+        Q0 = np.full(len(self.pipes), 10.0)
+        warm = warmStart and self.solved
+        if warm:
+            Q0[:] = [p.Q for p in self.pipes]
+
+        # Use fsolve to find flows that satisfy node & loop equations
+        report=SolveReport.active
+        with SolveReport.section('fsolve'):
+            FR, info, ier, msg = fsolve(fn if report is None else report.counted(fn), Q0, fprime=jac,
+                                       full_output=True)
+        SolveReport.outcome(info['nfev'], np.max(np.abs(info['fvec'])), ier == 1, msg)
+        if ier != 1:
+            # full_output turns off fsolve's own warning
+            warnings.warn(msg, RuntimeWarning)
+        # keep the solution in the pipes (the last residual evaluation is not necessarily at FR)
+        for i in range(len(self.pipes)):
+            self.pipes[i].Q = FR[i]
+        self.lastSolution = FR
+        self.recordSolve('fsolve', info['nfev'], ier == 1, warm, len(self.pipes))
+        return FR
 
-        # initial guess (10 L/s for each unknown, for instance)
-        Q0 = np.full(N, 10.0)
+    def getFsolveSystem(self, arrays):
+        '''
+        The square system findFlowRates('fsolve') solves for the pipe flows: KCL at every node except one
+        reference node per connected part (its equation is the sum of the others), then the head loss around
+        every loop.
+        :param arrays: the PipeArrays of this network, for the analytic Jacobian
+        :return: (residual function of the pipe flows, its Jacobian function)
+        '''
+        nEq=len(arrays.kclRows)+len(self.loops)
+        if nEq != len(self.pipes):
+            raise ValueError('{} equations for {} pipes: the network needs {} independent loops (see buildLoops)'
+                             .format(nEq, len(self.pipes), len(self.pipes)-len(arrays.kclRows)))
+        kclNodes=[self.nodes[i] for i in arrays.kclRows.tolist()]
 
         def fn(q):
-            # 1) Update each pipe’s flow from the first len(self.pipes) entries of q
+            # 1) Update each pipe’s flow from q
             for i in range(len(self.pipes)):
                 self.pipes[i].Q = q[i]  # <-- #$JES MISSING CODE$
 
-            # 2) Get the node-flow equations (net flow at each node)
-            L = self.getNodeFlowRates()  # <-- #$JES MISSING CODE$
+            # 2) Get the node-flow equations (net flow at each node but the reference nodes)
+            L = [n.getNetFlowRate() for n in kclNodes]  # <-- #$JES MISSING CODE$
 
             # 3) Get the loop-head-loss equations (net head loss around each loop)
             L += self.getLoopHeadLosses()  # <-- #$JES MISSING CODE$
             return L
 
-        # Use fsolve to find flows that satisfy node & loop equations
-        FR = fsolve(fn, Q0)
-        return FR
+        def jac(q):
+            return arrays.nodeLoopJacobian(np.asarray(q, dtype=float))
+
+        return fn, jac
+
+    def findFlowRatesVectorized(self, method='newton', tol=1e-9, maxiter=100, warmStart=True, pipes=None):
+        '''
+        Compile the network into incidence/loop matrices (see PipeSolver.PipeArrays) and solve it with
+        vectorized head losses and an analytic Jacobian.  The flows are copied back into the pipe objects.
+        :param pipes: optional subset of the pipes to solve (whole connected parts); the others keep their flows
+        :return: the flow of every pipe in L/s (0 for closed pipes)
+        '''
+        with SolveReport.section('compile'):
+            arrays=PipeArrays(self, pipes)
+        warm = warmStart and self.solved
+        Q0 = np.array([p.Q for p in arrays.pipes], dtype=float) if warm else None
+        H = None
+        with SolveReport.section(method):
+            if method == 'newton':
+                Q, iterations, converged = arrays.solveLoops(Q0, tol=tol, maxiter=maxiter)
+            elif method == 'gga':
+                H0 = np.array([self.nodeHeads.get(n, 0.0) for n in arrays.nodeNames]) if warm else None
+                Q, H, iterations, converged = arrays.solveHeads(Q0, tol=tol, maxiter=maxiter, H0=H0)
+                self.nodeHeads.update(zip(arrays.nodeNames, H.tolist()))
+            else:
+                raise ValueError("method must be 'fsolve', 'newton' or 'gga', not {!r}".format(method))
+        if SolveReport.active is not None:
+            SolveReport.outcome(iterations, arrays.residualNorm(Q, H), converged)
+        if not converged:
+            warnings.warn('{} did not converge in {} iterations'.format(method, iterations), RuntimeWarning)
+        for p, q in zip(arrays.pipes, Q.tolist()):
+            p.Q=q
+        for p in self.pipes:
+            if p.closed:
+                p.Q=0.0
+        self.lastSolution = np.array([p.Q for p in self.pipes], dtype=float)
+        self.recordSolve(method, iterations, converged, warm, arrays.nPipes)
+        return self.lastSolution
+
+    def recordSolve(self, method, iterations, converged, warm, nPipes):
+        '''
+        Keep the metrics of a solve in self.solveStats: method, iterations (residual evaluations for fsolve),
+        converged, warmStart, pipesSolved, coldIterations (the last solve of this method from the default guess)
+        and saved (coldIterations - iterations for a warm start).
+        '''
+        if not warm:
+            self.coldIterations[method]=iterations
+        cold=self.coldIterations.get(method)
+        self.solveStats={'method': method, 'iterations': int(iterations), 'converged': bool(converged),
+                         'warmStart': warm, 'pipesSolved': nPipes, 'coldIterations': cold,
+                         'saved': cold - iterations if warm and cold is not None else 0}
+        self.solved=bool(converged)
+        if converged:
+            self.dirtyNodes.clear()
+
+    def setDemand(self, node, extFlow):
+        '''
+        Change the external flow of a node (L/s, + into the node); see resolve.
+        '''
+        n=self.getNode(node)
+        n.extFlow=extFlow
+        self.dirtyNodes.add(n.name)
+
+    def closePipe(self, name):
+        '''
+        Close a pipe: it carries no flow and is left out of the 'newton' and 'gga' solves (see resolve).
+        '''
+        p=self.getPipe(name)
+        p.closed=True
+        p.Q=0.0
+        self.dirtyNodes.update((p.startNode, p.endNode))
+
+    def openPipe(self, name):
+        '''
+        Reopen a closed pipe so it carries flow again; its flow is found by the next solve (see resolve).
+        '''
+        p=self.getPipe(name)
+        p.closed=False
+        self.dirtyNodes.update((p.startNode, p.endNode))
+
+    def setDiameter(self, name, D):
+        '''
+        Change the diameter of a pipe (mm); see resolve.
+        '''
+        p=self.getPipe(name)
+        p.setDiameter(D)
+        self.dirtyNodes.update((p.startNode, p.endNode))
+
+    def resolve(self, method='gga', tol=1e-9, maxiter=100):
+        '''
+        Re-solve after setDemand, closePipe, openPipe or setDiameter.  The solve is warm-started from the last
+        converged state, and only the connected parts of the network that contain a changed node are solved;
+        the rest keep their flows.  Without a converged state (or with method='fsolve') this is findFlowRates.
+        'newton' needs loops that avoid closed pipes (see buildLoops).  self.solveStats reports the iterations
+        and how many the warm start saved.
+        :return: the flow of every pipe in L/s (0 for closed pipes)
+        '''
+        if not self.solved or method == 'fsolve':
+            return self.findFlowRates(method, tol, maxiter)
+        if len(self.dirtyNodes) == 0:
+            return self.lastSolution
+        arrays=PipeArrays(self)
+        parts={arrays.parts[arrays.nodeIndex[n]] for n in self.dirtyNodes if n in arrays.nodeIndex}
+        pipes=None
+        if len(parts) < arrays.nParts:
+            pipes=[p for p, s in zip(arrays.pipes, arrays.start.tolist()) if arrays.parts[s] in parts]
+        return self.findFlowRatesVectorized(method, tol, maxiter, pipes=pipes)
+
+    def setTransition(self, transition):
+        '''
+        Choose the transitional-flow friction model of every pipe (see Friction.TRANSITIONS).
+        '''
+        for p in self.pipes:
+            p.transition=transition
+
+    def drawTransitionSamples(self, seed=None):
+        '''
+        Draw a fixed standard-normal scatter for every pipe and switch the pipes to the 'seeded' transitional
+        model.  The draw stays the same for every residual evaluation until the next call, so one solve sees a
+        single smooth friction curve and the same seed always gives the same answer.  A Monte Carlo study
+        calls this once per scenario.
+        :param seed: seed or numpy Generator
+        :return: the array of draws, one per pipe
+        '''
+        rng=np.random.default_rng(seed)
+        z=rng.standard_normal(len(self.pipes))
+        for p, zi in zip(self.pipes, z.tolist()):
+            p.transition='seeded'
+            p.transitionZ=zi
+        return z
+
+    def monteCarlo(self, n, roughnessCV=0.1, demandCV=0.1, transition=True, seed=None, method='gga',
+                   percentiles=(5, 50, 95), chunksize=100, workers=None, tol=1e-9, maxiter=50, progress=None):
+        '''
+        Flow statistics over n random scenarios of roughness, demand and transitional friction, solved in
+        parallel and warm-started from the nominal solution.  See MonteCarlo.runMonteCarlo.
+        :return: a MonteCarlo.FlowStatistics object (mean, std(), min, max and percentiles of every pipe flow)
+        '''
+        return runMonteCarlo(self, n, roughnessCV=roughnessCV, demandCV=demandCV, transition=transition, seed=seed,
+                             method=method, percentiles=percentiles, chunksize=chunksize, workers=workers, tol=tol,
+                             maxiter=maxiter, progress=progress)
+
+    def extendedPeriod(self, times, nodes, demands, supply=None, method='gga', callback=None, filename=None,
+                       heads=False, report=None):
+        '''
+        Solve a demand schedule step by step, each step warm-started from the previous one, streaming the flows
+        to a callback and/or a CSV file.  See ExtendedPeriod.runExtendedPeriod; demands can be read with
+        PipeNetworkIO.readDemands.
+        :param report: True or a SolveReport to record the compile, solve and output times (kept in self.lastReport)
+        :return: dictionary with steps, failed, iterations, seconds and stepsPerSecond
+        '''
+        if report is not None and report is not False:
+            if report is True:
+                report=SolveReport('PipeNetwork.extendedPeriod({})'.format(method))
+            self.lastReport=report
+            with report:
+                return self.extendedPeriod(times, nodes, demands, supply, method, callback, filename, heads)
+        return runExtendedPeriod(self, times, nodes, demands, supply=supply, method=method, callback=callback,
+                                 filename=filename, heads=heads)
 
     def getNodeFlowRates(self):
         #each node object is responsible for calculating its own net flow rate
@@ -57,42 +300,115 @@ class PipeNetwork():
         lhl=[l.getLoopHeadLoss() for l in self.loops]
         return lhl
 
+    def addPipe(self, Start='A', End='B', L=100, D=200, r=0.00025, frictionMethod='colebrook', transition='smooth'):
+        '''
+        Add a pipe stored in the network's PipeTable (same arguments as Pipe, with the network's fluid).
+        :return: the new pipe (a PipeView)
+        '''
+        return self.addPipes([Start], [End], L, D, r, frictionMethod, transition)[0]
+
+    def addPipes(self, Start, End, L=100, D=200, r=0.00025, frictionMethod='colebrook', transition='smooth'):
+        '''
+        Add many pipes at once from arrays of node names, lengths (m), diameters (mm) and roughness (m).
+        They are stored column by column in the network's PipeTable; see PipeTable.addPipes.
+        :return: list of the new pipes (PipeView objects)
+        '''
+        if self.table is None:
+            self.table=PipeTable(self.Fluid)
+        self.checkIndex()
+        new=self.table.addPipes(Start, End, L, D, r, frictionMethod, transition)
+        self.pipes.extend(new)
+        for p in new:
+            self.indexPipe(p)
+        self.indexedCounts=(len(self.pipes), len(self.nodes))
+        return new
+
+    def readFile(self, filename, nodesFile=None, loopsFile=None):
+        '''
+        Stream pipes (and demands, and optionally loops) from a file into this network and build the nodes.
+        :param filename: an EPANET .inp file, or a pipe CSV file (see PipeNetworkIO.readCSV)
+        :param nodesFile: node CSV file with external flows (CSV input only)
+        :param loopsFile: loop CSV file (CSV input only)
+        '''
+        if filename.lower().endswith('.inp'):
+            return PipeNetworkIO.readINP(self, filename)
+        return PipeNetworkIO.readCSV(self, filename, nodesFile, loopsFile)
+
+    def writeResults(self, filename, nodesFile=None):
+        '''
+        Write the pipe flows, velocities, Reynolds numbers and head losses (and optionally the node flows and
+        heads) to CSV; see PipeNetworkIO.writeResults.
+        '''
+        PipeNetworkIO.writeResults(self, filename, nodesFile)
+
+    def indexPipe(self, p):
+        start, end = p.startNode, p.endNode
+        self.pipesByName.setdefault(p.Name(), p)
+        self.pipesByNode.setdefault(start, []).append(p)
+        if end != start:
+            self.pipesByNode.setdefault(end, []).append(p)
+
+    def rebuildIndex(self):
+        '''
+        Rebuilds the lookup dictionaries from self.pipes and self.nodes.  The first pipe or node with a given
+        name wins, which is what the old linear scans returned.
+        '''
+        self.pipesByName={}
+        self.pipesByNode={}
+        for p in self.pipes:
+            self.indexPipe(p)
+        self.nodesByName={}
+        for n in self.nodes:
+            self.nodesByName.setdefault(n.name, n)
+        self.indexedCounts=(len(self.pipes), len(self.nodes))
+
+    def checkIndex(self):
+        '''
+        Rebuilds the dictionaries if pipes or nodes were appended to the lists directly.
+        '''
+        if self.indexedCounts != (len(self.pipes), len(self.nodes)):
+            self.rebuildIndex()
+
     def getPipe(self, name):
         #returns a pipe object by its name
-        for p in self.pipes:
-            if name == p.Name():
-                return p
+        self.checkIndex()
+        return self.pipesByName.get(name)
 
     def getNodePipes(self, node):
         #returns a list of pipe objects that are connected to the node object
-        l=[]
-        for p in self.pipes:
-            if p.oContainsNode(node):
-                l.append(p)
-        return l
+        self.checkIndex()
+        return list(self.pipesByNode.get(node, []))
 
     def nodeBuilt(self, node):
         #determines if I have already constructed this node object (by name)
-        for n in self.nodes:
-            if n.name==node:
-                return True
-        return False
+        self.checkIndex()
+        return node in self.nodesByName
 
     def getNode(self, name):
         #returns one of the node objects by name
-        for n in self.nodes:
-            if n.name==name:
-                return n
+        self.checkIndex()
+        return self.nodesByName.get(name)
 
     def buildNodes(self):
         #automatically create the node objects by looking at the pipe ends
-        for p in self.pipes:
-            if self.nodeBuilt(p.startNode)==False:
+        self.checkIndex()
+        #pipesByNode lists the node names in the order the pipes first mention them
+        for name, pipes in self.pipesByNode.items():
+            if name not in self.nodesByName:
                 #instantiate a node object and append it to the list of nodes
-                self.nodes.append(Node(p.startNode,self.getNodePipes(p.startNode)))
-            if self.nodeBuilt(p.endNode)==False:
-                #instantiate a node object and append it to the list of nodes
-                self.nodes.append(Node(p.endNode,self.getNodePipes(p.endNode)))
+                n=Node(name, list(pipes))
+                self.nodes.append(n)
+                self.nodesByName[name]=n
+        self.indexedCounts=(len(self.pipes), len(self.nodes))
+
+    def buildLoops(self):
+        #automatically create an independent set of loop objects (a fundamental cycle basis of the pipes)
+        #each loop starts with the pipe that closes it, traversed from its startNode to its endNode as Loop expects
+        #closed pipes are left out
+        pipes=[p for p in self.pipes if not p.closed]
+        cycles=FundamentalCycles([(p.startNode, p.endNode) for p in pipes])
+        self.loops=[Loop('L{}'.format(i+1), [pipes[k] for k in edges]) for i, (nodes, edges) in enumerate(cycles)]
+        return self.loops
 
     def printPipeFlowRates(self):
         for p in self.pipes:
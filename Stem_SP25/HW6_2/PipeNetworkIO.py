@@ -0,0 +1,210 @@
+#region imports
+import csv
+import numpy as np
+from Loop import Loop
+from PipeSolver import PipeArrays
+#endregion
+
+#region function definitions
+def readCSV(network, pipesFile, nodesFile=None, loopsFile=None, chunksize=10000):
+    '''
+    Streams a network from CSV files into a PipeNetwork.  Rows are collected column by column and added
+    chunksize pipes at a time with network.addPipes, so no object is built per line and memory stays flat.
+    Files have a header row; column names are case-insensitive.
+        pipes: start, end, length (m), diameter (mm), roughness (m, optional, default 0.00025)
+        nodes: node, extflow (L/s, + into the node)
+        loops: loop, pipes (pipe names such as a-b, in traversal order, separated by spaces)
+    :param network: the PipeNetwork to fill (pipes are appended; nodes are built afterwards)
+    :param pipesFile: the pipe CSV file
+    :param nodesFile: optional node CSV file
+    :param loopsFile: optional loop CSV file
+    :param chunksize: pipes per network.addPipes call
+    :return: the network
+    '''
+    with open(pipesFile, newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader)]
+        missing = {'start', 'end', 'length', 'diameter'} - set(header)
+        if missing:
+            raise ValueError('{}: missing column(s) {}'.format(pipesFile, ', '.join(sorted(missing))))
+        iStart, iEnd, iL, iD = (header.index(c) for c in ('start', 'end', 'length', 'diameter'))
+        iR = header.index('roughness') if 'roughness' in header else None
+        chunk = ([], [], [], [], [])
+        for row in reader:
+            if len(row) == 0 or row[0].startswith('#'):
+                continue
+            chunk[0].append(row[iStart].strip())
+            chunk[1].append(row[iEnd].strip())
+            chunk[2].append(row[iL])
+            chunk[3].append(row[iD])
+            chunk[4].append(row[iR] if iR is not None else 0.00025)
+            if len(chunk[0]) >= chunksize:
+                addChunk(network, chunk)
+        addChunk(network, chunk)
+    network.buildNodes()
+
+    if nodesFile is not None:
+        with open(nodesFile, newline='') as f:
+            reader = csv.reader(f)
+            header = [h.strip().lower() for h in next(reader)]
+            iNode, iFlow = header.index('node'), header.index('extflow')
+            for row in reader:
+                if len(row) == 0 or row[0].startswith('#'):
+                    continue
+                node = network.getNode(row[iNode].strip())
+                if node is None:
+                    raise ValueError('{}: node {} is not connected to any pipe'.format(nodesFile, row[iNode]))
+                node.extFlow = float(row[iFlow])
+
+    if loopsFile is not None:
+        with open(loopsFile, newline='') as f:
+            reader = csv.reader(f)
+            header = [h.strip().lower() for h in next(reader)]
+            iLoop, iPipes = header.index('loop'), header.index('pipes')
+            for row in reader:
+                if len(row) == 0 or row[0].startswith('#'):
+                    continue
+                pipes = [network.getPipe(name) for name in row[iPipes].split()]
+                if any(p is None for p in pipes):
+                    raise ValueError('{}: loop {} uses an unknown pipe'.format(loopsFile, row[iLoop]))
+                network.loops.append(Loop(row[iLoop].strip(), pipes))
+    return network
+
+def addChunk(network, chunk):
+    # add the collected columns as pipes and empty the lists
+    if len(chunk[0]) > 0:
+        network.addPipes(chunk[0], chunk[1], np.array(chunk[2], dtype=float), np.array(chunk[3], dtype=float),
+                         np.array(chunk[4], dtype=float))
+        for col in chunk:
+            col.clear()
+
+def readINP(network, filename, chunksize=10000):
+    '''
+    Streams the pipes and demands of an EPANET .inp file into a PipeNetwork.  Supported subset:
+        [JUNCTIONS]  ID  Elevation  Demand        (demand in L/s, out of the node)
+        [RESERVOIRS] ID  Head                     (the reservoirs of a connected part supply its demand,
+                                                   shared equally; heads are not used)
+        [PIPES]      ID  Node1  Node2  Length  Diameter  Roughness  [MinorLoss  [Status]]
+                     (m, mm and Darcy-Weisbach roughness in mm; CLOSED pipes are closed, see closePipe)
+        [OPTIONS]    Units LPS / Headloss D-W  (anything else is rejected)
+    Pipe IDs are not kept: pipes are named by their nodes, as in Pipe.Name().  Other sections, and text after
+    ';', are ignored.  Pipes are added chunksize at a time.
+    :param network: the PipeNetwork to fill
+    :param filename: the .inp file
+    :param chunksize: pipes per network.addPipes call
+    :return: the network
+    '''
+    demands = {}
+    reservoirs = []
+    closed = []
+    chunk = ([], [], [], [], [])
+    section = None
+    with open(filename) as f:
+        for lineNum, line in enumerate(f, 1):
+            txt = line.split(';', 1)[0].strip()
+            if len(txt) == 0:
+                continue
+            if txt[0] == '[':
+                section = txt.strip('[]').strip().upper()
+                continue
+            fields = txt.split()
+            try:
+                if section == 'PIPES':
+                    chunk[0].append(fields[1])
+                    chunk[1].append(fields[2])
+                    chunk[2].append(fields[3])
+                    chunk[3].append(fields[4])
+                    chunk[4].append(float(fields[5]) / 1000.0)
+                    if len(fields) > 7 and fields[7].upper() == 'CLOSED':
+                        closed.append((fields[1], fields[2]))
+                    if len(chunk[0]) >= chunksize:
+                        addChunk(network, chunk)
+                elif section == 'JUNCTIONS':
+                    demands[fields[0]] = float(fields[2]) if len(fields) > 2 else 0.0
+                elif section == 'RESERVOIRS':
+                    reservoirs.append(fields[0])
+                elif section == 'OPTIONS':
+                    key = fields[0].upper()
+                    if key == 'UNITS' and fields[1].upper() != 'LPS':
+                        raise ValueError('only LPS units are supported, not {}'.format(fields[1]))
+                    if key == 'HEADLOSS' and fields[1].upper() != 'D-W':
+                        raise ValueError('only Darcy-Weisbach (D-W) head loss is supported, not {}'.format(fields[1]))
+            except (IndexError, ValueError) as err:
+                raise ValueError('{}:{}: {}'.format(filename, lineNum, err)) from None
+    addChunk(network, chunk)
+    network.buildNodes()
+
+    for name, demand in demands.items():
+        node = network.getNode(name)
+        if node is not None:
+            node.extFlow = 0.0 - demand
+    for start, end in closed:
+        network.closePipe(min(start, end) + '-' + max(start, end))
+    if len(reservoirs) > 0:
+        # each connected part's demand is supplied by its reservoirs
+        arrays = PipeArrays(network)
+        sources = [arrays.nodeIndex[r] for r in reservoirs if r in arrays.nodeIndex]
+        total = np.bincount(arrays.parts, weights=arrays.extFlow, minlength=arrays.nParts)
+        count = np.bincount(arrays.parts[sources], minlength=arrays.nParts)
+        for i in sources:
+            part = arrays.parts[i]
+            network.nodes[i].extFlow -= float(total[part] / count[part])
+    return network
+
+def readDemands(filename):
+    '''
+    Reads a demand schedule for PipeNetwork.extendedPeriod from CSV: a header row "time, node, node, ..."
+    and one row per step with the time and the external flow of every listed node (L/s, + into the node).
+    :return: (times, node names, demands array (steps, nodes))
+    '''
+    times = []
+    rows = []
+    with open(filename, newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        if header[0].lower() != 'time':
+            raise ValueError('{}: the first column must be time'.format(filename))
+        for lineNum, row in enumerate(reader, 2):
+            if len(row) == 0 or row[0].startswith('#'):
+                continue
+            if len(row) != len(header):
+                raise ValueError('{}:{}: expected {} values, not {}'.format(filename, lineNum, len(header), len(row)))
+            times.append(float(row[0]))
+            rows.append(row[1:])
+    return times, header[1:], np.array(rows, dtype=float).reshape(len(rows), len(header) - 1)
+
+def writeResults(network, filename, nodesFile=None, chunksize=10000):
+    '''
+    Writes the solved pipe flows to CSV: pipe, start, end, flow (L/s, + from start to end), velocity (m/s),
+    Reynolds number, head loss (m, + from start to end) and closed.  Head losses come from the vectorized
+    model (PipeSolver.PipeArrays.headLoss), so the whole network is evaluated at once.
+    :param network: a solved PipeNetwork
+    :param filename: the pipe results file
+    :param nodesFile: optional node results file: node, extflow (L/s) and head (m, from the last 'gga' solve)
+    :param chunksize: rows per write
+    '''
+    arrays = PipeArrays(network)
+    Q = np.array([p.Q for p in arrays.pipes], dtype=float)
+    h = arrays.headLoss(Q)[0].tolist()
+    v = (Q * 1.0e-3 / arrays.area).tolist()
+    Re = (arrays.reFactor * np.abs(Q)).tolist()
+    Q = Q.tolist()
+    index = {id(p): i for i, p in enumerate(arrays.pipes)}
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['pipe', 'start', 'end', 'flow', 'velocity', 'reynolds', 'headloss', 'closed'])
+        for lo in range(0, len(network.pipes), chunksize):
+            rows = []
+            for p in network.pipes[lo:lo + chunksize]:
+                i = index.get(id(p))
+                if i is None:
+                    rows.append([p.Name(), p.startNode, p.endNode, 0.0, 0.0, 0.0, 0.0, 1])
+                else:
+                    rows.append([p.Name(), p.startNode, p.endNode, Q[i], v[i], Re[i], h[i], 0])
+            writer.writerows(rows)
+    if nodesFile is not None:
+        with open(nodesFile, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['node', 'extflow', 'head'])
+            writer.writerows([n.name, n.extFlow, network.nodeHeads.get(n.name, '')] for n in network.nodes)
+#endregion
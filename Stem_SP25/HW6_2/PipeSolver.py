@@ -0,0 +1,286 @@
+#region imports
+import os
+import sys
+# the modules shared by the HW folders are in Stem_SP25
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from scipy.sparse import coo_matrix, diags, vstack
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import spsolve
+from Friction import frictionFactor, METHODS, TRANSITIONS
+from SolveReport import SolveReport
+#endregion
+
+#region class definitions
+class PipeArrays():
+    def __init__(self, network, pipes=None):
+        '''
+        Array form of a PipeNetwork, compiled once so the solvers never touch Pipe/Node/Loop objects
+        inside their iterations.  Flows are in L/s and head losses in m of fluid, as in Pipe.
+        Closed pipes (see Pipe.closed) are left out, along with any loop that uses one.
+        :param network: a PipeNetwork whose pipes, nodes (see buildNodes) and loops are set up
+        :param pipes: optional subset of the network's pipes; only the nodes they touch are included
+        '''
+        #region attributes
+        subset = pipes is not None
+        candidates = pipes if subset else network.pipes
+        table = getattr(network, 'table', None)
+        rows = table.rowsOf(candidates) if table is not None else None
+        if rows is None:
+            # pipe objects: read their attributes one by one
+            self.pipes = [p for p in candidates if not getattr(p, 'closed', False)]
+            pipes = self.pipes
+            self.L = np.array([p.length for p in pipes], dtype=float)
+            self.d = np.array([p.d for p in pipes], dtype=float)
+            self.rr = np.array([p.relrough for p in pipes], dtype=float)
+            # turbulent friction method of each pipe (see Friction.METHODS)
+            # and transitional model (see Friction.TRANSITIONS)
+            self.frictionMethods = np.array([getattr(p, 'frictionMethod', 'colebrook') for p in pipes], dtype=object)
+            self.transitions = np.array([getattr(p, 'transition', 'smooth') for p in pipes], dtype=object)
+            self.transitionZ = np.array([getattr(p, 'transitionZ', 0.0) for p in pipes], dtype=float)
+        else:
+            # views of the network's PipeTable: gather the rows of its columns
+            isOpen = ~table.closed[rows]
+            self.pipes = [p for p, o in zip(candidates, isOpen.tolist()) if o]
+            rows = rows[isOpen]
+            self.L = table.columns['length'][rows]
+            self.d = table.columns['d'][rows]
+            self.rr = table.columns['relrough'][rows]
+            self.frictionMethods = np.array(METHODS, dtype=object)[table.method[rows]]
+            self.transitions = np.array(TRANSITIONS, dtype=object)[table.transition[rows]]
+            self.transitionZ = table.columns['transitionZ'][rows]
+        pipes = self.pipes
+        fluid = network.Fluid
+        g = 9.81
+        self.nPipes = len(pipes)
+        self.area = np.pi / 4.0 * self.d ** 2
+        # head loss = f * K * Q|Q| and Re = reFactor * |Q|  (Q in L/s)
+        self.K = self.L / self.d / (2.0 * g * self.area ** 2) * 1.0e-6
+        self.reFactor = fluid.rho * 1.0e-3 * self.d / (self.area * fluid.mu)
+        self.groupFriction()
+
+        # node-pipe incidence: +1 where the pipe ends (flow into the node), -1 where it starts
+        nodes = network.nodes
+        if subset:
+            touched = {p.startNode for p in pipes} | {p.endNode for p in pipes}
+            nodes = [n for n in nodes if n.name in touched]
+        self.nodeNames = [n.name for n in nodes]
+        self.nodeIndex = {name: i for i, name in enumerate(self.nodeNames)}
+        self.nNodes = len(self.nodeNames)
+        if rows is None:
+            self.start = np.array([self.nodeIndex[p.startNode] for p in pipes], dtype=np.int64)
+            self.end = np.array([self.nodeIndex[p.endNode] for p in pipes], dtype=np.int64)
+        else:
+            codes = np.array([self.nodeIndex.get(name, -1) for name in table.nodeNames], dtype=np.int64)
+            self.start = codes[table.start[rows]]
+            self.end = codes[table.end[rows]]
+            if np.any(self.start < 0) or np.any(self.end < 0):
+                raise KeyError('some pipe ends have no node object (see buildNodes)')
+        cols = np.arange(self.nPipes)
+        self.incidence = coo_matrix((np.concatenate((np.ones(self.nPipes), -np.ones(self.nPipes))),
+                                     (np.concatenate((self.end, self.start)), np.concatenate((cols, cols)))),
+                                    shape=(self.nNodes, self.nPipes)).tocsr()
+        self.extFlow = np.array([n.extFlow for n in nodes], dtype=float)
+
+        # one reference node per connected part: its KCL row is dependent and its head is fixed at 0
+        self.nParts, self.parts = connected_components(self.incidence @ self.incidence.T, directed=False)
+        self.reference = np.zeros(self.nNodes, dtype=bool)
+        self.reference[np.unique(self.parts, return_index=True)[1]] = True
+        self.kclRows = np.nonzero(~self.reference)[0]
+        # the pieces of the incidence matrix every solve uses, sliced and transposed once
+        self.incidenceT = self.incidence.T.tocsr()
+        self.kclIncidence = self.incidence[self.kclRows]
+        self.kclIncidenceT = self.kclIncidence.T.tocsr()
+
+        # loop-pipe matrix: +1 if the loop traverses the pipe from startNode to endNode, -1 otherwise
+        pipeIndex = {id(p): i for i, p in enumerate(pipes)}
+        rows, cols, vals = [], [], []
+        loops = [l for l in network.loops if all(id(p) in pipeIndex for p in l.pipes)]
+        for li, l in enumerate(loops):
+            s = l.pipes[0].startNode
+            for p in l.pipes:
+                rows.append(li)
+                cols.append(pipeIndex[id(p)])
+                vals.append(1.0 if s == p.startNode else -1.0)
+                s = p.endNode if s != p.endNode else p.startNode
+        self.nLoops = len(loops)
+        self.loopMatrix = coo_matrix((vals, (rows, cols)), shape=(self.nLoops, self.nPipes)).tocsr()
+        #endregion
+
+    #region methods
+    def groupFriction(self):
+        # one friction call per distinct (method, transition) pair
+        self.frictionGroups = []
+        for m in sorted(set(self.frictionMethods.tolist())):
+            isMethod = self.frictionMethods == m
+            for t in sorted(set(self.transitions[isMethod].tolist())):
+                self.frictionGroups.append(((m, t), isMethod & (self.transitions == t)))
+
+    def setTransition(self, transition):
+        '''
+        Use the same transitional friction model (see Friction.TRANSITIONS) for every pipe.
+        '''
+        self.transitions = np.full(self.nPipes, transition, dtype=object)
+        self.groupFriction()
+
+    def headLoss(self, Q):
+        '''
+        Signed head loss of every pipe in the direction startNode -> endNode and its derivative.
+        :param Q: array of pipe flows in L/s
+        :return: (h, dh/dQ) arrays in m and m/(L/s)
+        '''
+        SolveReport.tally('headLoss')
+        aQ = np.abs(Q)
+        Re = self.reFactor * aQ
+        h = np.empty_like(Q)
+        dh = np.empty_like(Q)
+        # laminar flow is linear in Q (f = 64/Re), which also covers Q = 0
+        lam = Re <= 2000.0
+        cLam = 64.0 * self.K[lam] / self.reFactor[lam]
+        h[lam] = cLam * Q[lam]
+        dh[lam] = cLam
+        rest = ~lam
+        for (method, transition), group in self.frictionGroups:
+            sel = rest & group
+            if np.any(sel):
+                f, df = frictionFactor(Re[sel], self.rr[sel], method, transition, self.transitionZ[sel])
+                K = self.K[sel]
+                h[sel] = f * K * Q[sel] * aQ[sel]
+                dh[sel] = K * aQ[sel] * (2.0 * f + Re[sel] * df)
+        return h, dh
+
+    def nodeLoopJacobian(self, Q):
+        '''
+        Dense Jacobian of the equations PipeNetwork.findFlowRates('fsolve') solves: KCL at every node but the
+        reference nodes (the kclIncidence rows) followed by the head loss around every loop (loop matrix
+        times dh/dQ, with the friction factor derivative).  Dense because fsolve takes a dense fprime.
+        :param Q: array of pipe flows in L/s
+        :return: array of shape (len(kclRows) + nLoops, nPipes)
+        '''
+        SolveReport.tally('jacobian')
+        dh = self.headLoss(Q)[1]
+        return np.vstack((self.kclIncidence.toarray(), (self.loopMatrix @ diags(dh)).toarray()))
+
+    def kclResidual(self, Q):
+        # net flow into every node (L/s)
+        return self.incidence @ Q + self.extFlow
+
+    def loopResidual(self, Q):
+        # net head loss around every loop (m)
+        return self.loopMatrix @ self.headLoss(Q)[0]
+
+    def residualNorm(self, Q, H=None):
+        '''
+        Largest residual of a solution: KCL at every node, plus the head-loss equation of every pipe when the
+        node heads H are given, otherwise the loop equations.
+        '''
+        r = np.max(np.abs(self.kclResidual(Q)[self.kclRows]), initial=0.0)
+        if H is not None:
+            return max(r, np.max(np.abs(self.headLoss(Q)[0] + self.incidenceT @ H), initial=0.0))
+        return max(r, np.max(np.abs(self.loopResidual(Q)), initial=0.0))
+
+    def solveLoops(self, Q0=None, tol=1e-9, maxiter=100):
+        '''
+        Newton iterations on the node (KCL) and loop (head loss) equations with the analytic Jacobian.
+        Needs nPipes - nNodes + (number of connected parts) independent loops.
+        :param Q0: initial pipe flows in L/s (default 10 L/s each)
+        :param tol: convergence tolerance on the largest residual
+        :param maxiter: maximum number of Newton iterations
+        :return: (Q, number of iterations, converged flag)
+        '''
+        nEq = len(self.kclRows) + self.nLoops
+        if nEq < self.nPipes:
+            raise ValueError('{} equations for {} pipes: the network needs {} independent loops (see buildLoops)'
+                             .format(nEq, self.nPipes, self.nPipes - len(self.kclRows)))
+        Aknown = self.kclIncidence
+
+        def F(Q):
+            h, dh = self.headLoss(Q)
+            return np.concatenate(((Aknown @ Q) + self.extFlow[self.kclRows], self.loopMatrix @ h)), dh
+
+        def J(dh):
+            return vstack((Aknown, self.loopMatrix @ diags(dh))).tocsc()
+
+        return self.newton(F, J, Q0, tol, maxiter, square=(nEq == self.nPipes))
+
+    def solveHeads(self, Q0=None, tol=1e-9, maxiter=100, H0=None):
+        '''
+        Global gradient (Todini-Pilati) Newton iterations: unknown pipe flows and node heads, with
+        head loss = H_start - H_end along every pipe and KCL at every node.  No loops are needed, and
+        each step solves a sparse symmetric positive definite system of node-head corrections.
+        :param Q0: initial pipe flows in L/s (default 10 L/s each)
+        :param tol: convergence tolerance on the largest residual
+        :param maxiter: maximum number of Newton iterations
+        :param H0: initial node heads in m (default 0)
+        :return: (Q, node heads relative to each part's reference node, iterations, converged flag)
+        '''
+        Q = np.full(self.nPipes, 10.0) if Q0 is None else np.array(Q0, dtype=float)
+        H = np.zeros(self.nNodes) if H0 is None else np.array(H0, dtype=float)
+        M = self.incidence
+        MT = self.incidenceT
+        Mr = self.kclIncidence
+        MrT = self.kclIncidenceT
+        converged = False
+        it = 0
+        h, dh = self.headLoss(Q)
+        R1 = h + MT @ H
+        R2 = M @ Q + self.extFlow
+        norm = max(np.max(np.abs(R1), initial=0.0), np.max(np.abs(R2), initial=0.0))
+        while it < maxiter:
+            if norm <= tol:
+                converged = True
+                break
+            it += 1
+            Dinv = 1.0 / dh
+            S = (Mr @ diags(Dinv) @ MrT).tocsc()
+            dHr = spsolve(S, R2[self.kclRows] - Mr @ (Dinv * R1))
+            dH = np.zeros(self.nNodes)
+            dH[self.kclRows] = dHr
+            dQ = -Dinv * (R1 + MT @ dH)
+            # backtracking line search on the largest residual
+            alpha = 1.0
+            for k in range(12):
+                Qn = Q + alpha * dQ
+                Hn = H + alpha * dH
+                hn, dhn = self.headLoss(Qn)
+                R1n = hn + MT @ Hn
+                R2n = M @ Qn + self.extFlow
+                normn = max(np.max(np.abs(R1n), initial=0.0), np.max(np.abs(R2n), initial=0.0))
+                if normn < norm or k == 11:
+                    break
+                alpha *= 0.5
+            Q, H, h, dh, R1, R2, norm = Qn, Hn, hn, dhn, R1n, R2n, normn
+        if norm <= tol:
+            converged = True
+        return Q, H, it, converged
+
+    def newton(self, F, J, Q0, tol, maxiter, square=True):
+        '''
+        Damped Newton (Gauss-Newton when there are more equations than pipes) on residual function F.
+        :param F: function Q -> (residual array, dh/dQ array)
+        :param J: function dh/dQ -> sparse Jacobian
+        :return: (Q, number of iterations, converged flag)
+        '''
+        Q = np.full(self.nPipes, 10.0) if Q0 is None else np.array(Q0, dtype=float)
+        r, dh = F(Q)
+        norm = np.max(np.abs(r), initial=0.0)
+        it = 0
+        while it < maxiter and norm > tol:
+            it += 1
+            Jm = J(dh)
+            if square:
+                dQ = spsolve(Jm, -r)
+            else:
+                dQ = spsolve((Jm.T @ Jm).tocsc(), -(Jm.T @ r))
+            alpha = 1.0
+            for k in range(12):
+                Qn = Q + alpha * dQ
+                rn, dhn = F(Qn)
+                normn = np.max(np.abs(rn), initial=0.0)
+                if normn < norm or k == 11:
+                    break
+                alpha *= 0.5
+            Q, r, dh, norm = Qn, rn, dhn, normn
+        return Q, it, norm <= tol
+    #endregion
+#endregion
@@ -0,0 +1,202 @@
+#region imports
+import numpy as np
+from Fluid import Fluid
+from Pipe import Pipe
+from Friction import METHODS, TRANSITIONS
+#endregion
+
+#region class definitions
+class PipeTable():
+    # per-pipe float columns; they have the same names (and units) as the Pipe attributes
+    FLOAT_COLUMNS = ('length', 'd', 'r', 'relrough', 'A', 'Q', 'vel', 'reynolds', 'transitionZ')
+
+    #region constructor
+    def __init__(self, fluid=None, capacity=16):
+        '''
+        Structure-of-arrays store for the pipes of a network: every attribute is a contiguous NumPy column and
+        node names are interned to integer codes.  PipeView objects give the Pipe API on top of one row, so a
+        network of table pipes works with the existing Node, Loop and PipeNetwork code.
+        :param fluid: the Fluid shared by all pipes of the table
+        :param capacity: number of rows allocated up front; the columns double in size as they fill
+        '''
+        #region attributes
+        self.fluid = Fluid() if fluid is None else fluid
+        self.count = 0
+        self.columns = {name: np.zeros(capacity) for name in self.FLOAT_COLUMNS}
+        self.start = np.zeros(capacity, dtype=np.int64)  # node codes, see nodeNames
+        self.end = np.zeros(capacity, dtype=np.int64)
+        self.method = np.zeros(capacity, dtype=np.int8)  # index into Friction.METHODS
+        self.transition = np.zeros(capacity, dtype=np.int8)  # index into Friction.TRANSITIONS
+        self.closed = np.zeros(capacity, dtype=bool)
+        self.nodeNames = []  # node code -> name
+        self.nodeCodes = {}  # node name -> code
+        #endregion
+    #endregion
+
+    #region methods
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        # the live rows of a float column (a view, not a copy)
+        return self.columns[name][:self.count]
+
+    def nodeCode(self, name):
+        code = self.nodeCodes.get(name)
+        if code is None:
+            code = len(self.nodeNames)
+            self.nodeCodes[name] = code
+            self.nodeNames.append(name)
+        return code
+
+    def reserve(self, n):
+        '''
+        Make room for n more rows.
+        '''
+        size = len(self.start)
+        if self.count + n <= size:
+            return
+        size = max(2 * size, self.count + n)
+        for name, col in self.columns.items():
+            self.columns[name] = np.resize(col, size)
+        self.start = np.resize(self.start, size)
+        self.end = np.resize(self.end, size)
+        self.method = np.resize(self.method, size)
+        self.transition = np.resize(self.transition, size)
+        self.closed = np.resize(self.closed, size)
+
+    def addPipe(self, Start='A', End='B', L=100, D=200, r=0.00025, frictionMethod='colebrook', transition='smooth'):
+        '''
+        Add one pipe; the arguments are those of Pipe (D in mm).
+        :return: the PipeView of the new row
+        '''
+        return self.addPipes([Start], [End], L, D, r, frictionMethod, transition)[0]
+
+    def addPipes(self, Start, End, L=100, D=200, r=0.00025, frictionMethod='colebrook', transition='smooth'):
+        '''
+        Add many pipes at once from arrays (scalars are broadcast).  As in Pipe, the node names of each pipe
+        are ordered so that startNode <= endNode.
+        :param Start: start node names
+        :param End: end node names
+        :param L: lengths in m
+        :param D: diameters in mm
+        :param r: roughness in m
+        :param frictionMethod: turbulent friction method (see Friction.METHODS) for all the pipes
+        :param transition: transitional model (see Friction.TRANSITIONS) for all the pipes
+        :return: list of PipeView objects for the new rows
+        '''
+        Start = [str(s) for s in Start]
+        End = [str(e) for e in End]
+        n = len(Start)
+        L, D, r = (np.broadcast_to(np.asarray(x, dtype=float), (n,)) for x in (L, D, r))
+        self.reserve(n)
+        lo, hi = self.count, self.count + n
+        codes = np.array([self.nodeCode(s) for s in Start] + [self.nodeCode(e) for e in End], dtype=np.int64)
+        a, b = codes[:n], codes[n:]
+        swap = np.array([s > e for s, e in zip(Start, End)], dtype=bool)
+        self.start[lo:hi] = np.where(swap, b, a)
+        self.end[lo:hi] = np.where(swap, a, b)
+        self.method[lo:hi] = METHODS.index(frictionMethod)
+        self.transition[lo:hi] = TRANSITIONS.index(transition)
+        self.closed[lo:hi] = False
+        c = self.columns
+        c['length'][lo:hi] = L
+        c['r'][lo:hi] = r
+        c['d'][lo:hi] = D / 1000.0
+        c['relrough'][lo:hi] = r / c['d'][lo:hi]
+        c['A'][lo:hi] = np.pi / 4.0 * c['d'][lo:hi] ** 2
+        c['Q'][lo:hi] = 10.0  # L/s, the same initial guess as Pipe
+        c['vel'][lo:hi] = c['Q'][lo:hi] * 1.0e-3 / c['A'][lo:hi]
+        c['reynolds'][lo:hi] = self.fluid.rho * np.abs(c['vel'][lo:hi]) * c['d'][lo:hi] / self.fluid.mu
+        c['transitionZ'][lo:hi] = 0.0
+        self.count = hi
+        return [PipeView(self, i) for i in range(lo, hi)]
+
+    def rowsOf(self, pipes):
+        '''
+        :return: the row of every pipe in the list, or None if some of them are not views of this table
+        '''
+        rows = np.empty(len(pipes), dtype=np.int64)
+        for i, p in enumerate(pipes):
+            if type(p) is not PipeView or p.table is not self:
+                return None
+            rows[i] = p.index
+        return rows
+
+    def nbytes(self):
+        # memory held by the columns
+        return (sum(col.nbytes for col in self.columns.values()) + self.start.nbytes + self.end.nbytes +
+                self.method.nbytes + self.transition.nbytes + self.closed.nbytes)
+    #endregion
+
+class PipeView(Pipe):
+    #region constructor
+    def __init__(self, table, index):
+        '''
+        A Pipe whose attributes live in one row of a PipeTable.  Pipe's methods work unchanged because every
+        attribute they use is a property that reads or writes the table.
+        :param table: the PipeTable
+        :param index: the row
+        '''
+        self.table = table
+        self.index = index
+    #endregion
+
+    #region methods
+    def _column(name):
+        # property reading and writing one float column of the row
+        def get(self):
+            return float(self.table.columns[name][self.index])
+
+        def set(self, value):
+            self.table.columns[name][self.index] = value
+        return property(get, set)
+
+    length = _column('length')
+    d = _column('d')
+    r = _column('r')
+    relrough = _column('relrough')
+    A = _column('A')
+    Q = _column('Q')
+    vel = _column('vel')
+    reynolds = _column('reynolds')
+    transitionZ = _column('transitionZ')
+    del _column
+
+    @property
+    def startNode(self):
+        return self.table.nodeNames[self.table.start[self.index]]
+
+    @property
+    def endNode(self):
+        return self.table.nodeNames[self.table.end[self.index]]
+
+    @property
+    def fluid(self):
+        return self.table.fluid
+
+    @property
+    def closed(self):
+        return bool(self.table.closed[self.index])
+
+    @closed.setter
+    def closed(self, value):
+        self.table.closed[self.index] = value
+
+    @property
+    def frictionMethod(self):
+        return METHODS[self.table.method[self.index]]
+
+    @frictionMethod.setter
+    def frictionMethod(self, value):
+        self.table.method[self.index] = METHODS.index(value)
+
+    @property
+    def transition(self):
+        return TRANSITIONS[self.table.transition[self.index]]
+
+    @transition.setter
+    def transition(self, value):
+        self.table.transition[self.index] = TRANSITIONS.index(value)
+    #endregion
+#endregion
@@ -0,0 +1,58 @@
+import numpy as np
+from Friction import frictionFactor, turbulentFrictionFactor, turbulentSlope, colebrookFsolve, METHODS
+
+# largest relative error of each method against the fsolve reference for 5000 <= Re <= 1e8 and rr <= 0.01
+ACCURACY = {'colebrook': 1e-9, 'fsolve': 0.0, 'serghides': 1e-4, 'haaland': 0.015, 'swamee-jain': 0.03}
+
+def grid():
+    Re, rr = np.meshgrid(np.geomspace(5000.0, 1e8, 12), np.r_[0.0, np.geomspace(1e-6, 0.01, 8)])
+    return Re.ravel(), rr.ravel()
+
+def testMethodsMatchColebrook():
+    # every turbulent method is within its stated error of the fsolve solution of Colebrook
+    Re, rr = grid()
+    reference = colebrookFsolve(Re, rr)
+    for method in METHODS:
+        f = turbulentFrictionFactor(Re, rr, method)
+        assert np.max(np.abs(f / reference - 1.0)) <= ACCURACY[method], method
+
+def testSlopes():
+    # the df/dRe of every method and deterministic transition model is the derivative of its own f
+    Re, rr = grid()
+    Re = np.r_[Re, np.linspace(2100.0, 3900.0, 7)]
+    rr = np.r_[rr, np.full(7, 1e-3)]
+    h = 1e-6 * Re
+    for method in METHODS:
+        if method == 'fsolve':
+            continue  # fsolve's own tolerance makes finite differences of it noisy
+        f = turbulentFrictionFactor(Re, rr, method)
+        fd = (turbulentFrictionFactor(Re + h, rr, method) - turbulentFrictionFactor(Re - h, rr, method)) / (2.0 * h)
+        assert np.allclose(turbulentSlope(Re, rr, f, method), fd, rtol=1e-5, atol=1e-16), method
+        for transition in ('smooth', 'linear', 'seeded'):
+            f, df = frictionFactor(Re, rr, method, transition, 1.5)
+            fd = (frictionFactor(Re + h, rr, method, transition, 1.5)[0] -
+                  frictionFactor(Re - h, rr, method, transition, 1.5)[0]) / (2.0 * h)
+            assert np.allclose(df, fd, rtol=1e-5, atol=1e-16), (method, transition)
+
+def testTransitionsContinuous():
+    # f is continuous at both ends of the transitional band; the 'random' model only on average
+    eps = 1e-7
+    for Re in (2000.0, 4000.0):
+        for method in METHODS:
+            for transition in ('smooth', 'linear', 'seeded'):
+                f = frictionFactor(np.array([Re - eps, Re + eps]), 1e-3, method, transition, 1.5)[0]
+                assert abs(f[1] - f[0]) < 1e-9, (method, transition, Re)
+        np.random.seed(0)
+        n = 20000
+        below = frictionFactor(np.full(n, Re - eps), 1e-3, 'colebrook', 'random')[0]
+        above = frictionFactor(np.full(n, Re + eps), 1e-3, 'colebrook', 'random')[0]
+        assert abs(below.mean() - above.mean()) < 4.0 * 0.2 * max(below.mean(), above.mean()) / np.sqrt(n), Re
+
+def main():
+    testMethodsMatchColebrook()
+    testSlopes()
+    testTransitionsContinuous()
+    print('Test_friction: all checks passed')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os
+import csv
+import tempfile
+import warnings
+import numpy as np
+from Fluid import Fluid
+from Pipe import Pipe
+from Loop import Loop
+from PipeNetwork import PipeNetwork
+from PipeSolver import PipeArrays
+from PipeNetworkIO import readCSV, readINP
+from MonteCarlo import runMonteCarlo, solveArrays, solveScenarios
+from ExtendedPeriod import runExtendedPeriod, patternDemands
+
+# the pipes of HW6_2.py: start, end, length (m), diameter (mm)
+PIPES = (('a', 'b', 250, 300), ('a', 'c', 100, 200), ('b', 'e', 100, 200), ('c', 'd', 125, 200), ('c', 'f', 100, 150),
+         ('d', 'e', 125, 200), ('d', 'g', 100, 150), ('e', 'h', 100, 150), ('f', 'g', 125, 250), ('g', 'h', 125, 250))
+
+def buildNetwork(table=False):
+    # the network of HW6_2.py, with its loops; table=True stores the pipes in a PipeTable
+    water = Fluid(mu=0.00089, rho=1000)
+    roughness = 0.00025
+    PN = PipeNetwork(fluid=water)
+    if table:
+        PN.addPipes(*zip(*PIPES), r=roughness)
+    else:
+        for start, end, L, D in PIPES:
+            PN.pipes.append(Pipe(start, end, L, D, roughness, water))
+    PN.buildNodes()
+    PN.getNode('a').extFlow = 60
+    PN.getNode('d').extFlow = -30
+    PN.getNode('f').extFlow = -15
+    PN.getNode('h').extFlow = -15
+    for name, pipes in (('A', ['a-b', 'b-e', 'd-e', 'c-d', 'a-c']), ('B', ['c-d', 'd-g', 'f-g', 'c-f']),
+                        ('C', ['d-e', 'e-h', 'g-h', 'd-g'])):
+        PN.loops.append(Loop(name, [PN.getPipe(p) for p in pipes]))
+    return PN
+
+def testPipeTable():
+    # the PipeTable columns compile to the same arrays as Pipe objects, and the networks solve the same way
+    PN, TN = buildNetwork(), buildNetwork(table=True)
+    assert [p.Name() for p in TN.pipes] == [p.Name() for p in PN.pipes]
+    assert TN.table.rowsOf(TN.pipes) is not None and PN.table is None
+    A, B = PipeArrays(PN), PipeArrays(TN)
+    for name in ('L', 'd', 'rr', 'start', 'end', 'extFlow', 'reFactor', 'area'):
+        assert np.array_equal(getattr(A, name), getattr(B, name)), name
+    for method in ('fsolve', 'newton', 'gga'):
+        for N in (PN, TN):
+            N.findFlowRates(method, warmStart=False)
+        assert np.allclose([p.Q for p in TN.pipes], [p.Q for p in PN.pipes], rtol=1e-12, atol=1e-12), method
+        # the Pipe methods read the table row of a view
+        for p, q in zip(PN.pipes, TN.pipes):
+            assert abs(q.Re() - p.Re()) <= 1e-9 * p.Re()
+            assert abs(q.getFlowHeadLoss('a') - p.getFlowHeadLoss('a')) <= 1e-9 * abs(p.getFlowHeadLoss('a'))
+    # changes made through the views reach the table columns the fast path reads
+    for N in (PN, TN):
+        N.closePipe('d-e')
+        N.setDiameter('a-b', 250)
+        N.resolve()
+    assert TN.table.closed[5] and TN.table.columns['d'][0] == 0.25
+    assert np.allclose([p.Q for p in TN.pipes], [p.Q for p in PN.pipes], rtol=1e-12, atol=1e-12)
+
+def writeRows(filename, rows):
+    # a CSV file with the given rows
+    with open(filename, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+def readRows(filename):
+    # the rows of a CSV file as dictionaries
+    with open(filename, newline='') as f:
+        return list(csv.DictReader(f))
+
+def checkResults(PN, folder):
+    # writeResults reports the flows of PN, the head losses of the Pipe methods and the last gga node heads
+    pipesFile, nodesFile = os.path.join(folder, 'out_pipes.csv'), os.path.join(folder, 'out_nodes.csv')
+    PN.writeResults(pipesFile, nodesFile)
+    rows = readRows(pipesFile)
+    assert [(r['pipe'], r['start'], r['end']) for r in rows] == [(p.Name(), p.startNode, p.endNode) for p in PN.pipes]
+    for r, p in zip(rows, PN.pipes):
+        assert int(r['closed']) == p.closed and float(r['flow']) == p.Q
+        h = 0.0 if p.closed else p.getFlowHeadLoss(p.startNode)
+        assert abs(float(r['headloss']) - h) <= 1e-9 * max(1.0, abs(h)), p.Name()
+    rows = readRows(nodesFile)
+    assert [(r['node'], float(r['extflow']), float(r['head'])) for r in rows] == \
+           [(n.name, n.extFlow, PN.nodeHeads[n.name]) for n in PN.nodes]
+
+def testReadWrite():
+    # networks read from CSV and .inp files in small chunks solve like buildNetwork, and writeResults reports them
+    with tempfile.TemporaryDirectory() as folder:
+        pipesFile, nodesFile, loopsFile = (os.path.join(folder, name + '.csv') for name in ('pipes', 'nodes', 'loops'))
+        writeRows(pipesFile, [['Start', 'End', 'Length', 'Diameter', 'Roughness']] +
+                  [list(p) + [0.00025] for p in PIPES])
+        writeRows(nodesFile, [['node', 'extflow'], ['a', 60], ['d', -30], ['f', -15], ['h', -15]])
+        writeRows(loopsFile, [['loop', 'pipes'], ['A', 'a-b b-e d-e c-d a-c'], ['B', 'c-d d-g f-g c-f'],
+                              ['C', 'd-e e-h g-h d-g']])
+        PN = buildNetwork()
+        CN = readCSV(PipeNetwork(fluid=PN.Fluid), pipesFile, nodesFile, loopsFile, chunksize=3)
+        assert [[p.Name() for p in L.pipes] for L in CN.loops] == [[p.Name() for p in L.pipes] for L in PN.loops]
+        for method in ('newton', 'gga'):
+            PN.findFlowRates(method, warmStart=False)
+            CN.findFlowRates(method, warmStart=False)
+            assert np.allclose([p.Q for p in CN.pipes], [p.Q for p in PN.pipes], rtol=1e-12, atol=1e-12), method
+        checkResults(CN, folder)
+
+        # the same network in EPANET form: a feeds it as a reservoir and d-e is closed
+        inpFile = os.path.join(folder, 'net.inp')
+        with open(inpFile, 'w') as f:
+            f.write('[OPTIONS]\nUnits LPS\nHeadloss D-W\n\n[RESERVOIRS]\na 100\n\n[JUNCTIONS]\n')
+            f.write('b 0 0\nc 0\nd 0 30 ; demand in L/s\ne 0 0\nf 0 15\ng 0 0\nh 0 15\n\n[PIPES]\n')
+            for i, (start, end, L, D) in enumerate(PIPES):
+                f.write('P{} {} {} {} {} 0.25 0 {}\n'.format(i, end, start, L, D, 'Closed' if i == 5 else 'Open'))
+        IN = readINP(PipeNetwork(fluid=PN.Fluid), inpFile, chunksize=3)
+        assert [p.Name() for p in IN.pipes] == [p.Name() for p in PN.pipes]
+        assert [n.extFlow for n in IN.nodes] == [n.extFlow for n in PN.nodes]
+        PN.closePipe('d-e')
+        for N in (PN, IN):
+            N.findFlowRates('gga', warmStart=False)
+        assert IN.getPipe('d-e').closed and IN.getPipe('d-e').Q == 0.0
+        assert np.allclose([p.Q for p in IN.pipes], [p.Q for p in PN.pipes], rtol=1e-12, atol=1e-12)
+        checkResults(IN, folder)
+
+def testMonteCarloClosedPipe():
+    # the statistics have one column per open pipe when a pipe is closed
+    PN = buildNetwork()
+    PN.resolve()
+    PN.closePipe('d-e')
+    PN.resolve()
+    stats = runMonteCarlo(PN, 50, seed=1)
+    assert 'd-e' not in stats.names and len(stats.names) == len(PN.pipes) - 1
+    assert stats.count + stats.failed == 50 and np.all(np.isfinite(stats.mean))
+
+def testMonteCarloWarmStart():
+    # scenarios start from the nominal flows and heads, so a scenario equal to the nominal one needs no iteration
+    PN = buildNetwork()
+    arrays = PipeArrays(PN)
+    Q, H, iterations, converged = solveArrays(arrays, 'gga')
+    nominal = (np.ones((2, arrays.nPipes)), np.tile(arrays.extFlow, (2, 1)))
+    assert np.all(solveScenarios(arrays, *nominal, Q0=Q, H0=H)[1] == 0)
+    assert np.all(solveScenarios(arrays, *nominal, Q0=Q)[1] > 0)
+    # the PipeNetwork wrapper passes tol, maxiter and progress on; the nominal solve starts from the solved network
+    PN.findFlowRates('gga')
+    calls = []
+    stats = PN.monteCarlo(20, seed=1, chunksize=5, maxiter=1, progress=lambda done, total: calls.append(done))
+    assert calls == [5, 10, 15, 20] and stats.failed > 0
+    assert PN.monteCarlo(20, seed=1, maxiter=1, tol=1e3).failed == 0
+
+def testNonConvergenceWarns():
+    # a solve that runs out of iterations raises a RuntimeWarning callers can filter or turn into an error
+    for method in ('newton', 'gga'):
+        PN = buildNetwork()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            PN.findFlowRates(method, maxiter=1, warmStart=False)
+        assert any(issubclass(w.category, RuntimeWarning) and 'did not converge' in str(w.message) for w in caught)
+
+def testSolversAgree():
+    # the baseline fsolve, the vectorized Newton and the global gradient solvers give the same flows
+    flows = {}
+    for method in ('fsolve', 'newton', 'gga'):
+        PN = buildNetwork()
+        PN.findFlowRates(method, warmStart=False)
+        flows[method] = np.array([p.Q for p in PN.pipes])
+    assert np.allclose(flows['newton'], flows['fsolve'], atol=1e-6)
+    assert np.allclose(flows['gga'], flows['fsolve'], atol=1e-6)
+    # reversed pipes use |V| in Re (d-e and f-g flow from end to start)
+    assert abs(flows['gga'][0] - 28.58) < 0.005 and abs(flows['gga'][5] + 17.24) < 0.005
+    assert all(p.Re() > 0 for p in PN.pipes)
+
+def testFsolveJacobian():
+    # the analytic Jacobian given to fsolve is square, nonsingular and matches central differences
+    PN = buildNetwork()
+    fn, jac = PN.getFsolveSystem(PipeArrays(PN))
+    rng = np.random.default_rng(2)
+    for q in (np.full(len(PN.pipes), 10.0), rng.uniform(-40.0, 40.0, len(PN.pipes))):
+        J = jac(q)
+        assert J.shape == (len(PN.pipes), len(PN.pipes)) and np.linalg.matrix_rank(J) == len(PN.pipes)
+        step = 1e-6 * np.maximum(np.abs(q), 1.0)
+        fd = np.empty_like(J)
+        for k in range(len(q)):
+            e = np.zeros_like(q)
+            e[k] = step[k]
+            fd[:, k] = (np.array(fn(q + e)) - np.array(fn(q - e))) / (2.0 * step[k])
+        assert np.allclose(J, fd, rtol=1e-5, atol=1e-7), np.max(np.abs(J - fd))
+
+def testResolve():
+    # resolve after setDemand and closePipe matches a cold solve of the changed network
+    PN = buildNetwork()
+    PN.resolve()
+    PN.setDemand('f', -25)
+    PN.setDemand('a', 70)
+    PN.closePipe('d-e')
+    PN.resolve()
+    warm = np.array([p.Q for p in PN.pipes])
+    assert PN.solveStats['warmStart'] and PN.solveStats['converged']
+    PN.findFlowRates('gga', warmStart=False)
+    cold = np.array([p.Q for p in PN.pipes])
+    assert np.allclose(warm, cold, atol=1e-6) and warm[5] == 0.0
+    for n in PN.nodes:
+        assert abs(n.getNetFlowRate()) < 1e-6
+
+def testExtendedPeriod():
+    # every step matches a cold solve of the network with that step's demands, and the CSV has one row per step
+    PN = buildNetwork()
+    demands = patternDemands([-30.0, -15.0, -15.0], [0.5, 1.0, 1.5])
+    steps = []
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'flows.csv')
+        summary = runExtendedPeriod(PN, [0, 1, 2], ['d', 'f', 'h'], demands, supply='a', filename=filename,
+                                    callback=lambda t, Q, H, iterations, converged: steps.append((Q, converged)))
+        with open(filename, newline='') as f:
+            rows = list(csv.reader(f))
+    assert summary['steps'] == 3 and summary['failed'] == 0 and all(converged for Q, converged in steps)
+    assert rows[0] == ['time', 'converged'] + [p.Name() for p in PN.pipes] and len(rows) == 4
+    for row, (Q, converged) in zip(demands, steps):
+        cold = buildNetwork()
+        for name, extFlow in zip(('d', 'f', 'h'), row):
+            cold.setDemand(name, extFlow)
+        cold.setDemand('a', -np.sum(row))
+        assert np.allclose(Q, cold.findFlowRates('gga', warmStart=False), atol=1e-6)
+
+def testExtendedPeriodUnsuppliedPart():
+    # a part of the network without a supply node still has to balance when other parts have one
+    PN = buildNetwork()
+    for start, end in (('x', 'y'), ('y', 'z')):
+        PN.pipes.append(Pipe(start, end, 100, 150, 0.00025, PN.Fluid))
+    PN.buildNodes()
+    demands = [[-30.0, -5.0]]
+    try:
+        runExtendedPeriod(PN, [0], ['d', 'z'], demands, supply='a')
+        raise AssertionError('an unbalanced part without a supply node was solved')
+    except ValueError as err:
+        assert 'do not balance' in str(err)
+    summary = runExtendedPeriod(PN, [0], ['d', 'z'], demands, supply=['a', 'x'])
+    assert summary['steps'] == 1 and summary['failed'] == 0
+
+def main():
+    testSolversAgree()
+    testResolve()
+    testFsolveJacobian()
+    testPipeTable()
+    testReadWrite()
+    testMonteCarloClosedPipe()
+    testMonteCarloWarmStart()
+    testExtendedPeriod()
+    testExtendedPeriodUnsuppliedPart()
+    testNonConvergenceWarns()
+    print('Test_pipes: all checks passed')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# region imports
+import sys
+import json
+import time
+import tracemalloc
+import numpy as np
+from scipy.interpolate import griddata
+from Steam_stem import steam
+from SteamTables import getTables, reloadTables
+from Rankine_stem import rankine
+from Rankine_sweep import rankine_arrays
+from Rankine_optimize import optimize
+# endregion
+
+# region function definitions
+def timeStates(n, reparse=False):
+    '''
+    Time n steam states that cover the branches of steam.calc() (constructed and h read, so the lazy
+    interpolation is included).
+    :param n: number of states to evaluate
+    :param reparse: if True, force the tables to be re-parsed before every state (the old behavior)
+    :return: average time per state in seconds
+    '''
+    getTables()  # make sure the one-time load is not counted
+    start = time.perf_counter()
+    for i in range(n):
+        if reparse:
+            reloadTables(force=True)
+        if i % 4 == 0:
+            steam(8000, x=1.0).h
+        elif i % 4 == 1:
+            steam(8000, T=500).h
+        elif i % 4 == 2:
+            steam(8, s=6.73).h
+        else:
+            steam(8575, h=3125).s
+    return (time.perf_counter() - start) / n
+
+def griddataProps(p, given, value):
+    '''
+    Reference implementation of the table lookups as steam.calc() used to do them:
+    one griddata call per saturated column and a fresh triangulation per superheated property.
+    :return: (Tsat, hf, hg, sf, sg, vf, vg), (T, h, s) for the superheated inversion
+    '''
+    t = getTables()
+    sat = tuple(float(griddata((t.ps,), col, (p / 100.0,), method='linear')) for col in t.satCols)
+    cols = {'T': t.tcol, 'h': t.hcol, 's': t.scol}
+    sh = tuple(value if k == given else
+               float(griddata((cols[given], t.pcol), cols[k], (value, p), method='linear'))
+               for k in ('T', 'h', 's'))
+    return sat, sh
+
+def checkAccuracy(n=300, seed=0):
+    '''
+    Compare the precomputed interpolators against the griddata reference at random states.
+    :return: the largest relative difference found
+    '''
+    t = getTables()
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(n):
+        p = rng.uniform(10.0, 20000.0)
+        given, lo, hi = [('T', 100.0, 600.0), ('h', 2600.0, 3600.0), ('s', 6.0, 8.5)][rng.integers(3)]
+        value = rng.uniform(lo, hi)
+        sat, sh = griddataProps(p, given, value)
+        new = np.concatenate((t.satProps(p), t.shProps(given, value, p)))
+        old = np.array(sat + sh)
+        ok = ~np.isnan(old)
+        if not np.array_equal(ok, ~np.isnan(new)):
+            raise AssertionError('nan pattern differs at p={}, {}={}'.format(p, given, value))
+        worst = max(worst, np.max(np.abs(new[ok] - old[ok]) / np.maximum(np.abs(old[ok]), 1e-12), initial=0.0))
+    return worst
+
+def timeLookups(n=200):
+    '''
+    Time one saturated + one superheated lookup with griddata and with the precomputed interpolators.
+    :return: (griddata seconds, interpolator seconds) per lookup
+    '''
+    t = getTables()
+    t.shProps('T', 500.0, 8000.0)  # build the triangulation outside the timed loop
+    start = time.perf_counter()
+    for _ in range(n):
+        griddataProps(8000.0, 'T', 500.0)
+    before = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for _ in range(n):
+        t.satProps(8000.0)
+        t.shProps('T', 500.0, 8000.0)
+    after = (time.perf_counter() - start) / n
+    return before, after
+
+def timeBatch(n=10**6, seed=0):
+    '''
+    Time steam.from_arrays() on n random (p, s) states, the mix a turbine-exit sweep produces.
+    :return: (seconds for the batch, fraction of superheated states)
+    '''
+    rng = np.random.default_rng(seed)
+    p = rng.uniform(10.0, 20000.0, n)
+    s = rng.uniform(0.5, 8.5, n)
+    start = time.perf_counter()
+    states = steam.from_arrays(p, s=s)
+    return time.perf_counter() - start, states.superheated.mean()
+
+def measure(fn, repeat=3):
+    '''
+    Best wall time of repeat calls of fn, then the peak traced memory of one more call.
+    :return: (seconds, peak bytes, result of the last call)
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def benchmarks(quick=False, seed=0):
+    '''
+    Times scalar steam states, steam.from_arrays batches (table and IF97 backends) and Rankine cycles (one rankine object per cycle
+    and the vectorized rankine_arrays) on random inputs from 10 to 10^6 states (10^4 with quick=True), then one
+    constrained design optimization (Rankine_optimize).
+    :return: list of result records (dictionaries)
+    '''
+    getTables()
+    rng = np.random.default_rng(seed)
+    records = []
+
+    def record(case, size, seconds, peak, **extra):
+        records.append(dict({'suite': 'HW6_3', 'case': case, 'size': size, 'seconds': seconds,
+                             'peakMB': peak / 1e6}, **extra))
+
+    n = 200 if quick else 2000
+    p = rng.uniform(10.0, 20000.0, n)
+    s = rng.uniform(0.5, 8.5, n)
+    seconds, peak, _ = measure(lambda: [steam(p[i], s=s[i]) for i in range(n)], repeat=1)
+    record('steam(p, s)', n, seconds, peak)
+    seconds, peak, _ = measure(lambda: [steam(p[i], s=s[i]).h for i in range(n)], repeat=1)
+    record('steam(p, s).h', n, seconds, peak)
+
+    for n in ([10, 1000, 10**4] if quick else [10, 1000, 10**4, 10**5, 10**6]):
+        p = rng.uniform(10.0, 20000.0, n)
+        s = rng.uniform(0.5, 8.5, n)
+        for backend in ('table', 'if97'):
+            seconds, peak, states = measure(lambda: steam.from_arrays(p, s=s, backend=backend),
+                                            repeat=1 if n >= 10**5 else 3)
+            record('steam.from_arrays(p, s)' + (' if97' if backend == 'if97' else ''), n, seconds, peak,
+                   superheated=float(states.superheated.mean()))
+
+    n = 20 if quick else 200
+    pLow = rng.uniform(5.0, 50.0, n)
+    pHigh = rng.uniform(2000.0, 15000.0, n)
+    tHigh = rng.uniform(400.0, 600.0, n)
+    seconds, peak, _ = measure(lambda: [rankine(pLow[i], pHigh[i], tHigh[i]).calc_efficiency() for i in range(n)],
+                               repeat=1)
+    record('rankine.calc_efficiency', n, seconds, peak)
+    for n in ([1000, 10**4] if quick else [1000, 10**4, 10**5, 10**6]):
+        pLow = rng.uniform(5.0, 50.0, n)
+        pHigh = rng.uniform(2000.0, 15000.0, n)
+        tHigh = rng.uniform(400.0, 600.0, n)
+        seconds, peak, _ = measure(lambda: rankine_arrays(pLow, pHigh, tHigh), repeat=1 if n >= 10**5 else 3)
+        record('rankine_arrays', n, seconds, peak)
+
+    seconds, peak, result = measure(lambda: optimize(x2min=0.88), repeat=3)
+    record('optimize (x2 >= 0.88)', result['evaluations'], seconds, peak, batches=result['batches'],
+           efficiency=result['objective'])
+    return records
+
+def printRecords(records):
+    print('{:<40s} {:>8s} {:>12s} {:>10s}'.format('case', 'size', 'seconds', 'peak MB'))
+    for r in records:
+        print('{:<40s} {:>8d} {:>12.5f} {:>10.2f}'.format(r['case'], r['size'], r['seconds'], r['peakMB']))
+
+def main(argv=None):
+    '''
+    Prints the table-lookup comparison and the benchmark table.  Options: --quick (smaller sizes),
+    --json PATH (run only the benchmarks and save their records).
+    '''
+    argv = sys.argv[1:] if argv is None else argv
+    quick = '--quick' in argv
+    if '--json' in argv:
+        records = benchmarks(quick)
+        printRecords(records)
+        with open(argv[argv.index('--json') + 1], 'w') as f:
+            json.dump(records, f, indent=1)
+        return
+
+    n = 200
+    before = timeStates(n, reparse=True)
+    after = timeStates(n)
+    print('steam state cost with per-state table parsing: {:0.1f} us'.format(before * 1e6))
+    print('steam state cost with shared tables:           {:0.1f} us'.format(after * 1e6))
+    print('speedup: {:0.1f}x'.format(before / after))
+
+    before, after = timeLookups()
+    print('table lookup with griddata:     {:0.1f} us'.format(before * 1e6))
+    print('table lookup with interpolators: {:0.1f} us'.format(after * 1e6))
+    print('speedup: {:0.1f}x'.format(before / after))
+    print('max relative difference vs griddata: {:0.2e}'.format(checkAccuracy()))
+
+    n = 10**4 if quick else 10**6
+    seconds, frac = timeBatch(n)
+    print('steam.from_arrays: {} states in {:0.2f} s ({:0.0f}% superheated)'.format(n, seconds, 100 * frac))
+    print()
+    printRecords(benchmarks(quick))
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
@@ -0,0 +1,374 @@
+# region imports
+import numpy as np
+# endregion
+
+# region function definitions
+# IAPWS-IF97 industrial formulation for water and steam: regions 1 (liquid), 2 (vapor), 4 (saturation) and
+# the region 2-3 boundary.  The internal functions use the units of the standard (p in MPa, T in K, kJ/kg);
+# satProps, shProps, shVolume and liquidProps use the units of steam (kPa, °C) and mirror
+# SteamTables.steamTables.satProps/shProps, so this module can be used as a property backend in place of the
+# tables.  Every function is plain array math: no files are read.
+
+R = 0.461526  # specific gas constant of water, kJ/(kg·K)
+T_MIN = 273.15  # K, lower temperature limit of regions 1 and 2
+T_MAX = 1073.15  # K, upper temperature limit of region 2
+T_B23 = 623.15  # K, upper temperature limit of region 1 and of the saturation line covered here
+P_MAX = 100.0  # MPa
+
+# region 1: gamma = sum n (7.1 - pi)^I (tau - 1.222)^J, pi = p/16.53 MPa, tau = 1386 K/T
+R1_I = np.array([0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3, 4, 4, 4, 5, 8, 8,
+                 21, 23, 29, 30, 31, 32])
+R1_J = np.array([-2, -1, 0, 1, 2, 3, 4, 5, -9, -7, -1, 0, 1, 3, -3, 0, 1, 3, 17, -4, 0, 6, -5, -2, 10, -8, -11, -6,
+                 -29, -31, -38, -39, -40, -41])
+R1_N = np.array([0.14632971213167, -0.84548187169114, -0.37563603672040e1, 0.33855169168385e1,
+                 -0.95791963387872, 0.15772038513228, -0.16616417199501e-1, 0.81214629983568e-3,
+                 0.28319080123804e-3, -0.60706301565874e-3, -0.18990068218419e-1, -0.32529748770505e-1,
+                 -0.21841717175414e-1, -0.52838357969930e-4, -0.47184321073267e-3, -0.30001780793026e-3,
+                 0.47661393906987e-4, -0.44141845330846e-5, -0.72694996297594e-15, -0.31679644845054e-4,
+                 -0.28270797985312e-5, -0.85205128120103e-9, -0.22425281908000e-5, -0.65171222895601e-6,
+                 -0.14341729937924e-12, -0.40516996860117e-6, -0.12734301741641e-8, -0.17424871230634e-9,
+                 -0.68762131295531e-18, 0.14478307828521e-19, 0.26335781662795e-22, -0.11947622640071e-22,
+                 0.18228094581404e-23, -0.93537087292458e-25])
+
+# region 2, ideal-gas part: gamma0 = ln(pi) + sum n0 tau^J0, pi = p/1 MPa, tau = 540 K/T
+R2_J0 = np.array([0, 1, -5, -4, -3, -2, -1, 2, 3])
+R2_N0 = np.array([-0.96927686500217e1, 0.10086655968018e2, -0.56087911283020e-2, 0.71452738081455e-1,
+                  -0.40710498223928, 0.14240819171444e1, -0.43839511319450e1, -0.28408632460772,
+                  0.21268463753307e-1])
+# region 2, residual part: gammar = sum n pi^I (tau - 0.5)^J
+R2_I = np.array([1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3, 4, 4, 4, 5, 6, 6, 6, 7, 7, 7, 8, 8, 9, 10, 10, 10,
+                 16, 16, 18, 20, 20, 20, 21, 22, 23, 24, 24, 24])
+R2_J = np.array([0, 1, 2, 3, 6, 1, 2, 4, 7, 36, 0, 1, 3, 6, 35, 1, 2, 3, 7, 3, 16, 35, 0, 11, 25, 8, 36, 13, 4, 10,
+                 14, 29, 50, 57, 20, 35, 48, 21, 53, 39, 26, 40, 58])
+R2_N = np.array([-0.17731742473213e-2, -0.17834862292358e-1, -0.45996013696365e-1, -0.57581259083432e-1,
+                 -0.50325278727930e-1, -0.33032641670203e-4, -0.18948987516315e-3, -0.39392777243355e-2,
+                 -0.43797295650573e-1, -0.26674547914087e-4, 0.20481737692309e-7, 0.43870667284435e-6,
+                 -0.32277677238570e-4, -0.15033924542148e-2, -0.40668253562649e-1, -0.78847309559367e-9,
+                 0.12790717852285e-7, 0.48225372718507e-6, 0.22922076337661e-5, -0.16714766451061e-10,
+                 -0.21171472321355e-2, -0.23895741934104e2, -0.59059564324270e-17, -0.12621808899101e-5,
+                 -0.38946842435739e-1, 0.11256211360459e-10, -0.82311340897998e1, 0.19809712802088e-7,
+                 0.10406965210174e-18, -0.10234747095929e-12, -0.10018179379511e-8, -0.80882908646985e-10,
+                 0.10693031879409, -0.33662250574171, 0.89185845355421e-24, 0.30629316876232e-12,
+                 -0.42002467698208e-5, -0.59056029685639e-25, 0.37826947613457e-5, -0.12768608934681e-14,
+                 0.73087610595061e-28, 0.55414715350778e-16, -0.94369707241210e-6])
+
+# region 4: saturation line
+R4_N = np.array([0.11670521452767e4, -0.72421316703206e6, -0.17073846940092e2, 0.12020824702470e5,
+                 -0.32325550322333e7, 0.14915108613530e2, -0.48232657361591e4, 0.40511340542057e6,
+                 -0.23855557567849, 0.65017534844798e3])
+
+# boundary between regions 2 and 3
+B23_N = np.array([0.34805185628969e3, -0.11671859879975e1, 0.10192970039326e-2, 0.57254459862746e3,
+                  0.13918839778870e2])
+
+CHUNK = 1 << 13  # states per block in powerSeries, so the working arrays stay in cache
+
+def powers(x, exps):
+    '''
+    Integer powers of x by products of earlier powers instead of one pow() call per exponent.
+    :param x: 1-d array
+    :param exps: sorted distinct integer exponents (may be negative)
+    :return: array of shape (len(exps), len(x)) holding x^e
+    '''
+    out = np.empty((len(exps), len(x)))
+    steps = {0: np.ones(len(x)), 1: x}  # x^k for the gaps between consecutive exponents
+    inv = None
+    prev, prevPow = 0, steps[0]
+    # negative exponents from -1 downwards, then the others upwards, each from its neighbour
+    order = [i for i in range(len(exps)) if exps[i] < 0][::-1] + [i for i in range(len(exps)) if exps[i] >= 0]
+    for i in order:
+        e = exps[i]
+        if e < 0 and inv is None:
+            inv = 1.0 / x
+            steps = {0: steps[0], 1: inv}
+        elif e >= 0 and inv is not None:
+            steps = {0: steps[0], 1: x}
+            inv = None
+            prev, prevPow = 0, steps[0]
+        gap = abs(e - prev)
+        for k in range(2, gap + 1):
+            if k not in steps:
+                steps[k] = steps[k - 1] * steps[1]
+        np.multiply(prevPow, steps[gap], out=out[i])
+        prev, prevPow = e, out[i]
+    return out
+
+def powerSeries(a, b, I, J, n):
+    '''
+    Sum of n a^I b^J and the sums weighted by I, J and J(J-1), from which the derivatives follow:
+    d/da = sI / a, d/db = sJ / b, d2/db2 = sJJ / b^2.  Evaluated term by term on blocks of CHUNK states.
+    :return: (s, sI, sJ, sJJ) arrays of the shape of a and b
+    '''
+    shape = np.shape(a)
+    a = np.ravel(a)
+    b = np.ravel(b)
+    uI, iI = np.unique(I, return_inverse=True)
+    uJ, iJ = np.unique(J, return_inverse=True)
+    terms = list(zip(iI.tolist(), iJ.tolist(), n.tolist(), (n * I).tolist(), (n * J).tolist(),
+                     (n * J * (J - 1)).tolist()))
+    out = np.zeros((4, len(a)))
+    for lo in range(0, len(a), CHUNK):
+        hi = min(lo + CHUNK, len(a))
+        A = powers(a[lo:hi], uI.tolist())
+        B = powers(b[lo:hi], uJ.tolist())
+        s, sI, sJ, sJJ = out[:, lo:hi]
+        for i, j, c, cI, cJ, cJJ in terms:
+            term = A[i] * B[j]
+            s += c * term
+            if cI != 0.0:
+                sI += cI * term
+            if cJ != 0.0:
+                sJ += cJ * term
+            if cJJ != 0.0:
+                sJJ += cJJ * term
+    return tuple(o.reshape(shape) for o in out)
+
+def region1(p, T):
+    '''
+    Region 1 (compressed and saturated liquid) from the Gibbs free energy.
+    :param p: pressure in MPa
+    :param T: temperature in K
+    :return: (v m^3/kg, h kJ/kg, s kJ/(kg·K), cp kJ/(kg·K))
+    '''
+    p, T = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(T, dtype=float))
+    pi = p / 16.53
+    tau = 1386.0 / T
+    a = 7.1 - pi
+    b = tau - 1.222
+    g, gI, gJ, gJJ = powerSeries(a, b, R1_I, R1_J, R1_N)
+    gPi = -gI / a
+    gTau = gJ / b
+    gTauTau = gJJ / b ** 2
+    v = R * T / (p * 1000.0) * pi * gPi
+    h = R * T * tau * gTau
+    s = R * (tau * gTau - g)
+    cp = -R * tau ** 2 * gTauTau
+    return v, h, s, cp
+
+def region2(p, T):
+    '''
+    Region 2 (superheated vapor) from the ideal-gas and residual parts of the Gibbs free energy.
+    :param p: pressure in MPa
+    :param T: temperature in K
+    :return: (v m^3/kg, h kJ/kg, s kJ/(kg·K), cp kJ/(kg·K))
+    '''
+    p, T = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(T, dtype=float))
+    pi = p
+    tau = 540.0 / T
+    order = np.argsort(R2_J0)
+    P = powers(tau.ravel(), R2_J0[order].tolist())
+    n0, j0 = R2_N0[order], R2_J0[order]
+    g0 = np.log(pi) + (n0 @ P).reshape(tau.shape)
+    g0Tau = (n0 * j0 @ P).reshape(tau.shape) / tau
+    g0TauTau = (n0 * j0 * (j0 - 1) @ P).reshape(tau.shape) / tau ** 2
+    b = tau - 0.5
+    gr, grI, grJ, grJJ = powerSeries(pi, b, R2_I, R2_J, R2_N)
+    grPi = grI / pi
+    grTau = grJ / b
+    grTauTau = grJJ / b ** 2
+    v = R * T / (p * 1000.0) * (1.0 + pi * grPi)
+    h = R * T * tau * (g0Tau + grTau)
+    s = R * (tau * (g0Tau + grTau) - (g0 + gr))
+    cp = -R * tau ** 2 * (g0TauTau + grTauTau)
+    return v, h, s, cp
+
+def psat(T):
+    '''
+    Saturation pressure (region 4).
+    :param T: temperature in K (273.15 to 647.096)
+    :return: pressure in MPa
+    '''
+    n = R4_N
+    T = np.asarray(T, dtype=float)
+    theta = T + n[8] / (T - n[9])
+    A = theta ** 2 + n[0] * theta + n[1]
+    B = n[2] * theta ** 2 + n[3] * theta + n[4]
+    C = n[5] * theta ** 2 + n[6] * theta + n[7]
+    return (2.0 * C / (-B + np.sqrt(B ** 2 - 4.0 * A * C))) ** 4
+
+def tsat(p):
+    '''
+    Saturation temperature (region 4).
+    :param p: pressure in MPa (611.213 Pa to 22.064 MPa)
+    :return: temperature in K
+    '''
+    n = R4_N
+    beta = np.asarray(p, dtype=float) ** 0.25
+    E = beta ** 2 + n[2] * beta + n[5]
+    F = n[0] * beta ** 2 + n[3] * beta + n[6]
+    G = n[1] * beta ** 2 + n[4] * beta + n[7]
+    D = 2.0 * G / (-F - np.sqrt(F ** 2 - 4.0 * E * G))
+    return (n[9] + D - np.sqrt((n[9] + D) ** 2 - 4.0 * (n[8] + n[9] * D))) / 2.0
+
+def b23p(T):
+    '''
+    Pressure (MPa) on the boundary between regions 2 and 3 at temperature T (K).
+    '''
+    T = np.asarray(T, dtype=float)
+    return B23_N[0] + B23_N[1] * T + B23_N[2] * T ** 2
+
+def b23t(p):
+    '''
+    Temperature (K) on the boundary between regions 2 and 3 at pressure p (MPa).
+    '''
+    return B23_N[3] + np.sqrt((np.asarray(p, dtype=float) - B23_N[4]) / B23_N[2])
+
+def inRegion1(p, T):
+    # p in MPa, T in K; the saturation line itself is included
+    return (T >= T_MIN) & (T <= T_B23) & (p <= P_MAX) & (p >= psat(np.clip(T, T_MIN, T_B23)) * (1.0 - 1e-9))
+
+def inRegion2(p, T):
+    # p in MPa, T in K; the saturation line itself is included
+    limit = np.where(T <= T_B23, psat(np.clip(T, T_MIN, T_B23)) * (1.0 + 1e-9), b23p(T))
+    return (T >= T_MIN) & (T <= T_MAX) & (p > 0.0) & (p <= limit)
+
+def solveT(region, p, target, given, T0, lo, hi, tol=1e-10, maxiter=50):
+    '''
+    Backward equation by Newton's method: the temperature at which h(p, T) (given='h') or s(p, T) (given='s')
+    of a region equals the target, using cp = dh/dT = T ds/dT.  Iterates are kept inside [lo, hi].
+    :param region: region1 or region2
+    :param p: pressures in MPa
+    :param target: h in kJ/kg or s in kJ/(kg·K)
+    :param T0: starting temperatures in K
+    :param lo: lower temperature bounds in K
+    :param hi: upper temperature bounds in K
+    :return: (T in K, nan where the target is not reached inside the bounds, and v, h, s at T)
+    '''
+    T = np.clip(T0, lo, hi)
+    active = np.ones(T.shape, dtype=bool)
+    for _ in range(maxiter):
+        idx = np.nonzero(active)[0]
+        if len(idx) == 0:
+            break
+        Ta = T[idx]
+        v, h, s, cp = region(p[idx], Ta)
+        step = (h - target[idx]) / cp if given == 'h' else (s - target[idx]) * Ta / cp
+        Tn = np.clip(Ta - step, lo[idx], hi[idx])
+        T[idx] = Tn
+        active[idx] = np.abs(Tn - Ta) > tol * Ta
+    v, h, s, cp = region(p, T)
+    miss = np.abs((h if given == 'h' else s) - target) > 1e-6 * np.maximum(np.abs(target), 1.0)
+    return np.where(miss | active, np.nan, T), v, h, s
+
+def satProps(p):
+    '''
+    Saturated liquid (region 1) and vapor (region 2) properties on the saturation line, in the layout of
+    SteamTables.steamTables.satProps.  Covers saturation temperatures up to 623.15 K (p up to 16.529 MPa);
+    the saturation states above that lie in region 3, which is not implemented.
+    :param p: pressure in kPa (float or array)
+    :return: array of shape (7,) + shape(p) holding Tsat (°C), hf, hg, sf, sg, vf, vg (nan outside the range)
+    '''
+    pM = np.asarray(p, dtype=float) / 1000.0
+    ok = (pM >= psat(T_MIN)) & (pM <= psat(T_B23))
+    pM = np.where(ok, pM, 0.1)
+    Ts = tsat(pM)
+    vf, hf, sf, _ = region1(pM, Ts)
+    vg, hg, sg, _ = region2(pM, Ts)
+    vals = np.stack((Ts - 273.15, hf, hg, sf, sg, vf, vg))
+    return np.where(ok, vals, np.nan)
+
+def satPoint(p):
+    '''
+    satProps for a single pressure in kPa.
+    :return: tuple Tsat, hf, hg, sf, sg, vf, vg (nan outside the range)
+    '''
+    return tuple(float(val) for val in satProps(p))
+
+def props(region, given, value, p, lo, hi, T0):
+    # (T °C, h, s, v) of one region from p in kPa and T (°C), h or s; nan outside the region
+    pM = np.asarray(p, dtype=float) / 1000.0
+    value = np.asarray(value, dtype=float)
+    if given == 'T':
+        TK = value + 273.15
+        v, h, s, _ = region(pM, TK)
+    else:
+        TK, v, h, s = (a.reshape(value.shape) for a in
+                       solveT(region, pM.ravel(), value.ravel(), given, T0.ravel(), lo.ravel(), hi.ravel()))
+    out = ~(inRegion1(pM, TK) if region is region1 else inRegion2(pM, TK))
+    return tuple(np.where(out, np.nan, a) for a in (TK - 273.15, h, s, v))
+
+def shState(given, value, p):
+    '''
+    Region 2 state from p (kPa) and T (°C), h (kJ/kg) or s (kJ/(kg·K)).
+    :return: (T, h, s, v), nan outside region 2
+    '''
+    value, p = np.broadcast_arrays(np.asarray(value, dtype=float), np.asarray(p, dtype=float))
+    pM = p / 1000.0
+    # temperature bounds of region 2 at this pressure: the saturation line (or the B23 line) to 1073.15 K
+    lo = np.where(pM <= psat(T_B23), tsat(np.clip(pM, psat(T_MIN), psat(T_B23))), b23t(np.maximum(pM, B23_N[4])))
+    hi = np.full(p.shape, T_MAX)
+    if given == 'h':
+        Ts = lo
+        hg = region2(pM, Ts)[1]
+        T0 = Ts + np.maximum(value - hg, 0.0) / 2.0
+    elif given == 's':
+        Ts = lo
+        sg = region2(pM, Ts)[2]
+        T0 = Ts * np.exp(np.maximum(value - sg, 0.0) / 2.0)
+    else:
+        T0 = None
+    return props(region2, given, value, p, lo, hi, T0)
+
+def liquidProps(given, value, p):
+    '''
+    Compressed liquid (region 1) T, h, s and v from p (kPa) and T (°C), h (kJ/kg) or s (kJ/(kg·K)).
+    :return: T, h, s, v (°C, kJ/kg, kJ/(kg·K), m^3/kg), nan outside region 1
+    '''
+    value, p = np.broadcast_arrays(np.asarray(value, dtype=float), np.asarray(p, dtype=float))
+    pM = p / 1000.0
+    lo = np.full(p.shape, T_MIN)
+    hi = np.where(pM < psat(T_B23), tsat(np.clip(pM, psat(T_MIN), psat(T_B23))), T_B23)
+    if given == 'h':
+        hf = region1(pM, hi)[1]
+        T0 = hi - np.maximum(hf - value, 0.0) / 4.2
+    elif given == 's':
+        sf = region1(pM, hi)[2]
+        T0 = hi * np.exp(np.minimum(value - sf, 0.0) / 4.2)
+    else:
+        T0 = None
+    return props(region1, given, value, p, lo, hi, T0)
+
+def shProps(given, value, p):
+    '''
+    Superheated (region 2) T, h and s in the layout of SteamTables.steamTables.shProps.
+    :param given: which property value is: 'T' (°C), 'h' (kJ/kg) or 's' (kJ/(kg·K))
+    :param value: the given property (float or array)
+    :param p: pressure in kPa (float or array)
+    :return: T, h, s (°C, kJ/kg, kJ/(kg·K)), nan outside region 2
+    '''
+    T, h, s, v = shState(given, value, p)
+    return T, h, s
+
+def shVolume(T, p):
+    '''
+    Specific volume (m^3/kg) of superheated vapor (region 2) at T (°C) and p (kPa), nan outside region 2.
+    '''
+    pM = np.asarray(p, dtype=float) / 1000.0
+    TK = np.asarray(T, dtype=float) + 273.15
+    return np.where(inRegion2(pM, TK), region2(pM, TK)[0], np.nan)
+
+def verify():
+    '''
+    Compare the implementation with the computer-program verification values of the IAPWS-IF97 release
+    (tables 5, 15, 35 and 36 and the B23 check point).
+    :return: the largest relative error found
+    '''
+    checks = []
+    for p, T, v, h, s in ((3.0, 300.0, 0.100215168e-2, 0.115331273e3, 0.392294792),
+                          (80.0, 300.0, 0.971180894e-3, 0.184142828e3, 0.368563852),
+                          (3.0, 500.0, 0.120241800e-2, 0.975542239e3, 0.258041912e1)):
+        checks += list(zip(region1(p, T)[:3], (v, h, s)))
+    for p, T, v, h, s in ((0.0035, 300.0, 0.394913866e2, 0.254991145e4, 0.852238967e1),
+                          (0.0035, 700.0, 0.923015898e2, 0.333568375e4, 0.101749996e2),
+                          (30.0, 700.0, 0.542946619e-2, 0.263149474e4, 0.517540298e1)):
+        checks += list(zip(region2(p, T)[:3], (v, h, s)))
+    checks += list(zip(psat([300.0, 500.0, 600.0]), (0.353658941e-2, 0.263889776e1, 0.123443146e2)))
+    checks += list(zip(tsat([0.1, 1.0, 10.0]), (0.372755919e3, 0.453035632e3, 0.584149488e3)))
+    checks += [(b23p(0.62315e3), 0.165291643e2), (b23t(0.165291643e2), 0.62315e3)]
+    return max(abs(float(a) / b - 1.0) for a, b in checks)
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    print('largest relative error against the IAPWS-IF97 verification values: {:.2e}'.format(verify()))
+# endregion
@@ -0,0 +1,247 @@
+# region imports
+import time
+import numpy as np
+from scipy.optimize import minimize
+from Steam_stem import steam
+from Rankine_sweep import cycle_arrays
+# endregion
+
+# region class definitions
+class cycleEvaluator():
+    """
+    Counted, batched evaluation of the Rankine cycle model (the same model as rankine_arrays).
+    The turbine inlet (p_high, t_high) and pump inlet (p_low) states only depend on one or two design
+    variables, so they are looked up once per distinct value of those variables: within a batch with
+    np.unique, and across batches from a dictionary.  Grid refinement and the finite-difference steps
+    of the local search revisit the same pressures all the time; only the turbine exit state has to be
+    interpolated for every candidate.
+    """
+    def __init__(self, backend=None, decimals=9):
+        '''
+        :param backend: steam property backend, 'table' or 'if97' (default: steam.defaultBackend)
+        :param decimals: number of decimals the pressures and temperatures are rounded to when forming the keys
+        '''
+        self.backend = backend
+        self.decimals = decimals
+        self.inlets = {}  # (p_high, t_high) -> (h1, s1)
+        self.pumps = {}  # p_low -> (h3, v3)
+        self.evaluations = 0  # design points evaluated
+        self.batches = 0  # calls of evaluate()
+        self.lookups = 0  # state lookups requested
+        self.hits = 0  # state lookups served from the dictionaries
+
+    def states(self, cache, keys, compute):
+        '''
+        Look up a state for every row of keys, computing the missing distinct rows in one vectorized call.
+        :param cache: dictionary from key tuples to property tuples
+        :param keys: array (n, k) of rounded keys
+        :param compute: callable compute(unique missing keys (m, k)) returning a tuple of m-arrays
+        :return: tuple of n-arrays
+        '''
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        rows = [tuple(row) for row in unique.tolist()]
+        missing = [i for i, row in enumerate(rows) if row not in cache]
+        inverse = inverse.ravel()
+        isMissing = np.zeros(len(rows), dtype=bool)
+        isMissing[missing] = True
+        self.lookups += len(inverse)
+        self.hits += int(np.count_nonzero(~isMissing[inverse]))
+        if missing:
+            for row, props in zip([rows[i] for i in missing], zip(*compute(unique[missing]))):
+                cache[row] = props
+        values = np.array([cache[row] for row in rows], dtype=float)
+        return tuple(values[inverse].T)
+
+    def evaluate(self, p_low, p_high, t_high):
+        '''
+        Evaluate a batch of design points in one go.
+        :param p_low: condenser pressures in kPa (array-like)
+        :param p_high: boiler pressures in kPa (array-like)
+        :param t_high: turbine inlet temperatures in °C (array-like); nan means saturated vapor
+        :return: dict of arrays: p_low, p_high, t_high and the fields of rankine_arrays()
+        '''
+        p_low, p_high, t_high = (np.ravel(a) for a in np.broadcast_arrays(
+            np.asarray(p_low, dtype=float), np.asarray(p_high, dtype=float), np.asarray(t_high, dtype=float)))
+        self.evaluations += p_low.size
+        self.batches += 1
+        d = self.decimals
+        # nan (saturated vapor inlet) would not compare equal in the keys
+        tKey = np.where(np.isnan(t_high), np.inf, np.round(t_high, d))
+
+        def inlet(keys):
+            state1 = steam.from_arrays(keys[:, 0], T=np.where(np.isinf(keys[:, 1]), np.nan, keys[:, 1]),
+                                       backend=self.backend)
+            return state1.h, state1.s
+
+        def pump(keys):
+            state3 = steam.from_arrays(keys[:, 0], x=0.0, backend=self.backend)
+            return state3.h, state3.v
+
+        h1, s1 = self.states(self.inlets, np.column_stack((np.round(p_high, d), tKey)), inlet)
+        h3, v3 = self.states(self.pumps, np.round(p_low, d)[:, None], pump)
+        out = cycle_arrays(p_low, p_high, h1, s1, h3, v3, self.backend)
+        out.update({'p_low': p_low, 'p_high': p_high, 't_high': t_high})
+        return out
+
+    def info(self):
+        '''
+        :return: dict with evaluations, batches, lookups, hits and the number of cached states
+        '''
+        return {'evaluations': self.evaluations, 'batches': self.batches, 'lookups': self.lookups,
+                'hits': self.hits, 'states': len(self.inlets) + len(self.pumps)}
+# endregion
+
+# region function definitions
+VARIABLES = ('p_low', 'p_high', 't_high')
+
+def optimize(p_low=(5.0, 100.0), p_high=(1000.0, 15000.0), t_high=(300.0, 600.0), x2min=0.88, constraints=(),
+             objective='efficiency', maximize=True, grid=9, levels=4, polish=True, tol=1e-8, maxiter=100,
+             evaluator=None, backend=None):
+    '''
+    Bounded, constrained design search on the Rankine cycle model: grid refinement over the bounds, then a
+    local SLSQP polish (scipy.optimize.minimize) from the best feasible grid point.  Every grid level is one
+    batch, and every SLSQP iteration evaluates the point and its finite-difference steps as one batch that
+    serves the objective, the constraints and their gradients.
+    :param p_low: condenser pressure in kPa: (min, max) bounds or a fixed value
+    :param p_high: boiler pressure in kPa: (min, max) bounds or a fixed value
+    :param t_high: turbine inlet temperature in °C: (min, max) bounds (the max is the temperature limit),
+                   a fixed value, or None for saturated vapor at the turbine inlet
+    :param x2min: minimum turbine exit quality state2.x (None for no limit)
+    :param constraints: more constraints, callables g(design) returning an array that must be >= 0, where
+                        design is the dict returned by cycleEvaluator.evaluate
+    :param objective: a field of the design dict (e.g. 'efficiency', 'turbine_work') or a callable f(design)
+    :param maximize: maximize (True) or minimize (False) the objective
+    :param grid: number of grid points per free variable on every level
+    :param levels: number of grid levels; each one spans two grid spacings of the previous around its best point
+    :param polish: run the SLSQP polish after the grid
+    :param tol: SLSQP tolerance (on the objective scaled to the best grid value)
+    :param maxiter: maximum number of SLSQP iterations
+    :param evaluator: a cycleEvaluator to share its state caches and counters between searches (default: new)
+    :param backend: steam property backend, 'table' or 'if97' (ignored if evaluator is given)
+    :return: dict with success, message, the best p_low, p_high, t_high, objective and design (dict of
+             floats), evaluations, gridEvaluations, polishEvaluations, batches, polishIterations and seconds
+    '''
+    evaluator = cycleEvaluator(backend) if evaluator is None else evaluator
+    start = time.perf_counter()
+    startEvaluations = evaluator.evaluations
+    startBatches = evaluator.batches
+    spec = {'p_low': p_low, 'p_high': p_high, 't_high': np.nan if t_high is None else t_high}
+    lo, hi = {}, {}
+    for name in VARIABLES:
+        bounds = np.atleast_1d(np.asarray(spec[name], dtype=float))
+        if bounds.size == 1:
+            bounds = np.repeat(bounds, 2)
+        if bounds.size != 2 or bounds[0] > bounds[1]:
+            raise ValueError('{} must be a value or (min, max) bounds, not {!r}'.format(name, spec[name]))
+        lo[name], hi[name] = bounds
+    free = [name for name in VARIABLES if hi[name] > lo[name]]
+    lower = np.array([lo[name] for name in free])
+    span = np.array([hi[name] - lo[name] for name in free])
+
+    def designs(u):
+        # design variables of the rows of u, the free variables scaled to [0, 1]
+        u = np.atleast_2d(u)
+        values = {name: np.full(len(u), lo[name]) for name in VARIABLES}
+        for j, name in enumerate(free):
+            values[name] = lower[j] + np.clip(u[:, j], 0.0, 1.0) * span[j]
+        return evaluator.evaluate(values['p_low'], values['p_high'], values['t_high'])
+
+    def score(design):
+        # (objective to minimize, constraint values >= 0 when feasible)
+        f = design[objective] if isinstance(objective, str) else np.asarray(objective(design), dtype=float)
+        f = -f if maximize else f
+        g = [design['x2'] - x2min] if x2min is not None else []
+        g += [np.asarray(c(design), dtype=float) for c in constraints]
+        g = np.array(g).reshape(len(g), -1) if g else np.zeros((0, len(f)))
+        return f, g
+
+    def best(f, g):
+        # index of the best feasible row, or None
+        ok = np.isfinite(f) & np.all(g >= 0.0, axis=0)
+        return int(np.argmin(np.where(ok, f, np.inf))) if np.any(ok) else None
+
+    #region grid refinement
+    center = np.full(len(free), 0.5)
+    halfWidth = np.full(len(free), 0.5)
+    uBest = fBest = None
+    for level in range(levels if free else 1):
+        axes = [np.linspace(max(0.0, c - w), min(1.0, c + w), grid) for c, w in zip(center, halfWidth)]
+        u = np.stack([a.ravel() for a in np.meshgrid(*axes, indexing='ij')], axis=1) if free else np.zeros((1, 0))
+        f, g = score(designs(u))
+        i = best(f, g)
+        if i is not None and (fBest is None or f[i] < fBest):
+            uBest, fBest = u[i], f[i]
+        if uBest is None:
+            # nothing feasible yet: refine around the point that violates the constraints least
+            violation = np.sum(np.where(np.isnan(g), np.inf, np.maximum(-g, 0.0)), axis=0)
+            center = u[int(np.argmin(violation))]
+        else:
+            center = uBest
+        halfWidth = np.array([2.0 * (a[1] - a[0]) if len(a) > 1 else 0.0 for a in axes])
+    gridEvaluations = evaluator.evaluations - startEvaluations
+    #endregion
+
+    result = {'success': uBest is not None, 'message': 'grid search',
+              'polishIterations': 0, 'gridEvaluations': gridEvaluations}
+    if uBest is not None and polish and free:
+        #region SLSQP polish with batched finite differences
+        step = 1e-6
+        scale = max(abs(fBest), 1e-12)
+        memo = {}
+
+        def point(u):
+            key = u.tobytes()
+            if key not in memo:
+                memo.clear()
+                us = np.vstack((u, u + step * np.eye(len(u))))
+                # forward steps that would leave [0, 1] are taken backward
+                back = us[1:].diagonal() > 1.0
+                us[1:][back, np.arange(len(u))[back]] -= 2.0 * step
+                f, g = score(designs(us))
+                sign = np.where(back, -1.0, 1.0)
+                memo[key] = (f[0] / scale, (f[1:] - f[0]) / scale / step * sign,
+                             g[:, 0], (g[:, 1:] - g[:, :1]) / step * sign)
+            return memo[key]
+
+        cons = []
+        if x2min is not None or constraints:
+            cons = [{'type': 'ineq', 'fun': lambda u: point(u)[2], 'jac': lambda u: point(u)[3]}]
+        res = minimize(lambda u: point(u)[0], uBest, jac=lambda u: point(u)[1], method='SLSQP',
+                       bounds=[(0.0, 1.0)] * len(free), constraints=cons, options={'ftol': tol, 'maxiter': maxiter})
+        uPolish = np.clip(res.x, 0.0, 1.0)
+        f, g = score(designs(uPolish))
+        # the tables are piecewise linear, so the polish is kept only if it is feasible and better
+        if best(f, g) is not None and f[0] < fBest:
+            uBest, fBest = uPolish, f[0]
+        result['message'] = 'SLSQP: ' + res.message
+        result['polishIterations'] = int(res.nit)
+        #endregion
+
+    if uBest is not None:
+        design = designs(uBest)
+        result['design'] = {k: float(val[0]) for k, val in design.items()}
+        result.update({name: result['design'][name] for name in VARIABLES})
+        result['objective'] = float(-fBest if maximize else fBest)
+    result['evaluations'] = evaluator.evaluations - startEvaluations
+    result['polishEvaluations'] = result['evaluations'] - gridEvaluations
+    result['batches'] = evaluator.batches - startBatches
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def main():
+    evaluator = cycleEvaluator()
+    print('{:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>8s} {:>8s} {:>8s} {:>9s}'.format(
+        'x2 min', 'p_low', 'p_high', 't_high', 'eff %', 'x2', 'evals', 'batches', 'seconds'))
+    for tMax in (450.0, 600.0):
+        for x2min in (0.85, 0.88, 0.9):
+            r = optimize(t_high=(300.0, tMax), x2min=x2min, evaluator=evaluator)
+            print('{:>8.2f} {:>10.2f} {:>10.1f} {:>10.1f} {:>10.3f} {:>8.4f} {:>8d} {:>8d} {:>9.3f}'.format(
+                x2min, r['p_low'], r['p_high'], r['t_high'], r['objective'], r['design']['x2'],
+                r['evaluations'], r['batches'], r['seconds']))
+    print(evaluator.info())
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
@@ -1,15 +1,17 @@
 from Steam_stem import steam
 
 class rankine():
-    def __init__(self, p_low=8, p_high=8000, t_high=None, name='Rankine Cycle'):
+    def __init__(self, p_low=8, p_high=8000, t_high=None, name='Rankine Cycle', backend=None):
         '''
         If t_high is None, assume saturated vapor (x=1) at p_high for state1.
         Otherwise, use t_high for superheated steam at p_high.
+        backend chooses the steam properties: 'table' or 'if97' (default: steam.defaultBackend).
         '''
         self.p_low = p_low
         self.p_high = p_high
         self.t_high = t_high
         self.name   = name
+        self.backend = backend
 
         self.efficiency   = None
         self.turbine_work = 0.0
@@ -24,20 +26,20 @@ class rankine():
         # STATE 1: Turbine Inlet
         if self.t_high is None:
             # saturated vapor at p_high => x=1
-            self.state1 = steam(self.p_high, x=1.0, name='Turbine Inlet')  # <-- #JES MISSING CODE
+            self.state1 = steam(self.p_high, x=1.0, name='Turbine Inlet', backend=self.backend)  # <-- #JES MISSING CODE
         else:
             # superheated steam at p_high => T = t_high
-            self.state1 = steam(self.p_high, T=self.t_high, name='Turbine Inlet')  # <-- #JES MISSING CODE
+            self.state1 = steam(self.p_high, T=self.t_high, name='Turbine Inlet', backend=self.backend)  # <-- #JES MISSING CODE
 
         # STATE 2: Turbine Exit => p_low, s = s1 (isentropic)
-        self.state2 = steam(self.p_low, s=self.state1.s, name='Turbine Exit')  # <-- #JES MISSING CODE
+        self.state2 = steam(self.p_low, s=self.state1.s, name='Turbine Exit', backend=self.backend)  # <-- #JES MISSING CODE
 
         # STATE 3: Pump Inlet => saturated liquid at p_low => x=0
-        self.state3 = steam(self.p_low, x=0.0, name='Pump Inlet')  # <-- #JES MISSING CODE
+        self.state3 = steam(self.p_low, x=0.0, name='Pump Inlet', backend=self.backend)  # <-- #JES MISSING CODE
 
         # STATE 4: Pump Exit => p_high, same s as state3 is not truly correct for real liquids,
         # but let's do a simpler approach:
-        self.state4 = steam(self.p_high, s=self.state3.s, name='Pump Exit')
+        self.state4 = steam(self.p_high, s=self.state3.s, name='Pump Exit', backend=self.backend)
         # Then approximate the enthalpy rise in the pump:
         self.state4.h = self.state3.h + self.state3.v * (self.p_high - self.p_low)
         # (Units: kJ/kg + [m^3/kg * kPa] => must confirm consistent units. Usually 1 kPa=1 kJ/(m^3).)
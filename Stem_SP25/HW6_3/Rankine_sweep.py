@@ -0,0 +1,124 @@
+# region imports
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Steam_stem import steam
+# endregion
+
+# region function definitions
+SWEEP_FIELDS = ('p_low', 'p_high', 't_high', 'efficiency', 'turbine_work', 'pump_work', 'heat_added', 'x2')
+
+def rankine_arrays(p_low, p_high, t_high=None, backend=None):
+    '''
+    Vectorized version of rankine(p_low, p_high, t_high).calc_efficiency() using steam.from_arrays().
+    A t_high of nan (or None) means saturated vapor at the turbine inlet, as in the rankine class.
+    :param p_low: condenser pressures in kPa (array-like)
+    :param p_high: boiler pressures in kPa (array-like)
+    :param t_high: turbine inlet temperatures in °C (array-like or None)
+    :param backend: steam property backend, 'table' or 'if97' (default: steam.defaultBackend)
+    :return: dict of arrays with efficiency (%), turbine_work, pump_work, heat_added (kJ/kg)
+             and the turbine exit quality x2
+    '''
+    if t_high is None:
+        t_high = np.nan
+    p_low, p_high, t_high = np.broadcast_arrays(np.asarray(p_low, dtype=float),
+                                                np.asarray(p_high, dtype=float),
+                                                np.asarray(t_high, dtype=float))
+    # STATE 1: turbine inlet; T <= Tsat (or nan) falls into the saturated branch with x=1
+    state1 = steam.from_arrays(p_high, T=t_high, backend=backend)
+    # STATE 3: pump inlet, saturated liquid at p_low
+    state3 = steam.from_arrays(p_low, x=np.zeros_like(p_low), backend=backend)
+    return cycle_arrays(p_low, p_high, state1.h, state1.s, state3.h, state3.v, backend)
+
+def cycle_arrays(p_low, p_high, h1, s1, h3, v3, backend=None):
+    '''
+    The rest of rankine_arrays() once the turbine inlet (state 1) and pump inlet (state 3) are known, for callers
+    that look those states up themselves (e.g. Rankine_optimize reuses them across evaluations).
+    :param p_low: condenser pressures in kPa (array)
+    :param p_high: boiler pressures in kPa (array)
+    :param h1: turbine inlet enthalpies in kJ/kg
+    :param s1: turbine inlet entropies in kJ/(kg·K)
+    :param h3: pump inlet enthalpies in kJ/kg
+    :param v3: pump inlet specific volumes in m^3/kg
+    :param backend: steam property backend, 'table' or 'if97' (default: steam.defaultBackend)
+    :return: dict of arrays as rankine_arrays()
+    '''
+    # STATE 2: turbine exit, isentropic expansion to p_low
+    state2 = steam.from_arrays(p_low, s=s1, backend=backend)
+    # STATE 4: pump exit, same approximation as rankine.calc_efficiency()
+    h4 = h3 + v3 * (p_high - p_low)
+
+    turbine_work = h1 - state2.h
+    pump_work = h4 - h3
+    heat_added = h1 - h4
+    efficiency = 100.0 * (turbine_work - pump_work) / heat_added
+    return {'efficiency': efficiency, 'turbine_work': turbine_work,
+            'pump_work': pump_work, 'heat_added': heat_added, 'x2': state2.x}
+
+def sweep(p_low, p_high, t_high=None, grid=True, chunksize=20000, workers=None, progress=None, backend=None):
+    '''
+    Evaluate the Rankine cycle over many design points.
+    :param p_low: condenser pressures in kPa (scalar or array-like)
+    :param p_high: boiler pressures in kPa (scalar or array-like)
+    :param t_high: turbine inlet temperatures in °C (scalar, array-like or None); nan/None means saturated vapor
+    :param grid: if True, evaluate every combination of the inputs; otherwise the inputs are broadcast together
+    :param chunksize: number of design points evaluated per vectorized call
+    :param workers: number of worker processes; None or 1 evaluates the chunks in this process
+    :param progress: optional callable progress(done, total) called after each chunk
+    :param backend: steam property backend, 'table' or 'if97' (default: steam.defaultBackend in each process)
+    :return: a NumPy structured array with fields SWEEP_FIELDS, one row per design point
+    '''
+    t_high = np.array([np.nan if t is None else t for t in np.atleast_1d(np.asarray(t_high, dtype=object))], dtype=float)
+    p_low = np.atleast_1d(np.asarray(p_low, dtype=float))
+    p_high = np.atleast_1d(np.asarray(p_high, dtype=float))
+    if grid:
+        p_low, p_high, t_high = (a.ravel() for a in np.meshgrid(p_low, p_high, t_high, indexing='ij'))
+    else:
+        p_low, p_high, t_high = (a.ravel() for a in np.broadcast_arrays(p_low, p_high, t_high))
+
+    total = p_low.size
+    result = np.zeros(total, dtype=[(f, float) for f in SWEEP_FIELDS])
+    result['p_low'] = p_low
+    result['p_high'] = p_high
+    result['t_high'] = t_high
+    bounds = [(i, min(i + chunksize, total)) for i in range(0, total, chunksize)]
+
+    def store(lo, hi, out):
+        for f in SWEEP_FIELDS[3:]:
+            result[f][lo:hi] = out[f]
+
+    done = 0
+    if workers is None or workers <= 1:
+        for lo, hi in bounds:
+            store(lo, hi, rankine_arrays(p_low[lo:hi], p_high[lo:hi], t_high[lo:hi], backend))
+            done += hi - lo
+            if progress is not None:
+                progress(done, total)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(rankine_arrays, p_low[lo:hi], p_high[lo:hi], t_high[lo:hi], backend): (lo, hi)
+                       for lo, hi in bounds}
+            for fut in as_completed(futures):
+                lo, hi = futures[fut]
+                store(lo, hi, fut.result())
+                done += hi - lo
+                if progress is not None:
+                    progress(done, total)
+    return result
+
+def main():
+    p_low = np.linspace(5, 100, 40)
+    p_high = np.linspace(1000, 15000, 50)
+    t_high = [None] + list(np.linspace(300, 600, 25))
+    start = time.perf_counter()
+    res = sweep(p_low, p_high, t_high, progress=lambda done, total: print('\r{}/{}'.format(done, total), end=''))
+    print('\n{} design points in {:0.3f} s'.format(len(res), time.perf_counter() - start))
+    best = res[np.nanargmax(res['efficiency'])]
+    print('best: p_low={:0.1f} kPa, p_high={:0.0f} kPa, t_high={:0.1f} °C, efficiency={:0.3f}%'.format(
+        best['p_low'], best['p_high'], best['t_high'], best['efficiency']))
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    main()
+# endregion
@@ -0,0 +1,304 @@
+# region imports
+import os
+import json
+import hashlib
+import bisect
+import threading
+import numpy as np
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import Delaunay
+# endregion
+
+# region class definitions
+class steamTables():
+    """
+    Holds the saturated and superheated steam tables as pre-sorted NumPy arrays.
+    A single instance is shared by every steam object in the process (see getTables()),
+    so the text files are parsed once instead of on every steam.calc().
+
+    The interpolators are built once per load as well.  Saturated properties come from one
+    linear interpolation along the sorted pressure column that fetches all seven columns together.
+    Superheated inversions reuse a cached Delaunay triangulation of each (x, p) plane, which is
+    exactly what scipy's griddata(method='linear') rebuilt on every call, so results agree with
+    the old per-call griddata to round-off (better than 1e-9 relative).
+    """
+    def __init__(self, satFile=None, shFile=None, binFile=None, useBinary=True):
+        '''
+        :param satFile: path of the saturated table (default: sat_water_table.txt next to this module)
+        :param shFile: path of the superheated table (default: superheated_water_table.txt next to this module)
+        :param binFile: path of the compiled tables (default: steam_tables.bin next to this module, see compileTables)
+        :param useBinary: memory-map the compiled tables, compiling them first if they are missing or out of date
+        '''
+        here = os.path.dirname(os.path.abspath(__file__))
+        self.satFile = satFile if satFile is not None else os.path.join(here, 'sat_water_table.txt')
+        self.shFile = shFile if shFile is not None else os.path.join(here, 'superheated_water_table.txt')
+        self.binFile = binFile if binFile is not None else os.path.join(here, BINARY_NAME)
+        self.useBinary = useBinary
+        self.source = None  # 'binary' or 'text': where the arrays of the last load came from
+        self.version = 0  # incremented on every (re)load so dependents can tell the data changed
+        self.load()
+
+    def load(self, parse=False):
+        '''
+        Load the tables: memory-map the compiled binary when it matches the text files, otherwise parse the
+        text files (and, with useBinary, write the binary for the next process).
+        :param parse: parse the text files even if the binary is up to date
+        '''
+        arrays = None
+        if self.useBinary and not parse:
+            arrays = readBinary(self.binFile, sourceHash(self.satFile, self.shFile))
+            if arrays is None:
+                try:
+                    compileTables(self.satFile, self.shFile, self.binFile)
+                    arrays = readBinary(self.binFile)
+                except OSError:
+                    arrays = None  # e.g. a read-only install: fall back to the text files
+        self.source = 'binary' if arrays is not None else 'text'
+        self.setArrays(arrays if arrays is not None else parseTables(self.satFile, self.shFile))
+        self.shInterp = {}  # superheated interpolators, built on first use for each given property
+        self.stamp = self.fileStamp()
+        self.version += 1
+
+    def setArrays(self, arrays):
+        '''
+        Store the table columns (see parseTables); the saturated columns are rows of satCols.
+        '''
+        # all saturated columns interpolated in one pass: Tsat, hf, hg, sf, sg, vf, vg
+        self.satCols = arrays['satCols']
+        self.ts, self.hfs, self.hgs, self.sfs, self.sgs, self.vfs, self.vgs = self.satCols
+        self.ps = arrays['ps']  # bar, sorted
+        self.tcol = arrays['tcol']  # °C
+        self.hcol = arrays['hcol']  # kJ/kg
+        self.scol = arrays['scol']  # kJ/(kg·K)
+        self.pcol = arrays['pcol']  # kPa
+        # plain-Python copies for satPoint()
+        self.psList = self.ps.tolist()
+        self.satRows = self.satCols.T.tolist()
+
+    def satProps(self, p):
+        '''
+        Linear interpolation of the saturated table along the pressure column.
+        :param p: pressure in kPa (float or array)
+        :return: array of shape (7,) + shape(p) holding Tsat, hf, hg, sf, sg, vf, vg (nan outside the table)
+        '''
+        Pbar = np.asarray(p, dtype=float) / 100.0
+        ps = self.ps
+        i = np.clip(np.searchsorted(ps, Pbar), 1, len(ps) - 1)
+        w = (Pbar - ps[i - 1]) / (ps[i] - ps[i - 1])
+        vals = self.satCols[:, i - 1] * (1.0 - w) + self.satCols[:, i] * w
+        outside = (Pbar < ps[0]) | (Pbar > ps[-1])
+        if np.any(outside):
+            vals = np.where(outside, np.nan, vals)
+        return vals
+
+    def satPoint(self, p):
+        '''
+        satProps for a single pressure in plain Python floats, which avoids the NumPy call overhead
+        (same arithmetic, so the results are identical).
+        :param p: pressure in kPa (float)
+        :return: tuple Tsat, hf, hg, sf, sg, vf, vg (nan outside the table)
+        '''
+        Pbar = p / 100.0
+        ps = self.psList
+        if not ps[0] <= Pbar <= ps[-1]:
+            return (float('nan'),) * 7
+        i = min(max(bisect.bisect_left(ps, Pbar), 1), len(ps) - 1)
+        w = (Pbar - ps[i - 1]) / (ps[i] - ps[i - 1])
+        return tuple(a * (1.0 - w) + b * w for a, b in zip(self.satRows[i - 1], self.satRows[i]))
+
+    def shInterpolator(self, given):
+        '''
+        Get the cached superheated interpolator for a given second property.
+        :param given: 'T', 'h' or 's'
+        :return: a LinearNDInterpolator on (given, p) returning the other two of (T, h, s)
+        '''
+        interp = self.shInterp.get(given)
+        if interp is None:
+            cols = {'T': self.tcol, 'h': self.hcol, 's': self.scol}
+            others = [cols[k] for k in ('T', 'h', 's') if k != given]
+            tri = Delaunay(np.column_stack((cols[given], self.pcol)))
+            interp = LinearNDInterpolator(tri, np.column_stack(others))
+            self.shInterp[given] = interp
+        return interp
+
+    def shProps(self, given, value, p):
+        '''
+        Interpolate the superheated table at (value, p).
+        :param given: which property value is: 'T' (°C), 'h' (kJ/kg) or 's' (kJ/(kg·K))
+        :param value: the given property (float or array)
+        :param p: pressure in kPa (float or array)
+        :return: T, h, s (°C, kJ/kg, kJ/(kg·K)), nan outside the table
+        '''
+        value, p = np.broadcast_arrays(np.asarray(value, dtype=float), np.asarray(p, dtype=float))
+        a, b = np.moveaxis(self.shInterpolator(given)(value, p), -1, 0)
+        if given == 'T':
+            return value, a, b
+        if given == 'h':
+            return a, value, b
+        return a, b, value
+
+    def fileStamp(self):
+        '''
+        :return: (mtime, size) of both table files, used to detect changes on disk (None without the files)
+        '''
+        try:
+            st1 = os.stat(self.satFile)
+            st2 = os.stat(self.shFile)
+        except FileNotFoundError:
+            return None
+        return (st1.st_mtime_ns, st1.st_size, st2.st_mtime_ns, st2.st_size)
+
+    def isStale(self):
+        '''
+        :return: True if either table file changed since it was last loaded
+        '''
+        return self.fileStamp() != self.stamp
+
+    def reload(self, force=False):
+        '''
+        Re-parse the table files if they changed on disk (or unconditionally if force is True).
+        :return: True if the tables were reloaded
+        '''
+        if force or self.isStale():
+            self.load(parse=force)
+            return True
+        return False
+# endregion
+
+# region function definitions
+BINARY_NAME = 'steam_tables.bin'
+BINARY_MAGIC = b'STEAMTB\0'
+BINARY_VERSION = 1  # layout of the compiled file; bump when the stored arrays change
+ARRAY_NAMES = ('satCols', 'ps', 'tcol', 'hcol', 'scol', 'pcol')
+
+def parseTables(satFile, shFile):
+    '''
+    Parse both table files.  The saturated table is sorted by pressure and the superheated table by (p, T).
+    :return: dictionary of contiguous float64 arrays: satCols (Tsat, hf, hg, sf, sg, vf, vg rows), ps (bar),
+             tcol, hcol, scol and pcol (kPa)
+    '''
+    # The columns are: T[°C], p[bar], hf, hg, sf, sg, vf, vg
+    sat_data = np.loadtxt(satFile, skiprows=1)
+    sat_data = sat_data[np.argsort(sat_data[:, 1], kind='stable')]
+    # The columns are: Tcol[°C], hcol[kJ/kg], scol[kJ/(kg·K)], pcol[kPa]
+    sh_data = np.loadtxt(shFile, skiprows=1)
+    sh_data = sh_data[np.lexsort((sh_data[:, 0], sh_data[:, 3]))]
+    return {'satCols': np.ascontiguousarray(sat_data[:, [0, 2, 3, 4, 5, 6, 7]].T),
+            'ps': np.ascontiguousarray(sat_data[:, 1]),
+            'tcol': np.ascontiguousarray(sh_data[:, 0]),
+            'hcol': np.ascontiguousarray(sh_data[:, 1]),
+            'scol': np.ascontiguousarray(sh_data[:, 2]),
+            'pcol': np.ascontiguousarray(sh_data[:, 3])}
+
+def sourceHash(satFile, shFile):
+    '''
+    :return: SHA-1 of the contents of both table files (None if either is missing)
+    '''
+    h = hashlib.sha1()
+    try:
+        for name in (satFile, shFile):
+            with open(name, 'rb') as f:
+                h.update(f.read())
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+def compileTables(satFile=None, shFile=None, binFile=None):
+    '''
+    One-time compile step: parse the text tables and write their sorted columns to a versioned binary file
+    that steamTables memory-maps read-only, so every process shares the same pages instead of parsing its
+    own copy.  Layout: an 8-byte magic, a 4-byte little-endian header length, a JSON header (format
+    version, SHA-1 of the text files, name/offset/shape of every array), then float64 data aligned to 64
+    bytes.  The file is written to a temporary name and renamed, so concurrent processes never see it
+    half written.  Run this module to compile the default tables.
+    :return: the path of the binary file
+    '''
+    here = os.path.dirname(os.path.abspath(__file__))
+    satFile = satFile if satFile is not None else os.path.join(here, 'sat_water_table.txt')
+    shFile = shFile if shFile is not None else os.path.join(here, 'superheated_water_table.txt')
+    binFile = binFile if binFile is not None else os.path.join(here, BINARY_NAME)
+    arrays = parseTables(satFile, shFile)
+    layout = {}
+    offset = 0  # in float64 items from the start of the data
+    for name in ARRAY_NAMES:
+        layout[name] = (offset, arrays[name].shape)
+        offset += -(-arrays[name].size // 8) * 8  # keep every array 64-byte aligned
+    header = json.dumps({'format': BINARY_VERSION, 'source': sourceHash(satFile, shFile),
+                         'arrays': layout}).encode()
+    dataStart = -(-(len(BINARY_MAGIC) + 4 + len(header)) // 64) * 64
+    tmp = '{}.{}.tmp'.format(binFile, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(BINARY_MAGIC + np.uint32(len(header)).astype('<u4').tobytes() + header)
+            data = np.zeros(offset, dtype='<f8')
+            for name, (start, shape) in layout.items():
+                data[start:start + arrays[name].size] = arrays[name].ravel()
+            f.write(bytes(dataStart - f.tell()))
+            f.write(data.tobytes())
+        os.replace(tmp, binFile)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return binFile
+
+def readBinary(binFile, source=None):
+    '''
+    Memory-map a compiled table file read-only.
+    :param binFile: the file written by compileTables
+    :param source: expected sourceHash of the text files (None accepts any)
+    :return: dictionary of read-only arrays backed by the mapping, or None if the file is missing, has
+             another format version, was compiled from different text files or is truncated or corrupt
+    '''
+    try:
+        with open(binFile, 'rb') as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                return None
+            size = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            header = json.loads(f.read(size))
+        if header.get('format') != BINARY_VERSION or (source is not None and header.get('source') != source):
+            return None
+        dataStart = -(-(len(BINARY_MAGIC) + 4 + size) // 64) * 64
+        data = np.memmap(binFile, dtype='<f8', mode='r', offset=dataStart)
+        arrays = {}
+        for name in ARRAY_NAMES:
+            start, shape = header['arrays'][name]
+            n = int(np.prod(shape))
+            # a short slice (the file ends early) does not reshape
+            arrays[name] = data[start:start + n].reshape(shape)
+    except (FileNotFoundError, ValueError, IndexError, KeyError, TypeError, AttributeError):
+        return None
+    return arrays
+
+_tables = None
+_lock = threading.Lock()
+
+def getTables(check=False):
+    '''
+    Return the process-wide steamTables instance, loading it on first use.
+    :param check: if True, reload the tables when the files changed on disk
+    :return: the shared steamTables object
+    '''
+    global _tables
+    if _tables is None:
+        with _lock:
+            if _tables is None:
+                _tables = steamTables()
+    elif check:
+        with _lock:
+            _tables.reload()
+    return _tables
+
+def reloadTables(force=False):
+    '''
+    Reload the shared tables if the files changed on disk (or unconditionally if force is True).
+    :return: True if the tables were reloaded
+    '''
+    tables = getTables()
+    with _lock:
+        return tables.reload(force=force)
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    print('compiled {}'.format(compileTables()))
+# endregion
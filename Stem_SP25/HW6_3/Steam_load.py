@@ -0,0 +1,141 @@
+# region imports
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from Steam_stem import steam
+from Steam_server import steamServer
+# endregion
+
+# region function definitions
+async def request(reader, writer, method, target, payload=None):
+    '''
+    One HTTP/1.1 request on a keep-alive connection.
+    :return: (status, decoded JSON body)
+    '''
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'
+                 .format(method, target, len(body)).encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = header.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def connect(address):
+    # address is (host, port) or a Unix socket path
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+async def client(address, requests, states, rng, latencies):
+    '''
+    Send requests one after another on one connection, each with states random (p, s) states, the mix a
+    turbine-exit calculation produces.  Appends the latency of every request (s) to latencies.
+    '''
+    reader, writer = await connect(address)
+    try:
+        for _ in range(requests):
+            p = rng.uniform(10.0, 20000.0, states)
+            s = rng.uniform(0.5, 8.5, states)
+            payload = {'p': float(p[0]), 's': float(s[0])} if states == 1 else {'p': p.tolist(), 's': s.tolist()}
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', '/steam', payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError('the server answered {}'.format(status))
+    finally:
+        writer.close()
+
+async def run(address, clients, requests, states, seed=0):
+    '''
+    Run the clients concurrently against a server.
+    :return: dict with the client-side request count, seconds, p50/p99 latency (ms), throughput and the
+             server's /metrics
+    '''
+    rng = np.random.default_rng(seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(address, requests, states, np.random.default_rng(rng.integers(2**32)), latencies)
+                           for _ in range(clients)])
+    seconds = time.perf_counter() - start
+    reader, writer = await connect(address)
+    try:
+        _, metrics = await request(reader, writer, 'GET', '/metrics')
+    finally:
+        writer.close()
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    return {'requests': len(latencies), 'seconds': seconds, 'p50Ms': p50, 'p99Ms': p99,
+            'requestsPerSecond': len(latencies) / seconds, 'statesPerSecond': len(latencies) * states / seconds,
+            'server': metrics}
+
+def baseline(n=2000, seed=0):
+    '''
+    :return: states per second of one-by-one steam(p, s) objects in this process, for comparison
+    '''
+    rng = np.random.default_rng(seed)
+    p = rng.uniform(10.0, 20000.0, n)
+    s = rng.uniform(0.5, 8.5, n)
+    steam(p[0], s=s[0]).h
+    start = time.perf_counter()
+    for i in range(n):
+        steam(p[i], s=s[i]).h
+    return n / (time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for Steam_server.  Without --port or --unix, a server '
+                                                 'is started in this process on a free local port.')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent connections')
+    parser.add_argument('--requests', type=int, default=100, help='requests per connection')
+    parser.add_argument('--states', type=int, default=1, help='states per request')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='use the server already running on this port')
+    parser.add_argument('--unix', metavar='PATH', help='use the server already running on this Unix socket')
+    parser.add_argument('--max-delay', type=float, default=1.0, help='batching delay in ms of the in-process server')
+    parser.add_argument('--json', metavar='PATH', help='also save the results')
+    args = parser.parse_args(argv)
+
+    async def go():
+        server = None
+        if args.unix is not None:
+            address = args.unix
+        elif args.port is not None:
+            address = (args.host, args.port)
+        else:
+            server = steamServer(maxDelay=args.max_delay / 1e3)
+            await server.start(args.host, 0)
+            address = server.address()[:2]
+        try:
+            return await run(address, args.clients, args.requests, args.states)
+        finally:
+            if server is not None:
+                await server.close()
+
+    result = asyncio.run(go())
+    result['oneByOneStatesPerSecond'] = baseline()
+    server = result['server']
+    print('{} requests of {} state(s) from {} clients in {:0.2f} s'.format(result['requests'], args.states,
+                                                                           args.clients, result['seconds']))
+    print('client latency: p50 {:0.2f} ms, p99 {:0.2f} ms'.format(result['p50Ms'], result['p99Ms']))
+    print('throughput: {:0.0f} requests/s, {:0.0f} states/s (one-by-one steam(): {:0.0f} states/s)'.format(
+        result['requestsPerSecond'], result['statesPerSecond'], result['oneByOneStatesPerSecond']))
+    print('server: {} batches, mean {:0.1f} states, largest {}; latency p50 {:0.2f} ms, p99 {:0.2f} ms'.format(
+        server['batches'], server['meanBatch'], server['largestBatch'], server['latencyMs']['p50'],
+        server['latencyMs']['p99']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=1)
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    sys.exit(main())
+# endregion
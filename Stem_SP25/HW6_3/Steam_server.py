@@ -0,0 +1,305 @@
+# region imports
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl
+import numpy as np
+from Steam_stem import steam, checkBackend
+from SteamTables import getTables
+# endregion
+
+# region class definitions
+class steamServer():
+    """
+    Local asyncio HTTP/1.1 service for steam properties (TCP on localhost or a Unix socket).
+    The tables and interpolators are loaded once and stay resident.  Concurrent requests are queued and
+    evaluated in micro-batches: the batcher waits up to maxDelay after the first queued request, then
+    evaluates everything queued (up to maxBatch states) with one steam.from_arrays call per second property.
+
+    Endpoints (JSON responses, keep-alive connections):
+        GET  /steam?p=8000&T=500               one state: p in kPa plus one of T, x, h or s (and optional backend)
+        POST /steam {"p": 8000, "s": 6.5}      the same as JSON; lists for p and the property give lists back,
+                                               and a list of such objects gives a list of results
+        GET  /metrics                          request and state counts, batch sizes, p50/p99 latency, throughput
+        GET  /health
+    """
+    def __init__(self, maxBatch=4096, maxDelay=0.001, backend=None, window=10000):
+        '''
+        :param maxBatch: maximum number of states evaluated in one batch
+        :param maxDelay: seconds the batcher waits after the first queued request for more to arrive
+        :param backend: default steam property backend, 'table' or 'if97' (default: steam.defaultBackend)
+        :param window: number of recent requests the latency and throughput metrics are computed over
+        '''
+        self.maxBatch = maxBatch
+        self.maxDelay = maxDelay
+        self.backend = steam.defaultBackend if backend is None else checkBackend(backend)
+        self.recent = deque(maxlen=window)  # (finish time, latency in s, states) of recent requests
+        self.requests = 0
+        self.states = 0
+        self.errors = 0
+        self.batches = 0
+        self.batchedStates = 0
+        self.largestBatch = 0
+        self.queue = None
+        self.server = None
+        self.batcher = None
+        self.started = None
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        '''
+        Load the tables, start the batcher and listen.
+        :param host: interface to listen on (keep it local: there is no authentication)
+        :param port: TCP port (0 picks a free one, see address())
+        :param path: listen on this Unix socket instead of TCP
+        :return: the asyncio server
+        '''
+        getTables()
+        for given, value in (('T', 500.0), ('h', 3000.0), ('s', 7.0), ('x', 0.5)):
+            # build the interpolators before the first request
+            steam.from_arrays([1000.0], backend=self.backend, **{given: [value]})
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.runBatches())
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        self.started = time.perf_counter()
+        return self.server
+
+    def address(self):
+        '''
+        :return: (host, port) or the Unix socket path the server listens on
+        '''
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+
+    async def handle(self, reader, writer):
+        '''
+        Serve the requests of one connection until the client closes it (or asks to).
+        '''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                start = time.perf_counter()
+                if len(parts) != 3:
+                    status, payload, states = 400, {'error': 'malformed request line'}, 0
+                    keepAlive = False
+                else:
+                    method, target, version = parts
+                    body = await reader.readexactly(int(headers.get('content-length', '0') or 0))
+                    connection = headers.get('connection', '').lower()
+                    keepAlive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                    status, payload, states = await self.respond(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                             'Connection: {}\r\n\r\n'.format(status, STATUS.get(status, ''), len(data),
+                                                             'keep-alive' if keepAlive else 'close').encode()
+                             + data)
+                await writer.drain()
+                self.record(start, status, states)
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # the client went away or sent an unreadable request
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, body):
+        '''
+        :return: (HTTP status, JSON payload, number of states evaluated)
+        '''
+        url = urlsplit(target)
+        if url.path == '/steam' and method in ('GET', 'POST'):
+            try:
+                request = dict(parse_qsl(url.query)) if method == 'GET' else json.loads(body or b'null')
+                items = request if isinstance(request, list) else [request]
+                parsed = [parseState(item, self.backend) for item in items]
+                if len(parsed) == 1:
+                    results = [await self.submit(*parsed[0][:4])]
+                else:
+                    results = await asyncio.gather(*[self.submit(*item[:4]) for item in parsed])
+            except ValueError as err:  # also json.JSONDecodeError
+                return 400, {'error': str(err)}, 0
+            payload = [formatState(result, item[4]) for result, item in zip(results, parsed)]
+            return 200, (payload if isinstance(request, list) else payload[0]), sum(r['p'].size for r in results)
+        if url.path == '/metrics' and method == 'GET':
+            return 200, self.metrics(), 0
+        if url.path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}, 0
+        return 404, {'error': 'no such endpoint: {} {}'.format(method, url.path)}, 0
+
+    async def submit(self, given, backend, p, value):
+        '''
+        Queue states for the next batch and wait for them.
+        :return: dict of arrays p, T, h, s, v, x and region
+        '''
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((given, backend, p, value, future))
+        return await future
+
+    async def runBatches(self):
+        '''
+        The batcher: collect queued requests for up to maxDelay, then evaluate them together.
+        '''
+        while True:
+            items = [await self.queue.get()]
+            if self.queue.qsize() + 1 < self.maxBatch:
+                await asyncio.sleep(self.maxDelay)
+            count = items[0][2].size
+            while count < self.maxBatch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+                count += items[-1][2].size
+            self.evaluate(items)
+
+    def evaluate(self, items):
+        '''
+        Evaluate queued requests with one steam.from_arrays call per (second property, backend) and hand
+        every request its slice of the results.
+        '''
+        groups = {}
+        for item in items:
+            groups.setdefault(item[:2], []).append(item)
+        for (given, backend), group in groups.items():
+            sizes = [item[2].size for item in group]
+            try:
+                states = steam.from_arrays(np.concatenate([item[2] for item in group]), backend=backend,
+                                           **{given: np.concatenate([item[3] for item in group])})
+                region = states.region()
+            except Exception as err:
+                for item in group:
+                    if not item[4].done():
+                        item[4].set_exception(ValueError(str(err)))
+                continue
+            start = 0
+            for item, n in zip(group, sizes):
+                if not item[4].done():  # the client may have gone away
+                    item[4].set_result({'p': states.p[start:start + n], 'T': states.T[start:start + n],
+                                        'h': states.h[start:start + n], 's': states.s[start:start + n],
+                                        'v': states.v[start:start + n], 'x': states.x[start:start + n],
+                                        'region': region[start:start + n]})
+                start += n
+            self.batches += 1
+            self.batchedStates += sum(sizes)
+            self.largestBatch = max(self.largestBatch, sum(sizes))
+
+    def record(self, start, status, states):
+        now = time.perf_counter()
+        self.requests += 1
+        self.states += states
+        if status >= 400:
+            self.errors += 1
+        self.recent.append((now, now - start, states))
+
+    def metrics(self):
+        '''
+        :return: dict with the totals since start and, over the recent window, the latency percentiles (ms)
+                 and the request and state throughput (per second)
+        '''
+        now = time.perf_counter()
+        result = {'uptime': now - self.started, 'requests': self.requests, 'states': self.states,
+                  'errors': self.errors, 'batches': self.batches, 'largestBatch': self.largestBatch,
+                  'meanBatch': self.batchedStates / self.batches if self.batches else None,
+                  'queued': self.queue.qsize(), 'window': len(self.recent)}
+        if self.recent:
+            finish, latency, states = (np.array(col, dtype=float) for col in zip(*self.recent))
+            span = max(now - (finish[0] - latency[0]), 1e-9)
+            p50, p99 = np.percentile(latency, [50, 99]) * 1e3
+            result.update({'latencyMs': {'p50': p50, 'p99': p99, 'max': latency.max() * 1e3},
+                           'requestsPerSecond': len(finish) / span, 'statesPerSecond': states.sum() / span})
+        return result
+# endregion
+
+# region function definitions
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}
+PROPERTIES = ('T', 'x', 'h', 's')
+
+def parseState(request, backend):
+    '''
+    Check one request object.
+    :param request: dict with p and exactly one of T, x, h or s (numbers, numeric strings or lists), and
+                    optionally backend
+    :param backend: the backend used when the request does not name one
+    :return: (given property, backend, p array, value array, True if the request used lists)
+    '''
+    if not isinstance(request, dict) or 'p' not in request:
+        raise ValueError('a state needs p and one of T, x, h or s')
+    given = [k for k in PROPERTIES if k in request]
+    if len(given) != 1:
+        raise ValueError('give exactly one of T, x, h or s, not {}'.format(', '.join(given) or 'none'))
+    given = given[0]
+    backend = checkBackend(request.get('backend', backend))
+    if isinstance(request['p'], (int, float, str)) and isinstance(request[given], (int, float, str)):
+        # a single state (the common case) without the NumPy broadcasting overhead
+        try:
+            return given, backend, np.array([float(request['p'])]), np.array([float(request[given])]), False
+        except ValueError:
+            raise ValueError('p and {} must be numbers'.format(given)) from None
+    try:
+        p, value = np.broadcast_arrays(np.asarray(request['p'], dtype=float), np.asarray(request[given], dtype=float))
+    except (TypeError, ValueError):
+        raise ValueError('p and {} must be numbers or lists of numbers of the same length'.format(given)) from None
+    if p.ndim > 1:
+        raise ValueError('p and {} must be numbers or flat lists'.format(given))
+    return given, backend, p.ravel(), value.ravel(), p.ndim == 1
+
+def formatState(result, columns):
+    '''
+    :param result: dict of arrays from steamServer.submit
+    :param columns: return lists (True) or the single state as numbers (False)
+    :return: JSON-ready dict; nan (outside the tables) becomes null
+    '''
+    state = {}
+    for k, val in result.items():
+        values = [None if isinstance(a, float) and a != a else a for a in val.tolist()]
+        state[k] = values if columns else values[0]
+    return state
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve steam properties over HTTP on localhost.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=4096, help='maximum states per batch')
+    parser.add_argument('--max-delay', type=float, default=1.0, help='batching delay in ms')
+    parser.add_argument('--backend', choices=('table', 'if97'), default=None)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = steamServer(args.max_batch, args.max_delay / 1e3, args.backend)
+        await server.start(args.host, args.port, args.unix)
+        print('steam properties served on {}'.format(server.address()), flush=True)
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    sys.exit(main())
+# endregion
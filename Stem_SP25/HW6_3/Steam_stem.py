@@ -1,14 +1,38 @@
 # region imports
 import numpy as np
-from scipy.interpolate import griddata
+from collections import OrderedDict
+from SteamTables import getTables
+import IF97
 # endregion
 
 # region class definitions
+def lazyProperty(slot, doc):
+    # a property backed by slot that resolves a pending state on first read; assigning it overrides the value
+    def get(self):
+        if getattr(self, slot) is None and self.pending is not None:
+            self.resolve()
+        return getattr(self, slot)
+
+    def set(self, value):
+        setattr(self, slot, value)
+    return property(get, set, doc=doc)
+
 class steam():
     """
     The steam class is used to find thermodynamic properties of steam along an isobar.
+    Properties come from the bundled tables ('table') or from the IAPWS-IF97 equations ('if97', see IF97.py),
+    which also give the superheated specific volume and compressed liquid states.
+
+    States are lazy: the constructor only classifies the region from the saturation properties at p, and the
+    superheated (or compressed liquid) interpolation runs the first time T, x, h or s is read.  The
+    superheated specific volume is computed only when v is read.  Assigning a property (e.g. state 4's h in
+    rankine) overrides it without triggering the interpolation.
     """
-    def __init__(self, pressure, T=None, x=None, v=None, h=None, s=None, name=None):
+    __slots__ = ('p', 'name', 'backend', 'region', 'hf', '_T', '_x', '_v', '_h', '_s', 'pending', 'lazyV')
+    cache = None  # optional steamCache shared by all instances, see enableCache()
+    defaultBackend = 'table'  # property backend of instances that do not choose one, see setBackend()
+
+    def __init__(self, pressure, T=None, x=None, v=None, h=None, s=None, name=None, backend=None):
         '''
         :param pressure: pressure in kPa
         :param T: Temperature in °C
@@ -17,153 +41,260 @@ class steam():
         :param h: enthalpy in kJ/kg
         :param s: entropy in kJ/(kg·K)
         :param name: an identifier
+        :param backend: 'table' or 'if97' (default: steam.defaultBackend)
         '''
+        self.backend = steam.defaultBackend if backend is None else checkBackend(backend)
         self.p = pressure  # kPa
-        self.T = T         # °C
-        self.x = x         # quality
-        self.v = v         # m^3/kg
-        self.h = h         # kJ/kg
-        self.s = s         # kJ/(kg·K)
         self.name = name
-        self.region = None  # 'Superheated' or 'Saturated' or ?
+        self.setInputs(T, x, v, h, s)
+
+    T = lazyProperty('_T', 'Temperature in °C')
+    x = lazyProperty('_x', 'quality (negative for compressed liquid)')
+    h = lazyProperty('_h', 'enthalpy in kJ/kg')
+    s = lazyProperty('_s', 'entropy in kJ/(kg·K)')
 
-        if (T is None and x is None and v is None and h is None and s is None):
+    @property
+    def v(self):
+        '''
+        specific volume in m^3/kg
+        '''
+        if self._v is None and self.pending is not None:
+            self.resolve()
+        if self.lazyV:
+            self._v = self.volume()
+            self.lazyV = False
+        return self._v
+
+    @v.setter
+    def v(self, value):
+        self._v = value
+        self.lazyV = False
+
+    def setInputs(self, T=None, x=None, v=None, h=None, s=None):
+        '''
+        Start a new state from p and a second property: find the region now (or copy the whole state from
+        the steamCache) and leave the other properties pending until they are read.
+        The second property is chosen in the order T, x, h, s.
+        '''
+        self.region = None  # 'Superheated', 'Saturated' or 'Compressed Liquid' (if97 only)
+        self.hf = None
+        self._T = self._x = self._v = self._h = self._s = None
+        self.pending = None  # (region, T, x, h, s, saturation properties) until resolve() runs
+        self.lazyV = False  # True while the superheated v is still to be computed
+        if T is None and x is None and h is None and s is None:
             # no second property => cannot calculate
+            self._v = v
             return
+
+        cache = steam.cache
+        if cache is not None:
+            props = cache.get(cache.key(self.p, T, x, h, s, self.backend))
+            if props is not None:
+                self.region, self._T, self._x, self._v, self._h, self._s, self.hf = props
+                return
+
+        # Interpolate all saturated properties at this pressure in one pass
+        # from the shared, pre-sorted table (Tsat[°C], hf, hg, sf, sg, vf, vg)
+        tables = propertyBackend(self.backend)
+        if97 = tables is IF97
+        sat = tables.satPoint(float(self.p))
+        Tsat, hf, hg, sf, sg, vf, vg = sat
+        self.hf = hf
+
+        #region classify the region from the second property; it is kept only where resolve() would not change it
+        if T is not None:
+            if T > Tsat:
+                region = 'Superheated'
+            elif if97 and T < Tsat:
+                region = 'Compressed Liquid'
+            else:
+                region = 'Saturated'  # T is replaced by Tsat
+            if region != 'Saturated':
+                self._T = T
+        elif x is not None:
+            region = 'Saturated'
+            self._x = x
         else:
-            self.calc()
+            x_test = (h - hf) / (hg - hf) if h is not None else (s - sf) / (sg - sf)
+            if if97 and x_test < 0.0:
+                region = 'Compressed Liquid'
+            elif x_test <= 1.0:
+                region = 'Saturated'
+            else:
+                region = 'Superheated'
+            if h is not None:
+                self._h = h
+            else:
+                self._s = s
+        #endregion
+        self.region = region
+        self.pending = (region, T, x, h, s, sat)
 
     def calc(self):
         '''
         Determine if we’re in saturated or superheated region,
-        then find the unknown properties by interpolation.
-        '''
-        # 1) Load the saturated steam table (in bar) from file
-        #    The columns are: T[°C], p[bar], hf, hg, sf, sg, vf, vg
-        sat_data = np.loadtxt('sat_water_table.txt', skiprows=1)
-        ts  = sat_data[:, 0]  # °C
-        ps  = sat_data[:, 1]  # bar
-        hfs = sat_data[:, 2]  # kJ/kg
-        hgs = sat_data[:, 3]
-        sfs = sat_data[:, 4]
-        sgs = sat_data[:, 5]
-        vfs = sat_data[:, 6]
-        vgs = sat_data[:, 7]
-
-        # 2) Load the superheated steam table (p in kPa)
-        #    The columns are: Tcol[°C], hcol[kJ/kg], scol[kJ/(kg·K)], pcol[kPa]
-        sh_data = np.loadtxt('superheated_water_table.txt', skiprows=1)
-        tcol = sh_data[:, 0]  # °C
-        hcol = sh_data[:, 1]  # kJ/kg
-        scol = sh_data[:, 2]  # kJ/(kg·K)
-        pcol = sh_data[:, 3]  # kPa
-
-        # Convert self.p (kPa) -> bar for use with the saturated table
-        Pbar = self.p / 100.0
-
-        # Interpolate saturated properties at this pressure
-        # We do 1D griddata because ps is 1D, ts is 1D, etc.
-        Tsat = float(griddata((ps,), ts,  (Pbar,), method='linear'))
-        hf   = float(griddata((ps,), hfs, (Pbar,), method='linear'))
-        hg   = float(griddata((ps,), hgs, (Pbar,), method='linear'))
-        sf   = float(griddata((ps,), sfs, (Pbar,), method='linear'))
-        sg   = float(griddata((ps,), sgs, (Pbar,), method='linear'))
-        vf   = float(griddata((ps,), vfs, (Pbar,), method='linear'))
-        vg   = float(griddata((ps,), vgs, (Pbar,), method='linear'))
-
-        # Keep these around if needed
-        self.hf = hf
-        # (Similarly, you could store self.hg, etc.)
+        then find the unknown properties by interpolation (now, rather than on first read).
+        The current T, x, h and s are the inputs, in that order of priority.
+        If a steamCache is enabled, previously resolved inputs are copied from the cache.
+        '''
+        self.setInputs(self.T, self.x, self.v, self.h, self.s)
+        if self.pending is not None:
+            self.resolve()
+
+    def resolve(self):
+        '''
+        Find the pending properties from p and the second property given to setInputs().
+        Properties assigned since then are kept.
+        '''
+        region, Tin, xin, hin, sin, sat = self.pending
+        Tsat, hf, hg, sf, sg, vf, vg = sat
+        given, value = next((k, val) for k, val in zip('Txhs', (Tin, xin, hin, sin)) if val is not None)
+        v = None
+        if region == 'Saturated':
+            # two-phase, or saturated vapor when only T <= Tsat is given
+            if given == 'T':
+                x = 1.0 if xin is None else xin
+            elif given == 'x':
+                x = xin
+            elif given == 'h':
+                x = (hin - hf) / (hg - hf)
+            else:
+                x = (sin - sf) / (sg - sf)
+            T = Tsat
+            h = hin if given == 'h' else hf + x*(hg - hf)
+            s = sin if given == 's' else sf + x*(sg - sf)
+            v = vf + x*(vg - vf)
+        elif region == 'Superheated':
+            # 2D interpolation with (given, p) => the other two of T, h, s
+            T, h, s = (float(val) for val in propertyBackend(self.backend).shProps(given, value, self.p))
+            x = 1.0
+        else:
+            # compressed liquid; a negative quality marks it, as in print()
+            T, h, s, v = (float(val) for val in IF97.liquidProps(given, value, self.p))
+        if region != 'Saturated':
+            # the given property is kept as it was passed in
+            T, h, s = (value if given == 'T' else T, value if given == 'h' else h, value if given == 's' else s)
+        if region == 'Compressed Liquid':
+            x = (s - sf) / (sg - sf) if given == 's' else (h - hf) / (hg - hf)
+
+        cache = steam.cache
+        if cache is not None:
+            if v is None:
+                v = self.volume(T)
+            cache.put(cache.key(self.p, Tin, xin, hin, sin, self.backend), (region, T, x, v, h, s, hf))
+        self.pending = None
+        if self._T is None:
+            self._T = T
+        if self._x is None:
+            self._x = x
+        if self._h is None:
+            self._h = h
+        if self._s is None:
+            self._s = s
+        if self._v is None:
+            self._v = v
+            self.lazyV = v is None
 
+    def volume(self, T=None):
+        '''
+        Superheated specific volume: IAPWS-IF97 region 2 with 'if97', otherwise the ideal gas estimate.
+        :param T: Temperature in °C (default: self.T)
+        :return: v in m^3/kg
+        '''
+        T = self.T if T is None else T
+        if self.backend == 'if97':
+            return float(IF97.shVolume(T, self.p))
         # Ideal gas constant for water vapor (approx)
         R = 8.314 / (18 / 1000.0)  # J/(mol·K) ÷ [kg/mol] => J/(kg·K)
                                    # ~ 461.5 J/(kg·K)
+        # p in kPa => multiply by 1000 for Pa
+        return R * (T + 273.15) / (self.p * 1000.0)
 
-        #region figure out which second property is given
-        if self.T is not None:
-            # we have T and p
-            if self.T > Tsat:
-                # superheated region
-                self.region = 'Superheated'
-                # Interpolate h, s from superheated table using T & p
-                # T in °C, p in kPa => we pass (self.T, self.p)
-                self.h = float(griddata(
-                    (tcol, pcol), hcol, (self.T, self.p), method='linear'))
-                self.s = float(griddata(
-                    (tcol, pcol), scol, (self.T, self.p), method='linear'))
-                self.x = 1.0
-                # Estimate v with ideal gas (rough approximation)
-                TK = self.T + 273.15
-                # p in kPa => multiply by 1000 for Pa
-                self.v = R * TK / (self.p * 1000.0)
-            else:
-                # saturated (two-phase or just saturated vapor if x=1)
-                self.region = 'Saturated'
-                self.T = Tsat
-                # We do not know x => but if user explicitly gave T < Tsat, that’s incomplete
-                # Typically we assume x=1 if T=Tsat for turbine inlet, or user sets x
-                # If you need to handle subcooled, that’s more complicated.
-                # For now assume x=1 for "saturated vapor"
-                if self.x is None:
-                    self.x = 1.0
-                self.h = hf + self.x*(hg - hf)
-                self.s = sf + self.x*(sg - sf)
-                self.v = vf + self.x*(vg - vf)
-
-        elif self.x is not None:
-            # saturated mixture => direct interpolation
-            self.region = 'Saturated'
-            self.T = Tsat
-            self.h = hf + self.x*(hg - hf)
-            self.s = sf + self.x*(sg - sf)
-            self.v = vf + self.x*(vg - vf)
-
-        elif self.h is not None:
-            # we have h and p
-            x_test = (self.h - hf) / (hg - hf)
-            if x_test <= 1.0:
-                # still saturated region
-                self.region = 'Saturated'
-                self.x = x_test
-                self.T = Tsat
-                self.s = sf + self.x*(sg - sf)
-                self.v = vf + self.x*(vg - vf)
-            else:
-                # superheated
-                self.region = 'Superheated'
-                self.x = 1.0
-                # We do 2D interpolation with (h, p) => T, s
-                self.T = float(griddata(
-                    (hcol, pcol), tcol, (self.h, self.p), method='linear'))
-                self.s = float(griddata(
-                    (hcol, pcol), scol, (self.h, self.p), method='linear'))
-                # approximate v
-                TK = (self.T if self.T is not None else Tsat) + 273.15
-                self.v = R * TK / (self.p * 1000.0)
-
-        elif self.s is not None:
-            # we have s and p
-            x_test = (self.s - sf) / (sg - sf)
-            if x_test <= 1.0:
-                # saturated region
-                self.region = 'Saturated'
-                self.x = x_test
-                self.T = Tsat
-                self.h = hf + self.x*(hg - hf)
-                self.v = vf + self.x*(vg - vf)
-            else:
-                # superheated region
-                self.region = 'Superheated'
-                self.x = 1.0
-                # 2D interpolation with (s, p) => T, h
-                self.T = float(griddata(
-                    (scol, pcol), tcol, (self.s, self.p), method='linear'))
-                self.h = float(griddata(
-                    (scol, pcol), hcol, (self.s, self.p), method='linear'))
-                # approximate v
-                TK = (self.T if self.T is not None else Tsat) + 273.15
-                self.v = R * TK / (self.p * 1000.0)
-        #endregion
+    @classmethod
+    def from_arrays(cls, p, T=None, h=None, s=None, x=None, backend=None):
+        '''
+        Vectorized version of steam(p, ...).calc() for many states at once.  The second property is
+        chosen with the same priority as calc() (T, then x, then h, then s) and every element goes
+        through the same saturated/superheated logic.
+        :param p: pressures in kPa (array-like)
+        :param T: temperatures in °C (array-like or None)
+        :param h: enthalpies in kJ/kg (array-like or None)
+        :param s: entropies in kJ/(kg·K) (array-like or None)
+        :param x: qualities (array-like or None); with T it is the quality used when T <= Tsat
+                  (T < Tsat is compressed liquid with 'if97')
+        :param backend: 'table' or 'if97' (default: steam.defaultBackend)
+        :return: a steamArray holding p, T, h, s, v, x and the superheated (and compressed liquid) masks
+        '''
+        given = [a for a in (T, x, h, s) if a is not None]
+        if len(given) == 0:
+            raise ValueError('from_arrays needs one of T, x, h or s')
+        arrays = np.broadcast_arrays(np.asarray(p, dtype=float), *[np.asarray(a, dtype=float) for a in given])
+        p = arrays[0]
+        named = dict(zip([k for k, a in zip('Txhs', (T, x, h, s)) if a is not None], arrays[1:]))
+
+        tables = propertyBackend(cls.defaultBackend if backend is None else checkBackend(backend))
+        if97 = tables is IF97
+        Tsat, hf, hg, sf, sg, vf, vg = tables.satProps(p)
+        R = 8.314 / (18 / 1000.0)  # ideal gas constant for water vapor, J/(kg·K)
+        cl = np.zeros(p.shape, dtype=bool)  # compressed liquid (if97 only)
+
+        Tout = Tsat.copy()
+        hout = np.empty_like(p)
+        sout = np.empty_like(p)
+        if 'T' in named:
+            Tin = named['T']
+            sh = Tin > Tsat
+            xout = np.where(sh, 1.0, named['x'] if 'x' in named else 1.0)
+            Tout[sh] = Tin[sh]
+            _, hout[sh], sout[sh] = tables.shProps('T', Tin[sh], p[sh])
+            if if97:
+                cl = Tin < Tsat
+                given = 'T'
+        elif 'x' in named:
+            sh = np.zeros(p.shape, dtype=bool)
+            xout = named['x'].copy()
+        elif 'h' in named:
+            hin = named['h']
+            x_test = (hin - hf) / (hg - hf)
+            sh = ~(x_test <= 1.0)
+            xout = np.where(sh, 1.0, x_test)
+            hout[sh] = hin[sh]
+            Tout[sh], _, sout[sh] = tables.shProps('h', hin[sh], p[sh])
+            if if97:
+                cl = x_test < 0.0
+                given = 'h'
+        else:
+            sin = named['s']
+            x_test = (sin - sf) / (sg - sf)
+            sh = ~(x_test <= 1.0)
+            xout = np.where(sh, 1.0, x_test)
+            sout[sh] = sin[sh]
+            Tout[sh], hout[sh], _ = tables.shProps('s', sin[sh], p[sh])
+            if if97:
+                cl = x_test < 0.0
+                given = 's'
+
+        sat = ~sh
+        hout[sat] = (hf + xout * (hg - hf))[sat]
+        sout[sat] = (sf + xout * (sg - sf))[sat]
+        if 'h' in named:
+            hout[sat] = named['h'][sat]
+        if 's' in named:
+            sout[sat] = named['s'][sat]
+        if if97:
+            vout = vf + xout * (vg - vf)
+            vout[sh] = IF97.shVolume(Tout[sh], p[sh])
+            if np.any(cl):
+                # compressed liquid; a negative quality marks it, as in calc()
+                Tout[cl], hout[cl], sout[cl], vout[cl] = IF97.liquidProps(given, named[given][cl], p[cl])
+                # the given property is kept as it was passed in, and s-input qualities use s, as in resolve()
+                {'T': Tout, 'h': hout, 's': sout}[given][cl] = named[given][cl]
+                xcl = (sout - sf) / (sg - sf) if given == 's' else (hout - hf) / (hg - hf)
+                xout = np.where(cl, xcl, xout)
+        else:
+            # saturated mixture by quality, superheated by the ideal gas estimate used in calc()
+            vout = np.where(sh, R * (Tout + 273.15) / (p * 1000.0), vf + xout * (vg - vf))
+        return steamArray(p, Tout, hout, sout, vout, xout, sh, cl)
 
     def print(self):
         """
@@ -184,9 +315,163 @@ class steam():
                 print('v = {:0.6f} m^3/kg'.format(self.v))
                 print('x = {:0.4f}'.format(self.x))
         print()
+
+class steamArray():
+    """
+    Structure-of-arrays result of steam.from_arrays(): one NumPy array per property.
+    """
+    def __init__(self, p, T, h, s, v, x, superheated, compressed=None):
+        '''
+        :param p: pressure in kPa
+        :param T: Temperature in °C
+        :param h: enthalpy in kJ/kg
+        :param s: entropy in kJ/(kg·K)
+        :param v: specific volume in m^3/kg
+        :param x: quality (1 in the superheated region)
+        :param superheated: boolean region mask, True for superheated and False for saturated
+        :param compressed: boolean compressed liquid mask (default: none)
+        '''
+        self.p = p
+        self.T = T
+        self.h = h
+        self.s = s
+        self.v = v
+        self.x = x
+        self.superheated = superheated
+        self.compressed = np.zeros(superheated.shape, dtype=bool) if compressed is None else compressed
+
+    def __len__(self):
+        return self.p.size
+
+    def region(self):
+        '''
+        :return: array of 'Superheated'/'Saturated'/'Compressed Liquid' strings matching steam.region
+        '''
+        return np.where(self.superheated, 'Superheated', np.where(self.compressed, 'Compressed Liquid', 'Saturated'))
+
+    def state(self, i, name=None):
+        '''
+        Copy element i into a regular steam object.
+        :param i: index into the (flattened) arrays
+        :param name: an identifier for the new steam object
+        :return: a steam object
+        '''
+        st = steam(float(self.p.flat[i]), name=name)
+        st.T = float(self.T.flat[i])
+        st.h = float(self.h.flat[i])
+        st.s = float(self.s.flat[i])
+        st.v = float(self.v.flat[i])
+        st.x = float(self.x.flat[i])
+        st.region = ('Superheated' if self.superheated.flat[i] else
+                     'Compressed Liquid' if self.compressed.flat[i] else 'Saturated')
+        return st
+
+class steamCache():
+    """
+    Bounded LRU cache of resolved steam states, keyed on the rounded inputs (p, T, x, h, s).
+    Entries are immutable tuples that are copied into each steam object, so callers that
+    change a property afterwards (e.g. state 4's h in rankine) cannot alter the cached state.
+    """
+    def __init__(self, maxsize=4096, decimals=6):
+        '''
+        :param maxsize: maximum number of cached states
+        :param decimals: number of decimals the inputs are rounded to when forming the key
+        '''
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self.version = None  # steamTables version the entries were computed with
+        self.data = OrderedDict()
+
+    def key(self, p, T, x, h, s, backend='table'):
+        '''
+        :return: a hashable key made of the rounded inputs (None for properties not given) and the backend
+        '''
+        d = self.decimals
+        return tuple(None if val is None else round(float(val), d) for val in (p, T, x, h, s)) + (backend,)
+
+    def get(self, key):
+        '''
+        :return: the cached property tuple for key, or None on a miss
+        '''
+        if key[-1] == 'table':
+            # only table states depend on the table files; if97 lookups never load them
+            version = getTables().version
+            if version != self.version:
+                # the tables were reloaded, so every cached table state is out of date
+                for old in [k for k in self.data if k[-1] == 'table']:
+                    del self.data[old]
+                self.version = version
+        props = self.data.get(key)
+        if props is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return props
+
+    def put(self, key, props):
+        '''
+        Store a property tuple, evicting the least recently used entry when full.
+        '''
+        self.data[key] = props
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        '''
+        :return: dict with hits, misses, size and maxsize
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
 # endregion
 
 # region function definitions
+BACKENDS = ('table', 'if97')
+
+def checkBackend(backend):
+    # the backend name, if it is one of BACKENDS
+    if backend not in BACKENDS:
+        raise ValueError('backend must be one of {}, not {!r}'.format(', '.join(BACKENDS), backend))
+    return backend
+
+def propertyBackend(backend):
+    '''
+    :param backend: 'table' or 'if97'
+    :return: the object providing satProps/shProps: the shared steamTables or the IF97 module
+    '''
+    return IF97 if checkBackend(backend) == 'if97' else getTables()
+
+def setBackend(backend):
+    '''
+    Choose the property backend of every steam object that does not set its own: 'table' interpolates the
+    bundled tables, 'if97' evaluates the IAPWS-IF97 equations (no file I/O, exact superheated volumes and
+    compressed liquid states, saturation up to 16.5 MPa).
+    '''
+    steam.defaultBackend = checkBackend(backend)
+
+def enableCache(maxsize=4096, decimals=6):
+    '''
+    Turn on the shared LRU cache for steam.calc().
+    :param maxsize: maximum number of cached states
+    :param decimals: number of decimals the inputs are rounded to when forming the key
+    :return: the steamCache in use (read its hits/misses or call info())
+    '''
+    steam.cache = steamCache(maxsize=maxsize, decimals=decimals)
+    return steam.cache
+
+def disableCache():
+    '''
+    Turn off the shared LRU cache for steam.calc().
+    '''
+    steam.cache = None
+
 def main():
     # Example usage
     inlet = steam(7350, name='Turbine Inlet')  # not enough info
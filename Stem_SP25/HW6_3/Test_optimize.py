@@ -0,0 +1,21 @@
+from Rankine_stem import rankine
+from Rankine_optimize import optimize, cycleEvaluator
+
+def testOptimizerMeetsX2min():
+    # the best design respects the turbine exit quality limit and the bounds, and the scalar cycle agrees
+    evaluator = cycleEvaluator()
+    for x2min in (0.85, 0.9):
+        r = optimize(t_high=(300.0, 450.0), x2min=x2min, evaluator=evaluator)
+        assert r['success'], r['message']
+        assert r['design']['x2'] >= x2min, (x2min, r['design']['x2'])
+        assert 5.0 <= r['p_low'] <= 100.0 and 1000.0 <= r['p_high'] <= 15000.0 and 300.0 <= r['t_high'] <= 450.0
+        cycle = rankine(p_low=r['p_low'], p_high=r['p_high'], t_high=r['t_high'])
+        assert abs(cycle.calc_efficiency() - r['objective']) < 1e-6, (cycle.efficiency, r['objective'])
+        assert abs(cycle.state2.x - r['design']['x2']) < 1e-9
+
+def main():
+    testOptimizerMeetsX2min()
+    print('Test_optimize: all checks passed')
+
+if __name__=="__main__":
+    main()
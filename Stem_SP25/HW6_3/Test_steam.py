@@ -0,0 +1,167 @@
+import asyncio
+import numpy as np
+import IF97
+import Steam_stem
+from Steam_stem import steam
+from SteamTables import reloadTables, getTables
+from Steam_server import steamServer
+import Steam_load
+from Rankine_stem import rankine
+
+def close(a, b, rtol=1e-9):
+    # equal to rtol, with nan matching nan
+    return (np.isnan(a) and np.isnan(b)) or abs(a - b) <= rtol * max(1.0, abs(a))
+
+def testScalarMatchesArrays(n=200, seed=0):
+    # steam(p, ...) and steam.from_arrays(p, ...) agree on every property for each backend and input type
+    rng = np.random.default_rng(seed)
+    for backend in ('table', 'if97'):
+        for given, lo, hi in (('T', 0.0, 700.0), ('x', 0.0, 1.0), ('h', 50.0, 3800.0), ('s', 0.2, 8.5)):
+            p = rng.uniform(10.0, 16000.0, n)
+            value = rng.uniform(lo, hi, n)
+            states = steam.from_arrays(p, backend=backend, **{given: value})
+            region = states.region()
+            for i in range(n):
+                st = steam(p[i], backend=backend, **{given: value[i]})
+                for k in ('T', 'h', 's', 'v', 'x'):
+                    assert close(getattr(st, k), getattr(states, k)[i]), (backend, given, p[i], value[i], k)
+                assert st.region == region[i], (backend, given, p[i], value[i])
+
+def testIF97Verify():
+    # the IAPWS-IF97 verification points are reproduced
+    assert IF97.verify() < 1e-8
+
+def testCacheReload():
+    # reloading the tables drops the cached table states but keeps the if97 ones
+    cache = Steam_stem.enableCache()
+    try:
+        for _ in range(2):
+            steam(8000, T=500).h
+            steam(8000, T=500, backend='if97').h
+        assert cache.info()['hits'] == 2
+        reloadTables(force=True)
+        steam(8000, T=500).h
+        steam(8000, T=500, backend='if97').h
+        assert cache.info()['hits'] == 3 and cache.info()['misses'] == 3
+    finally:
+        Steam_stem.disableCache()
+
+def testCacheHitsAndEviction():
+    # repeated inputs are hits, and the least recently used state is evicted when the cache is full
+    cache = Steam_stem.enableCache(maxsize=2)
+    try:
+        a = steam(8000, T=500).h
+        assert cache.info() == {'hits': 0, 'misses': 1, 'size': 1, 'maxsize': 2}
+        assert steam(8000, T=500).h == a
+        assert cache.info()['hits'] == 1
+        steam(8, x=0.0).h  # cache: a, b
+        steam(8000, T=500).h  # a is now the most recently used
+        steam(8, s=6.5).h  # cache full: b is evicted
+        assert cache.info() == {'hits': 2, 'misses': 3, 'size': 2, 'maxsize': 2}
+        assert cache.key(8, None, 0.0, None, None) not in cache.data
+        steam(8000, T=500).h
+        steam(8, s=6.5).h
+        assert cache.info()['hits'] == 4
+        steam(8, x=0.0).h
+        assert cache.info()['misses'] == 4
+    finally:
+        Steam_stem.disableCache()
+
+def testCacheCopies():
+    # changing a property of a state read from the cache, or of the state that filled it, leaves the entry unchanged
+    ref = {k: getattr(steam(8000, s=0.5926), k) for k in ('T', 'h', 's', 'v', 'x')}
+    efficiency = rankine(8, 8000, 500).calc_efficiency()
+    cache = Steam_stem.enableCache()
+    try:
+        first = steam(8000, s=0.5926)
+        first.h
+        first.h = 0.0
+        second = steam(8000, s=0.5926)
+        assert cache.info()['hits'] == 1
+        second.T = second.v = 0.0
+        third = steam(8000, s=0.5926)
+        assert cache.info()['hits'] == 2
+        assert all(getattr(third, k) == ref[k] for k in ref), (ref, [getattr(third, k) for k in ref])
+        # calc_efficiency overwrites state 4's h; running it again from the cache gives the same cycle
+        for _ in range(2):
+            assert close(rankine(8, 8000, 500).calc_efficiency(), efficiency)
+        assert cache.info()['hits'] >= 4
+    finally:
+        Steam_stem.disableCache()
+
+def countInterpolations(tables):
+    # wrap tables.shProps so the superheated interpolations can be counted; del tables.shProps restores it
+    calls = []
+    shProps = tables.shProps
+    def counted(*args):
+        calls.append(args)
+        return shProps(*args)
+    tables.shProps = counted
+    return calls
+
+def testLazyProperties():
+    # the superheated interpolation runs on the first read of T, x, h or s, and v only when it is read
+    tables = getTables()
+    calls = countInterpolations(tables)
+    try:
+        st = steam(8000, h=3400.0)
+        assert st.region == 'Superheated' and st.pending is not None and len(calls) == 0
+        assert not hasattr(st, '__dict__')
+        ref = steam(8000, h=3400.0)
+        assert st.T > 500 and len(calls) == 1 and st.pending is None and st.lazyV and st._v is None
+        assert st.s == ref.s and st.x == 1.0 and len(calls) == 2  # one more for ref
+        assert st.v == ref.v and not st.lazyV
+        # an assigned property is kept, and does not trigger the interpolation
+        st = steam(8000, s=0.6)
+        st.h = 100.0
+        assert st.h == 100.0 and st.pending is not None
+        # rankine reads only s of state 3 for state 4 and assigns its h, so state 4 is never interpolated
+        cycle = rankine(8, 8000, 500)
+        cycle.calc_efficiency()
+        assert cycle.state4.pending is not None and cycle.state1.lazyV
+        # a changed input replaces the state: calc() starts again from T
+        st = steam(8000, T=500)
+        h500 = st.h
+        st.T = 550
+        assert st.h == h500
+        st.calc()
+        assert st.T == 550 and st.h == steam(8000, T=550).h and st.h > h500
+        assert st.v == steam(8000, T=550).v
+        st.setInputs(x=0.5)
+        assert st.pending is not None and st._h is None and st.T < 300 and st.x == 0.5
+    finally:
+        del tables.shProps
+
+def testServerRoundTrip():
+    # a load run against a server on a free local port; one state is checked against steam()
+    async def go():
+        server = steamServer()
+        await server.start('127.0.0.1', 0)
+        try:
+            result = await Steam_load.run(server.address()[:2], clients=2, requests=5, states=1)
+            reader, writer = await Steam_load.connect(server.address()[:2])
+            try:
+                status, state = await Steam_load.request(reader, writer, 'POST', '/steam', {'p': 8000, 's': 6.5})
+            finally:
+                writer.close()
+        finally:
+            await server.close()
+        return result, status, state
+    result, status, state = asyncio.run(go())
+    assert result['requests'] == 10 and result['server']['requests'] == 10 and result['server']['errors'] == 0
+    assert result['server']['states'] == 10 and result['server']['batches'] >= 1
+    st = steam(8000, s=6.5)
+    assert status == 200 and all(close(state[k], getattr(st, k)) for k in ('T', 'h', 's', 'v', 'x'))
+
+def main():
+    testScalarMatchesArrays()
+    testIF97Verify()
+    testCacheReload()
+    testCacheHitsAndEviction()
+    testCacheCopies()
+    testLazyProperties()
+    testServerRoundTrip()
+    print('Test_steam: all checks passed')
+
+if __name__=="__main__":
+    main()
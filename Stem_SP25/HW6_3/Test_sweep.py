@@ -0,0 +1,53 @@
+import numpy as np
+from Rankine_stem import rankine
+from Rankine_sweep import rankine_arrays, sweep, SWEEP_FIELDS
+
+P_LOW = (8.0, 50.0)
+P_HIGH = (1000.0, 8000.0, 15000.0)
+T_HIGH = (None, 400.0, 550.0)
+
+def scalarCycle(p_low, p_high, t_high):
+    # the reference: one rankine object per design point
+    cycle = rankine(p_low=p_low, p_high=p_high, t_high=None if np.isnan(t_high) else t_high)
+    cycle.calc_efficiency()
+    return {'efficiency': cycle.efficiency, 'turbine_work': cycle.turbine_work, 'pump_work': cycle.pump_work,
+            'heat_added': cycle.heat_added, 'x2': cycle.state2.x}
+
+def checkRows(rows):
+    # every row of a sweep result matches the scalar cycle at its design point
+    assert len(rows) == len(P_LOW) * len(P_HIGH) * len(T_HIGH)
+    for row in rows:
+        expected = scalarCycle(row['p_low'], row['p_high'], row['t_high'])
+        for f in SWEEP_FIELDS[3:]:
+            assert abs(row[f] - expected[f]) <= 1e-9 * max(1.0, abs(expected[f])), (tuple(row), f)
+
+def testRankineArraysMatchesScalar():
+    # rankine_arrays over the grid, with nan for saturated vapor at the turbine inlet
+    p_low, p_high, t_high = (a.ravel() for a in np.meshgrid(
+        P_LOW, P_HIGH, [np.nan if t is None else t for t in T_HIGH], indexing='ij'))
+    out = rankine_arrays(p_low, p_high, t_high)
+    rows = np.zeros(p_low.size, dtype=[(f, float) for f in SWEEP_FIELDS])
+    rows['p_low'], rows['p_high'], rows['t_high'] = p_low, p_high, t_high
+    for f in SWEEP_FIELDS[3:]:
+        rows[f] = out[f]
+    checkRows(rows)
+
+def testSweepMatchesScalar():
+    # one chunk, several chunks, and several chunks in worker processes give the same rows
+    whole = sweep(P_LOW, P_HIGH, T_HIGH)
+    checkRows(whole)
+    calls = []
+    chunked = sweep(P_LOW, P_HIGH, T_HIGH, chunksize=4, progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (len(whole), len(whole)) and len(calls) == 5
+    parallel = sweep(P_LOW, P_HIGH, T_HIGH, chunksize=4, workers=2)
+    for rows in (chunked, parallel):
+        for f in SWEEP_FIELDS:
+            assert np.array_equal(rows[f], whole[f], equal_nan=True), f
+
+def main():
+    testRankineArraysMatchesScalar()
+    testSweepMatchesScalar()
+    print('Test_sweep: all checks passed')
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from SteamTables import steamTables, readBinary, compileTables, sourceHash, BINARY_VERSION
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def tableCopies(folder):
+    # copies of the table files, so the tests can edit them; returns (satFile, shFile, binFile)
+    files = []
+    for name in ('sat_water_table.txt', 'superheated_water_table.txt'):
+        files.append(os.path.join(folder, name))
+        shutil.copy(os.path.join(HERE, name), files[-1])
+    return files[0], files[1], os.path.join(folder, 'steam_tables.bin')
+
+def replaceFile(name, data):
+    # write a new file under the name (a new inode, so existing memory maps of the old file stay valid)
+    with open(name + '.new', 'wb') as f:
+        f.write(data)
+    os.replace(name + '.new', name)
+
+def editSatTable(satFile, old=b'2500.9109946395', new=b'2600.9109946395'):
+    # change hg of the lowest-pressure row, and move the modification time on so the change is seen
+    with open(satFile, 'rb') as f:
+        data = f.read()
+    assert old in data
+    replaceFile(satFile, data.replace(old, new))
+    st = os.stat(satFile)
+    os.utime(satFile, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def lowestHg(tables):
+    # hg at the lowest pressure of the saturated table, which is the first row exactly
+    return tables.satPoint(tables.psList[0] * 100.0)[2]
+
+def testReload():
+    # an edited table file makes the tables stale, and reload picks up the change once
+    for useBinary in (False, True):
+        with tempfile.TemporaryDirectory() as folder:
+            satFile, shFile, binFile = tableCopies(folder)
+            tables = steamTables(satFile, shFile, binFile, useBinary=useBinary)
+            version = tables.version
+            assert not tables.isStale() and not tables.reload() and tables.version == version
+            editSatTable(satFile)
+            assert tables.isStale()
+            assert tables.reload() and tables.version == version + 1 and not tables.isStale()
+            assert np.isclose(lowestHg(tables), 2600.9109946395)
+            assert tables.source == ('binary' if useBinary else 'text')
+            assert not tables.reload() and tables.reload(force=True) and tables.version == version + 2
+
+def testBinaryRebuilt():
+    # a binary compiled from other text files or with another format version is compiled again
+    with tempfile.TemporaryDirectory() as folder:
+        satFile, shFile, binFile = tableCopies(folder)
+        tables = steamTables(satFile, shFile, binFile)
+        assert tables.source == 'binary' and np.isclose(lowestHg(tables), 2500.9109946395)
+        editSatTable(satFile)
+        assert readBinary(binFile, sourceHash(satFile, shFile)) is None
+        tables = steamTables(satFile, shFile, binFile)
+        assert tables.source == 'binary' and np.isclose(lowestHg(tables), 2600.9109946395)
+        assert readBinary(binFile, sourceHash(satFile, shFile)) is not None
+        with open(binFile, 'rb') as f:
+            data = f.read()
+        old = '"format": {}'.format(BINARY_VERSION).encode()
+        assert old in data
+        replaceFile(binFile, data.replace(old, '"format": {}'.format(BINARY_VERSION + 1).encode()))
+        assert readBinary(binFile) is None
+        tables = steamTables(satFile, shFile, binFile)
+        assert tables.source == 'binary' and readBinary(binFile, sourceHash(satFile, shFile)) is not None
+        assert np.isclose(lowestHg(tables), 2600.9109946395)
+
+def testCorruptBinary():
+    # a truncated or inconsistent binary reads as None, and the tables are compiled again
+    with tempfile.TemporaryDirectory() as folder:
+        satFile, shFile, binFile = tableCopies(folder)
+        compileTables(satFile, shFile, binFile)
+        with open(binFile, 'rb') as f:
+            data = f.read()
+        for bad in (data[:len(data) // 2], data[:200], data[:12], data.replace(b'"arrays"', b'"arrayz"')):
+            replaceFile(binFile, bad)
+            assert readBinary(binFile) is None
+            tables = steamTables(satFile, shFile, binFile)
+            assert tables.source == 'binary' and readBinary(binFile) is not None
+            assert np.isclose(tables.satPoint(100.0)[0], 99.6, atol=0.1)
+
+def main():
+    testReload()
+    testBinaryRebuilt()
+    testCorruptBinary()
+    print('Test_tables: all checks passed')
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,151 @@
+#region imports
+import time
+import cProfile
+import pstats
+import io
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+#endregion
+
+#region class definitions
+class SolveReport():
+    # the report being recorded, if any; instrumented code checks it before counting anything
+    active = None
+
+    #region constructor
+    def __init__(self, name='', profile=False, memory=False):
+        '''
+        Opt-in record of one solve: call counters, wall time per phase, final residual norm, convergence flag
+        and solver message, with optional cProfile and tracemalloc capture.  Use it as a context manager
+        around the solve; instrumented code adds to SolveReport.active while the report is open.
+        :param name: label of the solve
+        :param profile: capture a cProfile profile of the solve (see printProfile)
+        :param memory: record the peak traced memory of the solve with tracemalloc
+        '''
+        #region attributes
+        self.name = name
+        self.counters = {}  # e.g. residual calls, friction factor evaluations, nested fsolve calls
+        self.phases = {}  # phase name -> wall time in s
+        self.iterations = None
+        self.residualNorm = None
+        self.converged = None
+        self.message = ''
+        self.profiler = cProfile.Profile() if profile else None
+        self.memory = memory
+        self.peakMemory = None  # bytes, when memory=True
+        self.previous = None
+        self.started = 0.0
+        self.traced = False
+        #endregion
+    #endregion
+
+    #region methods
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        self.previous = SolveReport.active
+        SolveReport.active = self
+        if self.memory:
+            self.traced = not tracemalloc.is_tracing()
+            if self.traced:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.phases['total'] = self.phases.get('total', 0.0) + time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.memory:
+            self.peakMemory = tracemalloc.get_traced_memory()[1]
+            if self.traced:
+                tracemalloc.stop()
+        SolveReport.active = self.previous
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def phase(self, name):
+        # adds the wall time of the block to self.phases[name]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @staticmethod
+    def tally(name, n=1):
+        # count into the active report, if there is one
+        report = SolveReport.active
+        if report is not None:
+            report.counters[name] = report.counters.get(name, 0) + n
+
+    @staticmethod
+    def section(name):
+        # phase of the active report, or a context that does nothing
+        report = SolveReport.active
+        return report.phase(name) if report is not None else nullcontext()
+
+    @staticmethod
+    def outcome(iterations, residualNorm, converged, message=''):
+        # final state of a solve, kept by the active report, if there is one
+        report = SolveReport.active
+        if report is not None:
+            report.iterations = int(iterations)
+            report.residualNorm = float(residualNorm)
+            report.converged = bool(converged)
+            report.message = message
+
+    def counted(self, fn, name='residual', timed=True):
+        '''
+        :return: fn wrapped so each call is counted (and timed in phase name)
+        '''
+        def wrapper(*args):
+            self.counters[name] = self.counters.get(name, 0) + 1
+            if not timed:
+                return fn(*args)
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+        return wrapper
+
+    def asDict(self):
+        return {'name': self.name, 'counters': dict(self.counters), 'phases': dict(self.phases),
+                'iterations': self.iterations, 'residualNorm': self.residualNorm, 'converged': self.converged,
+                'message': self.message, 'peakMemory': self.peakMemory}
+
+    def summary(self):
+        lines = ['solve report {}'.format(self.name).rstrip()]
+        if self.converged is not None:
+            lines.append('  converged: {}  residual norm: {:.3e}  iterations: {}'.format(
+                self.converged, self.residualNorm if self.residualNorm is not None else float('nan'), self.iterations))
+        if self.message:
+            lines.append('  message: {}'.format(self.message.strip()))
+        for name, value in self.counters.items():
+            lines.append('  {:<24s} {:>10d} calls'.format(name, value))
+        for name, value in self.phases.items():
+            lines.append('  {:<24s} {:>10.4f} s'.format(name, value))
+        if self.peakMemory is not None:
+            lines.append('  {:<24s} {:>10.2f} MB'.format('peak memory', self.peakMemory / 1e6))
+        return '\n'.join(lines)
+
+    def printProfile(self, n=15, sort='cumulative'):
+        if self.profiler is None:
+            print('no profile captured (use SolveReport(profile=True))')
+            return
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(n)
+        print(out.getvalue())
+    #endregion
+#endregion
@@ -0,0 +1,45 @@
+import numpy as np
+from CycleBasis import FundamentalCycles
+
+def randomGraph(rng, nodes, edges, parts):
+    # a multigraph of several connected parts, with parallel edges and self-loops
+    names = ['n{}'.format(i) for i in range(nodes)]
+    part = np.arange(nodes) % parts
+    result = []
+    for p in range(parts):
+        members = [names[i] for i in np.nonzero(part == p)[0]]
+        # a random spanning tree keeps the part connected
+        for i in range(1, len(members)):
+            result.append((members[i], members[rng.integers(i)]))
+    for _ in range(edges - len(result)):
+        p = rng.integers(parts)
+        members = [names[i] for i in np.nonzero(part == p)[0]]
+        result.append((members[rng.integers(len(members))], members[rng.integers(len(members))]))
+    return result, parts
+
+def testFundamentalCycles():
+    # E - N + components independent cycles, each of which closes through the edges it lists
+    rng = np.random.default_rng(0)
+    for nodes, edges, parts in ((1, 3, 1), (2, 4, 1), (8, 12, 1), (30, 60, 3), (200, 500, 7)):
+        graph, components = randomGraph(rng, nodes, edges, parts)
+        used = [(a, b) for a, b in graph if a != b]
+        cycles = FundamentalCycles(graph)
+        N = len({n for e in used for n in e})
+        assert len(cycles) == len(used) - N + (components if N else 0), (nodes, edges, parts)
+        # signed edge vectors of the cycles, to check they are independent
+        vectors = np.zeros((len(cycles), len(graph)))
+        for c, (cycleNodes, cycleEdges) in enumerate(cycles):
+            assert len(cycleNodes) == len(cycleEdges) >= 2 and len(set(cycleEdges)) == len(cycleEdges)
+            for i, k in enumerate(cycleEdges):
+                a, b = cycleNodes[i], cycleNodes[(i + 1) % len(cycleNodes)]
+                assert graph[k] in ((a, b), (b, a)), (graph[k], a, b)
+                vectors[c, k] = 1.0 if graph[k] == (a, b) else -1.0
+            assert (cycleNodes[0], cycleNodes[1]) == graph[cycleEdges[0]]
+        assert len(cycles) == 0 or np.linalg.matrix_rank(vectors) == len(cycles)
+
+def main():
+    testFundamentalCycles()
+    print('Test_shared: all checks passed')
+
+if __name__=="__main__":
+    main()
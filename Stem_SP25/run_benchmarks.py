@@ -0,0 +1,108 @@
+# region imports
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+# endregion
+
+# region function definitions
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUITES = {'HW6_1': 'Bench_resistor.py', 'HW6_2': 'Bench_pipes.py', 'HW6_3': 'Bench_steam.py'}
+
+def metadata():
+    '''
+    Describe the machine and code the benchmarks ran on.
+    :return: dict with the UTC time, python/numpy/scipy versions, platform, CPU count and git commit
+    '''
+    import numpy
+    import scipy
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = len(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                                   capture_output=True, text=True).stdout.strip()) > 0
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {'time': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'numpy': numpy.__version__, 'scipy': scipy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpus': os.cpu_count(), 'commit': commit, 'dirty': dirty}
+
+def runSuite(folder, quick=False):
+    '''
+    Run one folder's benchmark script in a child process (cwd = the folder, so its data files and imports
+    resolve as they do for the homework scripts).
+    :return: (records, run summary with the wall time, exit status and max RSS of the child in MB)
+    '''
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    cmd = [sys.executable, SUITES[folder], '--json', path] + (['--quick'] if quick else [])
+    start = time.perf_counter()
+    child = subprocess.Popen(cmd, cwd=os.path.join(HERE, folder))
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    seconds = time.perf_counter() - start
+    try:
+        with open(path) as f:
+            records = json.load(f) if child.returncode == 0 else []
+    finally:
+        os.remove(path)
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    rss = usage.ru_maxrss / (1e6 if sys.platform == 'darwin' else 1e3)
+    return records, {'suite': folder, 'seconds': seconds, 'returncode': child.returncode, 'maxRSSMB': rss}
+
+def compare(old, new):
+    '''
+    Print new/old time and memory ratios for the cases found in both results, matched on (suite, case, size).
+    '''
+    key = lambda r: (r['suite'], r['case'], r['size'])
+    before = {key(r): r for r in old['records']}
+    print('{:<8s} {:<36s} {:>8s} {:>12s} {:>12s} {:>8s} {:>8s}'.format(
+        'suite', 'case', 'size', 'old s', 'new s', 'time x', 'mem x'))
+    for r in new['records']:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        ratio = lambda a, b: a / b if b > 0 else float('nan')
+        print('{:<8s} {:<36s} {:>8d} {:>12.5f} {:>12.5f} {:>8.2f} {:>8.2f}'.format(
+            r['suite'], r['case'], r['size'], o['seconds'], r['seconds'], ratio(r['seconds'], o['seconds']),
+            ratio(r['peakMB'], o['peakMB'])))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the HW6 benchmark suites and save the results as JSON.')
+    parser.add_argument('--quick', action='store_true', help='smaller problem sizes')
+    parser.add_argument('--out', default=os.path.join(HERE, 'bench_results'), help='results directory')
+    parser.add_argument('--compare', metavar='FILE', help='earlier results file to compare against')
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), help='suites to run (default: all)')
+    args = parser.parse_args(argv)
+
+    results = {'metadata': metadata(), 'quick': args.quick, 'runs': [], 'records': []}
+    for folder in args.only or sorted(SUITES):
+        print('== {} =='.format(folder), flush=True)
+        records, run = runSuite(folder, args.quick)
+        results['runs'].append(run)
+        results['records'] += records
+        print('{}: {:0.1f} s, max RSS {:0.1f} MB, exit status {}'.format(
+            folder, run['seconds'], run['maxRSSMB'], run['returncode']), flush=True)
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    filename = os.path.join(args.out, 'benchmarks-{}.json'.format(stamp))
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1)
+    print('results written to {}'.format(filename))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 0 if all(run['returncode'] == 0 for run in results['runs']) else 1
+# endregion
+
+# region function calls
+if __name__ == "__main__":
+    sys.exit(main())
+# endregion